@@ -2,18 +2,27 @@ from dotenv import load_dotenv
 load_dotenv()
 
 # --- IMPORTS ---
+import os
+import socket
+import atexit
 import threading
+import asyncio
 import json
-from datetime import datetime
+from datetime import datetime, timezone
 from flask import Flask, render_template, request, redirect, url_for, jsonify, Response
 from flask_apscheduler import APScheduler
 from croniter import croniter
 import logging
 
 import database as db
-from engine import run_organism
+from engine import run_organism, run_organism_async, compile_genome
+from run_log import RunLogSink
+from gene_cache import GENE_CACHE, GENE_FLIGHTS
+from resource_usage import RunUsage
+import run_control
+from conditions import ConditionError, compile_condition
 from genesis import generate_genome_from_prompt
-from genes import GENE_MAP # Import GENE_MAP to validate gene types
+from genes import GENE_MAP, GENE_TRAITS # Import GENE_MAP to validate gene types
 
 # --- APP AND SCHEDULER SETUP ---
 class Config:
@@ -37,16 +46,163 @@ scheduler.start()
 # This ensures the database tables are created when the app starts.
 with app.app_context():
     db.create_tables()
+# Pooled connections are per thread; close them all when the process exits.
+atexit.register(db.close_all)
+
+# --- GENE CACHE ---
+# Genes with a "cache" stanza are memoized in memory; this adds the SQLite tier.
+if os.environ.get("FOUNDRY_GENE_CACHE_PERSIST") == "1":
+    GENE_CACHE.attach_store(db.get_gene_cache_entry, db.put_gene_cache_entry)
 
 # --- ASYNC EXECUTION HELPERS ---
-def run_and_log(genome_json, run_id, organism_id):
-    """Target function for the background thread. Executes the organism and updates the run log."""
+# 'thread' starts one OS thread per run; 'asyncio' runs every organism on one shared event loop.
+ENGINE_RUNNER = os.environ.get("FOUNDRY_RUNNER", "thread")
+
+_engine_loop = None
+_engine_loop_lock = threading.Lock()
+
+def get_engine_loop():
+    """Starts (once) and returns the event loop that hosts asyncio organism runs."""
+    global _engine_loop
+    with _engine_loop_lock:
+        if _engine_loop is None:
+            _engine_loop = asyncio.new_event_loop()
+            threading.Thread(target=_engine_loop.run_forever, name="organism-loop", daemon=True).start()
+        return _engine_loop
+
+def _checkpointer(run_id):
+    """Checkpoint callback for the engine: saves each successful gene's output under run_id."""
+    return lambda gene_index, gene_id, output_key, value, definition_hash: db.save_run_checkpoint(
+        run_id, gene_index, gene_id, output_key, value, definition_hash)
+
+class _RunWriter:
+    """
+    Performs one asyncio run's database writes (log chunks, checkpoints) in
+    order on worker threads, so a slow or locked database stalls only that
+    run's writes and never the shared event loop. A failing write is retried
+    a few times, then reported and dropped.
+    """
+
+    ATTEMPTS = 3
+
+    def __init__(self, run_id):
+        self.run_id = run_id
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue()
+        self._task = self._loop.create_task(self._drain())
+
+    def submit(self, function, *args):
+        """Queues function(*args); callable from the loop or from the threads sync genes run on."""
+        self._loop.call_soon_threadsafe(self._queue.put_nowait, (function, args))
+
+    def checkpointer(self):
+        """Checkpoint callback that snapshots the value now (raising TypeError as before) and saves it later."""
+        def checkpoint(gene_index, gene_id, output_key, value, definition_hash):
+            value = json.loads(json.dumps(value)) # Later genes may mutate it before the write runs.
+            self.submit(db.save_run_checkpoint, self.run_id, gene_index, gene_id, output_key, value, definition_hash)
+        return checkpoint
+
+    async def _drain(self):
+        while True:
+            item = await self._queue.get()
+            if item is None:
+                return
+            function, args = item
+            for attempt in range(1, self.ATTEMPTS + 1):
+                try:
+                    await asyncio.to_thread(function, *args)
+                    break
+                except Exception as e:
+                    if attempt == self.ATTEMPTS:
+                        app.logger.error(f"Run {self.run_id}: {function.__name__} failed {attempt} times: {e}")
+                    else:
+                        await asyncio.sleep(0.5 * attempt)
+
+    async def close(self):
+        """Waits until every queued write has been done."""
+        self._loop.call_soon_threadsafe(self._queue.put_nowait, None)
+        await self._task
+
+def _finish_run(run_id, final_status, spans, usage, resume_from=None):
+    db.update_run(run_id, final_status)
+    db.record_gene_executions(run_id, spans)
+    db.record_run_usage(run_id, usage.as_dict())
+    if final_status == "success":
+        db.delete_run_checkpoints(run_id) # Only failed runs can be resumed.
+        if resume_from:
+            db.delete_run_checkpoints(resume_from) # The resumed run has been completed by this one.
+
+def _crashed(run_id, log_sink, error):
+    """Records an error that escaped the engine in the run's log; the run is then finished as failed."""
+    app.logger.error(f"Run {run_id} crashed.", exc_info=error)
+    try:
+        log_sink.write(f"\n--- Run crashed: {type(error).__name__}: {error} ---\n")
+        log_sink.flush()
+    except Exception:
+        pass # The status still has to be recorded.
+    return "failed"
+
+def run_and_log(genome_json, run_id, organism_id, resume_from=None):
+    """
+    Target function for the background thread. Executes the organism and updates the run log.
+    With resume_from, genes that succeeded in that earlier run are restored from its checkpoints.
+    """
     with app.app_context(): # CRITICAL: A new thread needs the app context to use the db
         app.logger.info(f"Thread for run {run_id} started for organism {organism_id}.")
-        log_output, final_status = run_organism(genome_json, run_id, organism_id)
-        db.update_run(run_id, final_status, log_output)
+        spans = []
+        usage = RunUsage()
+        log_sink = RunLogSink(on_flush=lambda seq, text: db.append_run_log_chunk(run_id, seq, text))
+        resume = db.get_run_checkpoints(resume_from) if resume_from else None
+        try:
+            _, final_status, _ = run_organism(genome_json, run_id, organism_id, trace=spans, log_sink=log_sink,
+                                              checkpoint=_checkpointer(run_id), resume=resume,
+                                              cancel_token=run_control.register(run_id), usage=usage)
+        except Exception as e:
+            final_status = _crashed(run_id, log_sink, e)
+        finally:
+            run_control.unregister(run_id)
+        _finish_run(run_id, final_status, spans, usage, resume_from)
         app.logger.info(f"Thread for run {run_id} finished.")
 
+async def run_and_log_async(genome_json, run_id, organism_id, resume_from=None):
+    """Coroutine counterpart of run_and_log, scheduled on the shared engine loop."""
+    app.logger.info(f"Task for run {run_id} started for organism {organism_id}.")
+    spans = []
+    usage = RunUsage()
+    writer = _RunWriter(run_id)
+    log_sink = RunLogSink(on_flush=lambda seq, text: writer.submit(db.append_run_log_chunk, run_id, seq, text))
+    resume = await asyncio.to_thread(db.get_run_checkpoints, resume_from) if resume_from else None
+    try:
+        _, final_status, _ = await run_organism_async(genome_json, run_id, organism_id, trace=spans, log_sink=log_sink,
+                                                      checkpoint=writer.checkpointer(), resume=resume,
+                                                      cancel_token=run_control.register(run_id), usage=usage)
+    except Exception as e:
+        final_status = await asyncio.to_thread(_crashed, run_id, log_sink, e)
+    finally:
+        run_control.unregister(run_id)
+    await writer.close()
+    await asyncio.to_thread(_finish_run, run_id, final_status, spans, usage, resume_from)
+    app.logger.info(f"Task for run {run_id} finished.")
+
+def build_timeline(spans):
+    """
+    Lays out a run's gene spans for the detail page: each entry carries the
+    span plus its bar offset and width as percentages of the run's duration.
+    """
+    if not spans:
+        return []
+    run_start = min(span['started_at'] for span in spans)
+    run_end = max(span['finished_at'] for span in spans)
+    total = max(run_end - run_start, 1e-6)
+    return [{
+        'span': span,
+        'offset_pct': (span['started_at'] - run_start) / total * 100,
+        'width_pct': max((span['finished_at'] - span['started_at']) / total * 100, 0.5),
+    } for span in spans]
+
+def _is_positive_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and value > 0
+
 def validate_genome(genome_json_str):
     """
     Performs a pre-flight validation of the genome JSON.
@@ -78,6 +234,27 @@ def validate_genome(genome_json_str):
         if trigger.get("type") == "schedule" and "cron" not in trigger:
             errors.append("Schedule trigger must specify 'cron'.")
 
+    # Check execution block (optional)
+    if "execution" in genome:
+        execution = genome["execution"]
+        if not isinstance(execution, dict):
+            errors.append("Execution must be a dictionary.")
+        else:
+            if execution.get("mode", "parallel") not in ("parallel", "sequential"):
+                errors.append("Execution 'mode' must be 'parallel' or 'sequential'.")
+            if "max_workers" in execution and (not isinstance(execution["max_workers"], int) or execution["max_workers"] < 1):
+                errors.append("Execution 'max_workers' must be a positive integer.")
+            if "time_budget" in execution and not _is_positive_number(execution["time_budget"]):
+                errors.append("Execution 'time_budget' must be a positive number of seconds.")
+            if "columnar" in execution and not isinstance(execution["columnar"], bool):
+                errors.append("Execution 'columnar' must be true or false.")
+            for limit in ("spill_threshold_mb", "memory_ceiling_mb"):
+                if limit in execution and not (_is_positive_number(execution[limit]) or execution[limit] == 0):
+                    errors.append(f"Execution '{limit}' must be a positive number of megabytes, or 0 to turn it off.")
+            for flag in ("free_dead_outputs", "keep_only_final", "trace_allocations"):
+                if flag in execution and not isinstance(execution[flag], bool):
+                    errors.append(f"Execution '{flag}' must be true or false.")
+
     # Validate each gene in the list
     if "genes" in genome and isinstance(genome["genes"], list):
         gene_ids = set() # Initialize the set here, inside the validation logic for a specific genome
@@ -108,19 +285,100 @@ def validate_genome(genome_json_str):
                 errors.append(f"Gene '{gene_def.get('id', i)}' 'input_from' must be a string.")
             if "output_as" in gene_def and not isinstance(gene_def["output_as"], str):
                 errors.append(f"Gene '{gene_def.get('id', i)}' 'output_as' must be a string.")
+
+            # Check skip_if condition (optional, see conditions.py)
+            if "skip_if" in gene_def:
+                if not isinstance(gene_def["skip_if"], str):
+                    errors.append(f"Gene '{gene_def.get('id', i)}' 'skip_if' must be a string.")
+                else:
+                    try:
+                        compile_condition(gene_def["skip_if"])
+                    except ConditionError as e:
+                        errors.append(f"Gene '{gene_def.get('id', i)}' 'skip_if' is invalid: {e}")
+
+            # Check timeout (optional, seconds)
+            if "timeout" in gene_def and not _is_positive_number(gene_def["timeout"]):
+                errors.append(f"Gene '{gene_def.get('id', i)}' 'timeout' must be a positive number of seconds.")
+
+            # Check final flag (optional, see execution.keep_only_final)
+            if "final" in gene_def and not isinstance(gene_def["final"], bool):
+                errors.append(f"Gene '{gene_def.get('id', i)}' 'final' must be true or false.")
+
+            # Check columnar output (optional)
+            if "columnar" in gene_def and not isinstance(gene_def["columnar"], bool):
+                errors.append(f"Gene '{gene_def.get('id', i)}' 'columnar' must be true or false.")
+
+            # Check executor (optional): "thread" or "process"
+            if "executor" in gene_def and gene_def["executor"] not in ("thread", "process"):
+                errors.append(f"Gene '{gene_def.get('id', i)}' 'executor' must be 'thread' or 'process'.")
+
+            # Check retry policy (optional)
+            if "retry" in gene_def:
+                retry = gene_def["retry"]
+                attempts = retry.get("max_attempts") if isinstance(retry, dict) else None
+                if not isinstance(attempts, int) or isinstance(attempts, bool) or attempts < 1:
+                    errors.append(f"Gene '{gene_def.get('id', i)}' 'retry' must be a dictionary with an integer 'max_attempts' of at least 1.")
+                else:
+                    for field in ("backoff", "max_delay"):
+                        if field in retry and not _is_positive_number(retry[field]):
+                            errors.append(f"Gene '{gene_def.get('id', i)}' retry '{field}' must be a positive number of seconds.")
+                    retry_on = retry.get("retry_on")
+                    if retry_on is not None and (not isinstance(retry_on, list) or not all(isinstance(p, (str, int)) for p in retry_on)):
+                        errors.append(f"Gene '{gene_def.get('id', i)}' retry 'retry_on' must be a list of status codes (e.g. \"429\", \"5xx\") or exception names.")
+
+            # Check cache stanza (optional)
+            if "cache" in gene_def:
+                cache = gene_def["cache"]
+                ttl = cache.get("ttl") if isinstance(cache, dict) else None
+                if not isinstance(ttl, (int, float)) or isinstance(ttl, bool) or ttl <= 0:
+                    errors.append(f"Gene '{gene_def.get('id', i)}' 'cache' must be a dictionary with a positive 'ttl' (seconds).")
+                elif cache.get("scope", "global") not in ("global", "organism"):
+                    errors.append(f"Gene '{gene_def.get('id', i)}' cache 'scope' must be 'global' or 'organism'.")
+
+            # Check coalesce setting (optional): true/false or {"window": seconds}
+            if "coalesce" in gene_def and not isinstance(gene_def["coalesce"], bool):
+                window = gene_def["coalesce"].get("window") if isinstance(gene_def["coalesce"], dict) else None
+                if not isinstance(window, (int, float)) or isinstance(window, bool) or window < 0:
+                    errors.append(f"Gene '{gene_def.get('id', i)}' 'coalesce' must be true, false or a dictionary with a 'window' (seconds).")
+
+            # Check nested gene lists (e.g. ForEach's "genes"), which are validated like a genome's
+            sub_genome = GENE_TRAITS.get(gene_def.get("type"), {}).get("sub_genome")
+            config = gene_def.get("config") if isinstance(gene_def.get("config"), dict) else {}
+            if sub_genome:
+                nested = config.get(sub_genome)
+                if not isinstance(nested, list) or not nested:
+                    errors.append(f"Gene '{gene_def.get('id', i)}' config '{sub_genome}' must be a non-empty list of genes.")
+                else:
+                    nested_errors = validate_genome(json.dumps({"name": gene_def.get("id", str(i)), "genes": nested}))
+                    errors.extend(f"Gene '{gene_def.get('id', i)}' {sub_genome}: {error}" for error in nested_errors)
+            if gene_def.get("type") == "ForEach":
+                concurrency = config.get("max_concurrency")
+                if concurrency is not None and (not isinstance(concurrency, int) or isinstance(concurrency, bool) or concurrency < 1):
+                    errors.append(f"Gene '{gene_def.get('id', i)}' 'max_concurrency' must be a positive integer.")
+                if config.get("on_error", "skip") not in ("skip", "include", "fail"):
+                    errors.append(f"Gene '{gene_def.get('id', i)}' 'on_error' must be 'skip', 'include' or 'fail'.")
+            if gene_def.get("type") in ("FilterNotInSet", "AddToSet"):
+                if not isinstance(config.get("set"), str) or not config.get("set"):
+                    errors.append(f"Gene '{gene_def.get('id', i)}' config 'set' must be a non-empty string naming the set.")
+                if "field" in config and not isinstance(config["field"], str):
+                    errors.append(f"Gene '{gene_def.get('id', i)}' config 'field' must be a string.")
         
     return errors
 
-def trigger_run_in_background(organism_id, genome_json):
-    """Helper to start a run from any context (manual or scheduled)."""
+def trigger_run_in_background(organism_id, genome_json, resume_from=None):
+    """Helper to start a run from any context (manual or scheduled). resume_from is the ID of a failed run to resume."""
     with app.app_context(): # Use context to ensure db calls are safe
-        run_id = db.create_run(organism_id)
+        run_id = db.create_run(organism_id, owner=RUN_OWNER)
         db.update_organism_last_run(organism_id, datetime.now())
 
-        # Run the organism in a new background thread
-        run_thread = threading.Thread(target=run_and_log, args=(genome_json, run_id, organism_id))
-        run_thread.start()
+        if ENGINE_RUNNER == "asyncio":
+            asyncio.run_coroutine_threadsafe(run_and_log_async(genome_json, run_id, organism_id, resume_from), get_engine_loop())
+        else:
+            # Run the organism in a new background thread
+            run_thread = threading.Thread(target=run_and_log, args=(genome_json, run_id, organism_id, resume_from))
+            run_thread.start()
         app.logger.info(f"--- Started background run {run_id} for Organism #{organism_id} ---")
+        return run_id
 
 # --- SCHEDULER HEARTBEAT ---
 @scheduler.task('interval', id='scheduler_heartbeat', seconds=60)
@@ -134,7 +392,8 @@ def check_and_run_organisms():
     
     for organism in organisms:
         try:
-            genome = json.loads(organism['genome_json'])
+            # Compiled plans are cached by genome content, so each heartbeat reuses the parsed genome.
+            genome = compile_genome(organism['genome_json']).genome
             cron_schedule = genome.get('trigger', {}).get('cron')
             
             if not cron_schedule:
@@ -218,9 +477,142 @@ def create():
 def detail(organism_id):
     """Displays the details and run history of a specific organism."""
     organism = db.get_organism_by_id(organism_id)
-    runs = db.get_runs_for_organism(organism_id)
-    return render_template('detail.html', organism=organism, runs=runs)
+    # Logs are not part of the page; each run's log is fetched from run_log when it is opened.
+    runs, next_before = _runs_page(organism_id, request.args.get('before', type=int), RUNS_PAGE_SIZE)
+    spans_by_run = db.get_gene_executions_for_organism(organism_id, run_ids=[run['id'] for run in runs])
+    timelines = {run_id: build_timeline(spans) for run_id, spans in spans_by_run.items()}
+    return render_template('detail.html', organism=organism, runs=runs, timelines=timelines,
+                           log_tail_bytes=LOG_TAIL_BYTES, next_before=next_before,
+                           paged='before' in request.args)
+
+# --- Run history pages ---
+RUNS_PAGE_SIZE = 50
+RUNS_PAGE_MAX = 500
+
+def _runs_page(organism_id, before, limit):
+    """One keyset page of runs, newest first, and the cursor of the next (older) page or None."""
+    runs = db.get_runs_for_organism(organism_id, before=before, limit=limit + 1)
+    if len(runs) > limit:
+        return runs[:limit], runs[limit - 1]['id']
+    return runs, None
+
+@app.route('/api/organisms/<int:organism_id>/runs')
+def api_runs(organism_id):
+    """
+    An organism's runs as JSON, newest first, limit (default RUNS_PAGE_SIZE) at a time.
+    Pass the returned next_before as ?before= to get the next, older page.
+    """
+    limit = request.args.get('limit', RUNS_PAGE_SIZE, type=int)
+    if not 1 <= limit <= RUNS_PAGE_MAX:
+        return jsonify({"error": f"limit must be between 1 and {RUNS_PAGE_MAX}."}), 400
+    if db.get_organism_by_id(organism_id) is None:
+        return jsonify({"error": "Organism not found."}), 404
+    runs, next_before = _runs_page(organism_id, request.args.get('before', type=int), limit)
+    return jsonify({"runs": [dict(run) for run in runs], "next_before": next_before})
+
+# --- Run logs ---
+LOG_TAIL_BYTES = 64 * 1024 # How much of a log the detail page shows before "Full log".
+
+def _log_range(range_header, size):
+    """Parses a single 'bytes=a-b' / 'bytes=a-' / 'bytes=-n' Range header into [start, end), or None if unsatisfiable."""
+    unit, _, spec = range_header.partition('=')
+    first, sep, last = spec.strip().partition('-')
+    if unit.strip() != 'bytes' or not sep or ',' in spec:
+        return None
+    try:
+        if not first:
+            start, end = max(size - int(last), 0), size
+        else:
+            start, end = int(first), min(int(last) + 1, size) if last else size
+    except ValueError:
+        return None
+    return (start, end) if start < end else None
+
+@app.route('/organism/<int:organism_id>/runs/<int:run_id>/log')
+def run_log(organism_id, run_id):
+    """
+    A run's log as plain text. ?tail=N returns only the last N bytes, and a
+    Range header (bytes=a-b, bytes=a-, bytes=-n) returns that slice as a 206.
+    Only the stored chunks overlapping the requested bytes are decompressed.
+    """
+    run = db.get_run(run_id)
+    size = db.get_run_log_size(run_id) if run is not None and run['organism_id'] == organism_id else None
+    if size is None:
+        return Response("No log for this run.\n", status=404, mimetype='text/plain')
+    status, headers = 200, {'Accept-Ranges': 'bytes', 'X-Log-Bytes': str(size)}
+    start, end = 0, size
+    if request.args.get('tail', '').isdigit():
+        start = max(size - int(request.args['tail']), 0)
+    elif request.headers.get('Range'):
+        byte_range = _log_range(request.headers['Range'], size)
+        if byte_range is None:
+            return Response(status=416, headers={'Content-Range': f'bytes */{size}'})
+        (start, end), status = byte_range, 206
+        headers['Content-Range'] = f'bytes {start}-{end - 1}/{size}'
+    data = db.read_run_log(run_id, start, end) if end > start else b''
+    return Response(data, status=status, headers=headers, content_type='text/plain; charset=utf-8')
+
+
+RESUMABLE_STATUSES = ('failed', 'timed_out', 'cancelled')
+
+# Runs are stamped with the process executing them. A 'running' row that no live
+# process executes (e.g. after a restart) can be cancelled directly.
+RUN_OWNER = f"{socket.gethostname()}:{os.getpid()}"
+STALE_RUN_SECONDS = float(os.environ.get("FOUNDRY_STALE_RUN_SECONDS", 24 * 3600))
+
+def _process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+def _is_abandoned(run):
+    """
+    Whether a 'running' row that this process is not executing has been
+    abandoned: its process on this host has exited, or it started more than
+    STALE_RUN_SECONDS ago. A run of this process that has not registered its
+    cancel token yet, or of another live worker, is not.
+    """
+    if run['owner'] == RUN_OWNER:
+        return False
+    host, _, pid = (run['owner'] or '').rpartition(':')
+    if os.name == 'posix' and host == socket.gethostname() and pid.isdigit() and not _process_alive(int(pid)):
+        return True
+    started = datetime.strptime(run['started_timestamp'], '%Y-%m-%d %H:%M:%S').replace(tzinfo=timezone.utc)
+    return (datetime.now(timezone.utc) - started).total_seconds() > STALE_RUN_SECONDS
+
+def _run_action_error(run_id, reason, status_code):
+    """The response of a run action (cancel, resume) that cannot be carried out."""
+    if request.is_json:
+        return jsonify({"run_id": run_id, "error": reason}), status_code
+    return Response(reason + "\n", status=status_code, mimetype='text/plain')
+
+@app.route('/organism/<int:organism_id>/runs/<int:run_id>/cancel', methods=['POST'])
+def cancel_run(organism_id, run_id):
+    """
+    Action to cancel an in-flight run. The engine stops it at the next check
+    (within a fraction of a second) and the run is recorded as 'cancelled'.
+    A run left 'running' by a process that is gone is marked cancelled
+    directly; one executed by another live worker cannot be cancelled here.
+    """
+    run = db.get_run(run_id)
+    if run is None or run['organism_id'] != organism_id:
+        return _run_action_error(run_id, "Run not found for this organism.", 404)
+    cancelled = run_control.cancel(run_id)
+    if not cancelled and run['status'] == 'running' and _is_abandoned(run):
+        cancelled = db.cancel_abandoned_run(run_id)
+    if request.is_json:
+        return jsonify({"run_id": run_id, "cancelled": cancelled}), 202 if cancelled else 409
+    return redirect(url_for('detail', organism_id=organism_id))
 
+@app.route('/metrics')
+def metrics():
+    """Engine metrics as JSON: single-flight dedup rates for fetch genes, gene cache counters and per-organism resource usage."""
+    return jsonify({"coalescing": GENE_FLIGHTS.stats(), "gene_cache": GENE_CACHE.stats(),
+                    "organisms": db.get_resource_usage_by_organism()})
 
 @app.route('/organism/<int:organism_id>/run', methods=['POST'])
 def trigger_run(organism_id):
@@ -229,6 +621,20 @@ def trigger_run(organism_id):
     trigger_run_in_background(organism['id'], organism['genome_json'])
     return redirect(url_for('detail', organism_id=organism_id))
 
+@app.route('/organism/<int:organism_id>/runs/<int:run_id>/resume', methods=['POST'])
+def resume_run(organism_id, run_id):
+    """Action to resume a failed run: starts a new run that restores every gene the failed one completed."""
+    run = db.get_run(run_id)
+    if run is None or run['organism_id'] != organism_id:
+        return _run_action_error(run_id, "Run not found for this organism.", 404)
+    if run['status'] not in RESUMABLE_STATUSES:
+        return _run_action_error(run_id, f"A '{run['status']}' run cannot be resumed.", 409)
+    organism = db.get_organism_by_id(organism_id)
+    new_run_id = trigger_run_in_background(organism['id'], organism['genome_json'], resume_from=run_id)
+    if request.is_json:
+        return jsonify({"run_id": new_run_id, "resumed_from": run_id}), 202
+    return redirect(url_for('detail', organism_id=organism_id))
+
 @app.route('/generate_genome', methods=('GET', 'POST'))
 def generate_genome():
     """Handles generating a new genome from a prompt."""
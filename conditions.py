@@ -0,0 +1,256 @@
+import re
+import functools
+from spill import resolve
+
+# --- skip_if condition language ---
+# A small, safe expression language over the data_context, compiled once into
+# closures (and cached with the genome plan). No eval(): only the constructs
+# below exist.
+#
+#   paths        articles, check.status, results.0.id   (missing -> null)
+#   literals     42, 1.5, "text", 'text', true, false, null (or none), [1, "a"]
+#   comparisons  ==  !=  <  <=  >  >=  in  not in  is null  is not null
+#                is number  is not number
+#   logic        and, or, not, parentheses (short-circuiting)
+#   functions    len(x)   (0 for null)
+#
+# e.g. "len(articles) == 0 or check.condition_met == false"
+#
+# Conditions written for the old evaluator, "key.path == word" with an unquoted
+# word that is not a literal, keep their old meaning: the word is converted to
+# the type of the actual value, so "result.count == 3" and "check.status == ok"
+# behave as before (a string "3" still equals the bare word 3).
+
+
+class ConditionError(ValueError):
+    """Raised when a skip_if condition cannot be parsed."""
+
+
+_TOKEN = re.compile(r"""
+    \s*(?:
+        (?P<number>-?\d+(?:\.\d+)?(?![\w.]))
+      | (?P<string>"(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*')
+      | (?P<name>[A-Za-z_][\w-]*(?:\.[\w-]+)*)
+      | (?P<op>==|!=|<=|>=|<|>|\(|\)|\[|\]|,)
+    )""", re.VERBOSE)
+
+_KEYWORDS = {'and', 'or', 'not', 'in', 'is'}
+_LITERALS = {'true': True, 'false': False, 'null': None, 'none': None}
+_LEGACY = re.compile(r"^\s*([A-Za-z_][\w-]*(?:\.[\w-]+)*)\s*==\s*([^\s'\"\[\]()]+)\s*$")
+
+
+def _tokenize(text):
+    tokens, pos = [], 0
+    text = text.rstrip()
+    while pos < len(text):
+        match = _TOKEN.match(text, pos)
+        if match is None or match.end() == pos:
+            raise ConditionError(f"Unexpected character at position {pos} in condition: {text!r}")
+        kind = match.lastgroup
+        value = match.group(kind)
+        if kind == 'name' and value.lower() in _KEYWORDS | set(_LITERALS):
+            kind, value = ('keyword', value.lower()) if value.lower() in _KEYWORDS else ('literal', _LITERALS[value.lower()])
+        tokens.append((kind, value))
+        pos = match.end()
+    return tokens
+
+
+def _lookup(data, path):
+    value = data
+    for key in path:
+        value = resolve(value)
+        if isinstance(value, dict):
+            value = value.get(key)
+        elif isinstance(value, (list, tuple)) and key.isdigit() and int(key) < len(value):
+            value = value[int(key)]
+        else:
+            return None
+    return resolve(value)
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _ordered(compare):
+    """Wraps an ordering comparison so that null or mismatched types compare false instead of raising."""
+    def safe(left, right):
+        try:
+            return left is not None and right is not None and compare(left, right)
+        except TypeError:
+            return False
+    return safe
+
+
+def _contains(item, container):
+    try:
+        return container is not None and item in container
+    except TypeError:
+        return False
+
+
+_COMPARISONS = {
+    '==': lambda left, right: left == right,
+    '!=': lambda left, right: left != right,
+    '<': _ordered(lambda left, right: left < right),
+    '<=': _ordered(lambda left, right: left <= right),
+    '>': _ordered(lambda left, right: left > right),
+    '>=': _ordered(lambda left, right: left >= right),
+    'in': _contains,
+    'not in': lambda item, container: not _contains(item, container),
+}
+
+
+class _Parser:
+    """Recursive-descent parser that builds a closure over data_context per node."""
+
+    def __init__(self, text):
+        self.text = text
+        self.tokens = _tokenize(text)
+        self.pos = 0
+        self.reads = set()
+
+    def peek(self, offset=0):
+        index = self.pos + offset
+        return self.tokens[index] if index < len(self.tokens) else (None, None)
+
+    def take(self, kind=None, value=None):
+        token = self.peek()
+        if token[0] is None or (kind and token[0] != kind) or (value is not None and token[1] != value):
+            expected = value or kind or "more input"
+            found = token[1] if token[0] is not None else "end of condition"
+            raise ConditionError(f"Expected {expected!r} but found {found!r} in condition: {self.text!r}")
+        self.pos += 1
+        return token
+
+    def accept(self, kind, value):
+        if self.peek() == (kind, value):
+            self.pos += 1
+            return True
+        return False
+
+    def parse(self):
+        node = self.expression()
+        if self.pos != len(self.tokens):
+            raise ConditionError(f"Unexpected {self.peek()[1]!r} in condition: {self.text!r}")
+        return node
+
+    def expression(self):
+        node = self.conjunction()
+        while self.accept('keyword', 'or'):
+            left, right = node, self.conjunction()
+            node = lambda data_context, left=left, right=right: left(data_context) or right(data_context)
+        return node
+
+    def conjunction(self):
+        node = self.negation()
+        while self.accept('keyword', 'and'):
+            left, right = node, self.negation()
+            node = lambda data_context, left=left, right=right: left(data_context) and right(data_context)
+        return node
+
+    def negation(self):
+        if self.accept('keyword', 'not'):
+            operand = self.negation()
+            return lambda data_context: not operand(data_context)
+        return self.comparison()
+
+    def comparison(self):
+        left = self.operand()
+        if self.accept('keyword', 'is'):
+            negate = self.accept('keyword', 'not')
+            kind, value = self.take()
+            if kind == 'literal' and value is None:
+                check = lambda data_context: left(data_context) is None
+            elif kind == 'name' and value == 'number':
+                check = lambda data_context: _is_number(left(data_context))
+            else:
+                raise ConditionError(f"Expected 'null' or 'number' after 'is' in condition: {self.text!r}")
+            return (lambda data_context: not check(data_context)) if negate else check
+
+        kind, op = self.peek()
+        if kind == 'keyword' and op == 'not' and self.peek(1) == ('keyword', 'in'):
+            self.pos += 2
+            op = 'not in'
+        elif (kind == 'op' and op in _COMPARISONS) or (kind == 'keyword' and op == 'in'):
+            self.pos += 1
+        else:
+            return left
+        compare, right = _COMPARISONS[op], self.operand()
+        return lambda data_context: compare(left(data_context), right(data_context))
+
+    def operand(self):
+        kind, value = self.take()
+        if kind == 'number':
+            number = float(value) if '.' in value else int(value)
+            return lambda data_context: number
+        if kind == 'string':
+            text = re.sub(r"\\(.)", r"\1", value[1:-1])
+            return lambda data_context: text
+        if kind == 'literal':
+            return lambda data_context: value
+        if (kind, value) == ('op', '('):
+            node = self.expression()
+            self.take('op', ')')
+            return node
+        if (kind, value) == ('op', '['):
+            items = []
+            while not self.accept('op', ']'):
+                if items:
+                    self.take('op', ',')
+                items.append(self.operand())
+            return lambda data_context: [item(data_context) for item in items]
+        if kind == 'name' and value == 'len' and self.accept('op', '('):
+            argument = self.expression()
+            self.take('op', ')')
+            return lambda data_context: _length(argument(data_context))
+        if kind == 'name':
+            path = tuple(value.split('.'))
+            self.reads.add(path[0])
+            return lambda data_context: _lookup(data_context, path)
+        raise ConditionError(f"Unexpected {value!r} in condition: {self.text!r}")
+
+
+def _length(value):
+    if value is None:
+        return 0
+    try:
+        return len(value)
+    except TypeError:
+        return 0
+
+
+def _compile_legacy(key_path, expected_value_str):
+    """The old "key.path == word" evaluator: the word is converted to the actual value's type."""
+    path = tuple(key_path.split('.'))
+
+    def evaluate(data_context):
+        actual_value = _lookup(data_context, path)
+        if actual_value is None:
+            return False
+        try:
+            expected_value = type(actual_value)(expected_value_str)
+        except (ValueError, TypeError):
+            expected_value = expected_value_str
+        return actual_value == expected_value
+
+    return evaluate, frozenset({path[0]})
+
+
+@functools.lru_cache(maxsize=1024)
+def compile_condition(text):
+    """
+    Compiles a condition into (predicate, reads): predicate(data_context)
+    returns a bool, and reads is the set of top-level data_context keys the
+    condition looks at. Raises ConditionError for malformed conditions.
+    """
+    if not isinstance(text, str) or not text.strip():
+        raise ConditionError("A condition must be a non-empty string.")
+    legacy = _LEGACY.match(text)
+    if legacy and legacy.group(1).lower() not in _KEYWORDS | set(_LITERALS):
+        word = legacy.group(2)
+        if word.lower() not in _LITERALS:
+            return _compile_legacy(legacy.group(1), word)
+    parser = _Parser(text)
+    node = parser.parse()
+    return (lambda data_context: bool(node(data_context))), frozenset(parser.reads)
@@ -1,13 +1,97 @@
+import os
 import sqlite3
-import chromadb
-from chromadb.utils import embedding_functions
+import threading
+import time
+import json
+import zlib
 
-def get_db_connection():
-    """Establishes a connection to the SQLite database."""
-    conn = sqlite3.connect('foundry_new.db')
+# --- Connection pool ---
+# Every helper below (and the organism_state genes) asks get_db_connection()
+# for a connection. Instead of opening a new one per call, each thread reuses
+# one connection, opened once with WAL journaling (readers never block the
+# writer), synchronous=NORMAL, a busy timeout instead of instant
+# "database is locked" errors, and a larger prepared-statement cache.
+# Connections of finished threads are closed as new ones are opened, and
+# close_all() closes the rest when the app shuts down.
+
+DB_PATH = os.environ.get("FOUNDRY_DB_PATH", "foundry_new.db")
+DB_BUSY_TIMEOUT_MS = int(os.environ.get("FOUNDRY_DB_BUSY_TIMEOUT_MS", 5000))
+DB_STATEMENT_CACHE = 256
+
+_local = threading.local()
+_pool = {}  # thread -> (path, sqlite3.Connection)
+_pool_lock = threading.Lock()
+
+
+class PooledConnection:
+    """
+    A thread's pooled connection. It behaves like the sqlite3.Connection it
+    wraps, except that close() only hands it back: uncommitted work is rolled
+    back, and the connection stays open for the thread's next call.
+    """
+    __slots__ = ('_conn',)
+
+    def __init__(self, conn):
+        self._conn = conn
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def __enter__(self):
+        return self._conn.__enter__()
+
+    def __exit__(self, *exc_info):
+        return self._conn.__exit__(*exc_info)
+
+    def close(self):
+        if self._conn.in_transaction:
+            self._conn.rollback()
+
+
+def _connect(path):
+    # The pool guarantees one thread per connection; check_same_thread is off so close_all() may close them.
+    conn = sqlite3.connect(path, timeout=DB_BUSY_TIMEOUT_MS / 1000, check_same_thread=False,
+                           cached_statements=DB_STATEMENT_CACHE)
     conn.row_factory = sqlite3.Row
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    conn.execute(f'PRAGMA busy_timeout={DB_BUSY_TIMEOUT_MS}')
     return conn
 
+
+def get_db_connection():
+    """Returns this thread's pooled connection to the SQLite database, opening it on first use."""
+    pooled = getattr(_local, 'connection', None)
+    if pooled is not None and _local.path == DB_PATH:
+        return pooled
+    conn = _connect(DB_PATH)
+    thread = threading.current_thread()
+    with _pool_lock:
+        stale = [owner for owner in _pool if not owner.is_alive() or owner is thread]
+        for owner in stale:
+            _pool.pop(owner)[1].close()
+        _pool[thread] = (DB_PATH, conn)
+    _local.connection, _local.path = PooledConnection(conn), DB_PATH
+    return _local.connection
+
+
+def close_all():
+    """Closes every pooled connection (called when the app shuts down). Threads reconnect on their next call."""
+    with _pool_lock:
+        connections = [conn for _, conn in _pool.values()]
+        _pool.clear()
+    for conn in connections:
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+    _local.__dict__.pop('connection', None)
+
+
+def pool_size():
+    with _pool_lock:
+        return len(_pool)
+
 def create_tables():
     """Creates the necessary database tables if they don't already exist."""
     conn = get_db_connection()
@@ -28,6 +112,14 @@ def create_tables():
             log_output TEXT,
             started_timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
             finished_timestamp DATETIME,
+            cpu_user_s REAL,
+            cpu_sys_s REAL,
+            peak_rss_delta_bytes INTEGER,
+            alloc_peak_bytes INTEGER,
+            http_requests INTEGER,
+            http_bytes_sent INTEGER,
+            http_bytes_received INTEGER,
+            owner TEXT,
             FOREIGN KEY (organism_id) REFERENCES organisms (id)
         )
     ''')
@@ -40,7 +132,149 @@ def create_tables():
             FOREIGN KEY (organism_id) REFERENCES organisms (id)
         )
     ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS organism_sets (
+            organism_id INTEGER NOT NULL,
+            set_name TEXT NOT NULL,
+            member TEXT NOT NULL,
+            PRIMARY KEY (organism_id, set_name, member),
+            FOREIGN KEY (organism_id) REFERENCES organisms (id)
+        ) WITHOUT ROWID
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS gene_executions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            run_id INTEGER NOT NULL,
+            gene_index INTEGER,
+            gene_id TEXT,
+            gene_type TEXT,
+            status TEXT,
+            started_at REAL,
+            finished_at REAL,
+            wall_ms REAL,
+            cpu_ms REAL,
+            input_items INTEGER,
+            output_items INTEGER,
+            input_bytes INTEGER,
+            output_bytes INTEGER,
+            error_type TEXT,
+            cache TEXT,
+            attempts INTEGER,
+            FOREIGN KEY (run_id) REFERENCES organism_runs (id)
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS run_log_chunks (
+            run_id INTEGER NOT NULL,
+            seq INTEGER NOT NULL,
+            content TEXT NOT NULL,
+            length INTEGER,
+            encoding TEXT,
+            PRIMARY KEY (run_id, seq),
+            FOREIGN KEY (run_id) REFERENCES organism_runs (id)
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS run_checkpoints (
+            run_id INTEGER NOT NULL,
+            gene_index INTEGER NOT NULL,
+            gene_id TEXT,
+            output_key TEXT NOT NULL,
+            value BLOB NOT NULL,
+            definition_hash TEXT,
+            PRIMARY KEY (run_id, gene_index),
+            FOREIGN KEY (run_id) REFERENCES organism_runs (id)
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS gene_cache (
+            key TEXT PRIMARY KEY,
+            expires_at REAL NOT NULL,
+            value TEXT NOT NULL
+        )
+    ''')
     conn.commit()
+    migrate(conn)
+
+def _add_missing_columns(conn, table, columns):
+    """Adds the columns (name -> SQL type) that table does not have yet."""
+    existing = {row['name'] for row in conn.execute(f'PRAGMA table_info({table})')}
+    for name, sql_type in columns.items():
+        if name not in existing:
+            conn.execute(f'ALTER TABLE {table} ADD COLUMN {name} {sql_type}')
+
+# --- Schema migrations ---
+# CREATE TABLE IF NOT EXISTS only covers new databases. Changes to existing
+# ones are numbered migrations, applied in order at startup; the database's
+# PRAGMA user_version records the last one applied. Each migration runs in
+# its own write transaction together with its version bump, so a crash
+# leaves it either applied or not, and two processes starting at once apply
+# it only once. Migrations must be safe on a database that was just created
+# with the current schema (IF NOT EXISTS, _add_missing_columns). Add new ones
+# at the end; never edit or reorder applied ones.
+
+def _migration_1(conn):
+    # Databases created before run resource accounting and span cache/retry details lack these columns.
+    _add_missing_columns(conn, 'organism_runs', {
+        'cpu_user_s': 'REAL', 'cpu_sys_s': 'REAL', 'peak_rss_delta_bytes': 'INTEGER', 'alloc_peak_bytes': 'INTEGER',
+        'http_requests': 'INTEGER', 'http_bytes_sent': 'INTEGER', 'http_bytes_received': 'INTEGER',
+    })
+    _add_missing_columns(conn, 'gene_executions', {'cache': 'TEXT', 'attempts': 'INTEGER'})
+
+def _migration_2(conn):
+    # Run history per organism (newest first), runs by status, spans and expiry sweeps.
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_runs_organism_started ON organism_runs (organism_id, started_timestamp)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_runs_status ON organism_runs (status)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_gene_executions_run ON gene_executions (run_id, gene_index)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_gene_cache_expires ON gene_cache (expires_at)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_organisms_created ON organisms (created_timestamp)')
+
+def _migration_3(conn):
+    # Log chunks record their UTF-8 size (so ranges can be read without decompressing everything) and encoding.
+    _add_missing_columns(conn, 'run_log_chunks', {'length': 'INTEGER', 'encoding': 'TEXT'})
+    conn.execute('UPDATE run_log_chunks SET length = length(CAST(content AS BLOB)) WHERE length IS NULL')
+
+def _migration_4(conn):
+    # Checkpoints record a hash of their gene's definition, so a gene edited before a resume is run again.
+    _add_missing_columns(conn, 'run_checkpoints', {'definition_hash': 'TEXT'})
+
+def _migration_5(conn):
+    # Runs record the "host:pid" of the process executing them, so abandoned 'running' rows can be told apart.
+    _add_missing_columns(conn, 'organism_runs', {'owner': 'TEXT'})
+
+MIGRATIONS = [
+    (1, "resource usage and span columns", _migration_1),
+    (2, "run history indexes", _migration_2),
+    (3, "run log chunk sizes and encoding", _migration_3),
+    (4, "checkpoint definition hashes", _migration_4),
+    (5, "run owners", _migration_5),
+]
+
+def schema_version(conn):
+    return conn.execute('PRAGMA user_version').fetchone()[0]
+
+def migrate(conn=None):
+    """Applies the migrations the database has not seen yet. Returns the versions applied."""
+    conn = conn or get_db_connection()
+    applied = []
+    for version, description, apply in MIGRATIONS:
+        if schema_version(conn) >= version:
+            continue
+        conn.commit()
+        conn.execute('BEGIN IMMEDIATE')  # Take the write lock, then re-check: another process may have won.
+        try:
+            if schema_version(conn) < version:
+                apply(conn)
+                conn.execute(f'PRAGMA user_version = {version}')
+                applied.append(version)
+                print(f"--- Database: applied migration {version} ({description}) ---")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+    if applied:
+        conn.execute('PRAGMA optimize')  # Refresh planner statistics for the new indexes.
+    return applied
 
 def create_organism(name, genome_json):
     """Adds a new organism to the database."""
@@ -60,28 +294,283 @@ def get_organism_by_id(organism_id):
     organism = conn.execute('SELECT * FROM organisms WHERE id = ?', (organism_id,)).fetchone()
     return organism
 
-def create_run(organism_id):
-    """Creates a new run record and returns the run ID."""
+def create_run(organism_id, owner=None):
+    """Creates a new run record and returns the run ID. owner identifies the process executing it ("host:pid")."""
     conn = get_db_connection()
     cursor = conn.cursor()
-    cursor.execute('INSERT INTO organism_runs (organism_id, status) VALUES (?, ?)', (organism_id, 'running'))
+    cursor.execute('INSERT INTO organism_runs (organism_id, status, owner) VALUES (?, ?, ?)', (organism_id, 'running', owner))
     run_id = cursor.lastrowid
     conn.commit()
     return run_id
 
-def update_run(run_id, status, log_output):
-    """Updates a run record with the final status and log."""
+def update_run(run_id, status, log_output=None):
+    """Updates a run record with the final status. A log_output is appended to the run's log chunks (streamed runs pass none)."""
+    conn = get_db_connection()
+    conn.execute('UPDATE organism_runs SET status = ?, finished_timestamp = CURRENT_TIMESTAMP WHERE id = ?',
+                 (status, run_id))
+    if log_output:
+        seq = conn.execute('SELECT COALESCE(MAX(seq) + 1, 0) FROM run_log_chunks WHERE run_id = ?', (run_id,)).fetchone()[0]
+        for start in range(0, len(log_output), LOG_CHUNK_CHARS):
+            _insert_log_chunk(conn, run_id, seq, log_output[start:start + LOG_CHUNK_CHARS])
+            seq += 1
+    conn.commit()
+
+def cancel_abandoned_run(run_id):
+    """Marks a run that is still 'running' as cancelled. Returns False if it has finished in the meantime."""
     conn = get_db_connection()
-    conn.execute('UPDATE organism_runs SET status = ?, log_output = ?, finished_timestamp = CURRENT_TIMESTAMP WHERE id = ?',
-                 (status, log_output, run_id))
+    cursor = conn.execute("UPDATE organism_runs SET status = 'cancelled', finished_timestamp = CURRENT_TIMESTAMP "
+                          "WHERE id = ? AND status = 'running'", (run_id,))
     conn.commit()
+    return cursor.rowcount == 1
 
-def get_runs_for_organism(organism_id):
-    """Retrieves all runs for a specific organism."""
+def get_run(run_id):
+    """Retrieves a single run by its ID."""
     conn = get_db_connection()
-    runs = conn.execute('SELECT * FROM organism_runs WHERE organism_id = ? ORDER BY started_timestamp DESC', (organism_id,)).fetchall()
+    return conn.execute('SELECT * FROM organism_runs WHERE id = ?', (run_id,)).fetchone()
+
+def get_runs_for_organism(organism_id, before=None, limit=None):
+    """
+    Retrieves the runs of an organism, newest first, without their logs
+    (log_bytes is each log's size, see read_run_log). Pages are keyset-based:
+    before=<run id> returns the runs older than that run, and limit caps the
+    page, so every page costs the same however long the history is.
+    """
+    conn = get_db_connection()
+    columns = ', '.join(f'r.{field}' for field in ('id', 'organism_id', 'status', 'started_timestamp',
+                                                     'finished_timestamp') + RUN_USAGE_FIELDS)
+    where, params = 'r.organism_id = ?', [organism_id]
+    if before is not None:
+        # (started_timestamp, id) orders runs that started in the same second.
+        where += ' AND (r.started_timestamp, r.id) < (SELECT started_timestamp, id FROM organism_runs WHERE id = ?)'
+        params.append(before)
+    page = ''
+    if limit is not None:
+        page = 'LIMIT ?'
+        params.append(limit)
+    runs = conn.execute(f'''
+        SELECT {columns},
+               COALESCE((SELECT SUM(c.length) FROM run_log_chunks c WHERE c.run_id = r.id),
+                        length(CAST(r.log_output AS BLOB)), 0) AS log_bytes
+        FROM organism_runs r
+        WHERE {where}
+        ORDER BY r.started_timestamp DESC, r.id DESC
+        {page}
+    ''', params).fetchall()
     return runs
 
+# --- Run logs ---
+# Logs are stored as numbered chunks in run_log_chunks: streamed by RunLogSink
+# while the run executes, or split by update_run. Chunks of at least
+# LOG_COMPRESS_MIN_BYTES are zlib-compressed when that makes them smaller,
+# and each records its UTF-8 length, so a byte range (e.g. the tail of a
+# huge log) is served by decompressing only the chunks it overlaps. Runs
+# from before chunked logs keep their text in organism_runs.log_output.
+
+LOG_CHUNK_CHARS = 64 * 1024
+LOG_COMPRESS_MIN_BYTES = 256
+
+def _insert_log_chunk(conn, run_id, seq, text):
+    data = text.encode('utf-8')
+    content, encoding = text, None
+    if len(data) >= LOG_COMPRESS_MIN_BYTES:
+        packed = zlib.compress(data)
+        if len(packed) < len(data):
+            content, encoding = packed, 'zlib'
+    conn.execute('INSERT OR REPLACE INTO run_log_chunks (run_id, seq, content, length, encoding) VALUES (?, ?, ?, ?, ?)',
+                 (run_id, seq, content, len(data), encoding))
+
+def _chunk_bytes(row):
+    if row['encoding'] == 'zlib':
+        return zlib.decompress(row['content'])
+    content = row['content']
+    return content.encode('utf-8') if isinstance(content, str) else bytes(content)
+
+def append_run_log_chunk(run_id, seq, content):
+    """Stores one chunk of a run's streamed log. Chunks are numbered from 0 per run."""
+    conn = get_db_connection()
+    _insert_log_chunk(conn, run_id, seq, content)
+    conn.commit()
+
+def get_run_log_size(run_id):
+    """The size in bytes of a run's UTF-8 log, or None if the run has no log."""
+    conn = get_db_connection()
+    size = conn.execute('SELECT SUM(length) FROM run_log_chunks WHERE run_id = ?', (run_id,)).fetchone()[0]
+    if size is not None:
+        return size
+    row = conn.execute('SELECT length(CAST(log_output AS BLOB)) FROM organism_runs WHERE id = ?', (run_id,)).fetchone()
+    return row[0] if row else None
+
+def read_run_log(run_id, start=0, end=None):
+    """Bytes [start, end) of a run's UTF-8 log (the whole log by default), or None if the run has no log."""
+    conn = get_db_connection()
+    sizes = conn.execute('SELECT seq, length FROM run_log_chunks WHERE run_id = ? ORDER BY seq', (run_id,)).fetchall()
+    if not sizes:
+        row = conn.execute('SELECT log_output FROM organism_runs WHERE id = ?', (run_id,)).fetchone()
+        if row is None or row['log_output'] is None:
+            return None
+        return row['log_output'].encode('utf-8')[start:end]
+    first = last = None
+    offset = first_offset = 0
+    for row in sizes:
+        if offset + row['length'] > start and (end is None or offset < end):
+            if first is None:
+                first, first_offset = row['seq'], offset
+            last = row['seq']
+        offset += row['length']
+    if first is None:
+        return b''
+    rows = conn.execute('SELECT content, encoding FROM run_log_chunks WHERE run_id = ? AND seq BETWEEN ? AND ? ORDER BY seq',
+                        (run_id, first, last)).fetchall()
+    data = b''.join(_chunk_bytes(row) for row in rows)
+    return data[max(start - first_offset, 0):None if end is None else end - first_offset]
+
+def get_run_log(run_id):
+    """Reassembles a run's whole log as text (or the inline log_output of older runs)."""
+    data = read_run_log(run_id)
+    return data.decode('utf-8') if data is not None else None
+
+GENE_EXECUTION_FIELDS = ('gene_index', 'gene_id', 'gene_type', 'status', 'started_at', 'finished_at',
+                         'wall_ms', 'cpu_ms', 'input_items', 'output_items', 'input_bytes', 'output_bytes',
+                         'error_type', 'cache', 'attempts')
+
+def record_gene_executions(run_id, spans):
+    """Stores the per-gene tracing spans of a run (started_at/finished_at are unix epoch seconds)."""
+    if not spans:
+        return
+    conn = get_db_connection()
+    columns = ', '.join(GENE_EXECUTION_FIELDS)
+    placeholders = ', '.join('?' for _ in GENE_EXECUTION_FIELDS)
+    conn.executemany(f'INSERT INTO gene_executions (run_id, {columns}) VALUES (?, {placeholders})',
+                     [(run_id, *(span.get(field) for field in GENE_EXECUTION_FIELDS)) for span in spans])
+    conn.commit()
+
+RUN_USAGE_FIELDS = ('cpu_user_s', 'cpu_sys_s', 'peak_rss_delta_bytes', 'alloc_peak_bytes',
+                    'http_requests', 'http_bytes_sent', 'http_bytes_received')
+
+def record_run_usage(run_id, usage):
+    """Stores a run's resource usage (a resource_usage.RunUsage.as_dict()) on its organism_runs row."""
+    conn = get_db_connection()
+    assignments = ', '.join(f'{field} = ?' for field in RUN_USAGE_FIELDS)
+    conn.execute(f'UPDATE organism_runs SET {assignments} WHERE id = ?',
+                 (*(usage.get(field) for field in RUN_USAGE_FIELDS), run_id))
+    conn.commit()
+
+def get_resource_usage_by_organism():
+    """Aggregates the recorded resource usage of every organism's runs, most CPU-hungry first."""
+    conn = get_db_connection()
+    rows = conn.execute('''
+        SELECT o.id AS organism_id, o.name,
+               COUNT(r.cpu_user_s) AS runs,
+               SUM(r.cpu_user_s) AS cpu_user_s,
+               SUM(r.cpu_sys_s) AS cpu_sys_s,
+               AVG(r.cpu_user_s + r.cpu_sys_s) AS avg_cpu_s,
+               MAX(r.peak_rss_delta_bytes) AS max_peak_rss_delta_bytes,
+               MAX(r.alloc_peak_bytes) AS max_alloc_peak_bytes,
+               SUM(r.http_requests) AS http_requests,
+               SUM(r.http_bytes_sent) AS http_bytes_sent,
+               SUM(r.http_bytes_received) AS http_bytes_received
+        FROM organisms o
+        JOIN organism_runs r ON r.organism_id = o.id
+        WHERE r.cpu_user_s IS NOT NULL
+        GROUP BY o.id
+        ORDER BY SUM(r.cpu_user_s + r.cpu_sys_s) DESC
+    ''').fetchall()
+    return [dict(row) for row in rows]
+
+def get_gene_executions_for_organism(organism_id, run_ids=None):
+    """Retrieves the tracing spans of all runs of an organism (or only of run_ids), grouped by run ID."""
+    conn = get_db_connection()
+    where, params = 'r.organism_id = ?', [organism_id]
+    if run_ids is not None:
+        where += f' AND ge.run_id IN ({", ".join("?" * len(run_ids))})'
+        params.extend(run_ids)
+    rows = conn.execute(f'''
+        SELECT ge.* FROM gene_executions ge
+        JOIN organism_runs r ON r.id = ge.run_id
+        WHERE {where}
+        ORDER BY ge.run_id, ge.gene_index
+    ''', params).fetchall()
+    spans_by_run = {}
+    for row in rows:
+        spans_by_run.setdefault(row['run_id'], []).append(row)
+    return spans_by_run
+
+def save_run_checkpoint(run_id, gene_index, gene_id, output_key, value, definition_hash=None):
+    """
+    Checkpoints one successful gene's output as zlib-compressed JSON, with the
+    hash of the gene's definition. Each gene is stored once, so checkpointing
+    a run costs the size of its outputs. Raises TypeError for values that are
+    not JSON-serializable.
+    """
+    blob = zlib.compress(json.dumps(value).encode('utf-8'))
+    conn = get_db_connection()
+    conn.execute('INSERT OR REPLACE INTO run_checkpoints (run_id, gene_index, gene_id, output_key, value, definition_hash) '
+                 'VALUES (?, ?, ?, ?, ?, ?)', (run_id, gene_index, gene_id, output_key, blob, definition_hash))
+    conn.commit()
+
+def get_run_checkpoints(run_id):
+    """Returns a run's checkpoints as (gene_index, gene_id, output_key, value, definition_hash) rows in genome order."""
+    conn = get_db_connection()
+    rows = conn.execute('SELECT gene_index, gene_id, output_key, value, definition_hash FROM run_checkpoints '
+                        'WHERE run_id = ? ORDER BY gene_index', (run_id,)).fetchall()
+    return [(row['gene_index'], row['gene_id'], row['output_key'], json.loads(zlib.decompress(row['value'])),
+             row['definition_hash']) for row in rows]
+
+def delete_run_checkpoints(run_id):
+    """Drops a run's checkpoints once they are no longer needed."""
+    conn = get_db_connection()
+    conn.execute('DELETE FROM run_checkpoints WHERE run_id = ?', (run_id,))
+    conn.commit()
+
+def get_gene_cache_entry(key):
+    """Returns (expires_at, value_json) for a persisted gene cache entry, or None."""
+    conn = get_db_connection()
+    row = conn.execute('SELECT expires_at, value FROM gene_cache WHERE key = ?', (key,)).fetchone()
+    return (row['expires_at'], row['value']) if row else None
+
+def put_gene_cache_entry(key, expires_at, value):
+    """Persists a gene cache entry and drops expired ones."""
+    conn = get_db_connection()
+    conn.execute('DELETE FROM gene_cache WHERE expires_at <= ?', (time.time(),))
+    conn.execute('INSERT OR REPLACE INTO gene_cache (key, expires_at, value) VALUES (?, ?, ?)', (key, expires_at, value))
+    conn.commit()
+
+# --- Organism sets ---
+# Named sets of strings per organism (e.g. the IDs an organism has already
+# processed), for the FilterNotInSet and AddToSet genes. Membership checks are
+# primary-key lookups and additions are batched INSERT OR IGNOREs, so a run
+# costs O(its own items) however large the set has grown.
+
+SET_BATCH_SIZE = 500 # Members per IN (...) query, well under SQLite's parameter limit.
+
+def find_set_members(organism_id, set_name, members):
+    """Returns the subset of members that are already in the organism's set."""
+    members = list(dict.fromkeys(members))
+    conn = get_db_connection()
+    found = set()
+    for start in range(0, len(members), SET_BATCH_SIZE):
+        batch = members[start:start + SET_BATCH_SIZE]
+        rows = conn.execute(f'''
+            SELECT member FROM organism_sets
+            WHERE organism_id = ? AND set_name = ? AND member IN ({", ".join("?" * len(batch))})
+        ''', (organism_id, set_name, *batch)).fetchall()
+        found.update(row[0] for row in rows)
+    return found
+
+def add_set_members(organism_id, set_name, members):
+    """Adds members to the organism's set, ignoring ones already there. Returns how many were new."""
+    conn = get_db_connection()
+    before = conn.total_changes
+    conn.executemany('INSERT OR IGNORE INTO organism_sets (organism_id, set_name, member) VALUES (?, ?, ?)',
+                     ((organism_id, set_name, member) for member in members))
+    conn.commit()
+    return conn.total_changes - before
+
+def get_set_size(organism_id, set_name):
+    conn = get_db_connection()
+    return conn.execute('SELECT COUNT(*) FROM organism_sets WHERE organism_id = ? AND set_name = ?',
+                        (organism_id, set_name)).fetchone()[0]
+
 def update_organism_last_run(organism_id, timestamp):
     """Updates the last run timestamp for an organism."""
     conn = get_db_connection()
@@ -89,20 +578,31 @@ def update_organism_last_run(organism_id, timestamp):
     conn.commit()
 
 # --- ChromaDB Vector Store Integration ---
-# Initialize the client. For prototyping, we can use an in-memory or on-disk instance.
-# Using an on-disk instance ensures persistence between runs.
-chroma_client = chromadb.PersistentClient(path="cortex_db/vector_store")
-
-# Use a pre-built sentence transformer for creating embeddings
-# This downloads the model on first use.
-sentence_transformer_ef = embedding_functions.SentenceTransformerEmbeddingFunction(model_name="all-MiniLM-L6-v2")
+# The store is opened on first use, so processes that never touch memory
+# (process-pool workers, which import the genes) neither load the embedding
+# model nor open the on-disk vector store.
+_memory_collection = None
+_memory_lock = threading.Lock()
 
-# Get or create a collection. A collection is like a table in a traditional DB.
-# We pass the embedding function to the collection.
-memory_collection = chroma_client.get_or_create_collection(
-    name="organism_memories",
-    embedding_function=sentence_transformer_ef
-)
+def get_memory_collection():
+    """Returns the organism memory collection, opening the vector store on first use."""
+    global _memory_collection
+    with _memory_lock:
+        if _memory_collection is None:
+            import chromadb
+            from chromadb.utils import embedding_functions
+            # Using an on-disk instance ensures persistence between runs.
+            chroma_client = chromadb.PersistentClient(path="cortex_db/vector_store")
+            # Use a pre-built sentence transformer for creating embeddings
+            # This downloads the model on first use.
+            sentence_transformer_ef = embedding_functions.SentenceTransformerEmbeddingFunction(model_name="all-MiniLM-L6-v2")
+            # Get or create a collection. A collection is like a table in a traditional DB.
+            # We pass the embedding function to the collection.
+            _memory_collection = chroma_client.get_or_create_collection(
+                name="organism_memories",
+                embedding_function=sentence_transformer_ef
+            )
+        return _memory_collection
 
 def save_memory(organism_id, memory_text):
     """Saves a piece of text to an Organism's associative memory."""
@@ -110,7 +610,7 @@ def save_memory(organism_id, memory_text):
     # or a more robust UUID. For now, we'll use a hash of the content.
     memory_id = f"{organism_id}_{hash(memory_text)}"
     
-    memory_collection.add(
+    get_memory_collection().add(
         documents=[memory_text],
         metadatas=[{"organism_id": organism_id}],
         ids=[memory_id]
@@ -119,7 +619,7 @@ def save_memory(organism_id, memory_text):
 
 def query_memory(organism_id, query_text, n_results=3):
     """Queries an Organism's associative memory and returns the most similar results."""
-    results = memory_collection.query(
+    results = get_memory_collection().query(
         query_texts=[query_text],
         n_results=n_results,
         where={"organism_id": str(organism_id)} # Filter memories by organism
@@ -1,106 +1,1393 @@
+import re
 import json
 import copy
 import time
 import schedule
 import io
-import contextlib
-from genes import GENE_MAP
+import os
+import sys
+import collections
+import collections.abc
+import hashlib
+import threading
+import asyncio
+import inspect
+import contextvars
+import concurrent.futures
+import queue
+from genes import GENE_MAP, GENE_TRAITS
+from run_log import log_to, current_log
+from gene_cache import GENE_CACHE, GENE_FLIGHTS, COALESCE_WINDOW, cache_key
+import retry_policy
+from conditions import ConditionError, compile_condition
+from record_batch import RecordBatch, columnar, to_builtin
+from spill import Spiller, SpilledValue, materialized, resolve
+import run_control
+import process_pool
+import resource_usage
+from resource_usage import RunUsage, use_usage
+from run_control import CancelToken, RunCancelled, GeneTimeout, current_token, use_token
 
-def run_organism(genome_json_str, run_id, organism_id, initial_input=None): # <-- Add organism_id here
-    """Executes a workflow defined by a genome JSON string and captures logs."""
-    log_stream = io.StringIO()
-    with contextlib.redirect_stdout(log_stream):
+
+class ContextView(dict):
+    """
+    Read-only snapshot of the data_context handed to a gene.
+
+    Only the top-level mapping is copied; the values are shared with the
+    engine's own context (structural sharing), so taking a snapshot costs
+    O(number of keys) instead of O(size of the data). Genes must treat the
+    values as read-only. A gene that really needs to mutate them opts in to a
+    private deep copy with 'private_context' (in the genome or GENE_TRAITS).
+    """
+    __slots__ = ()
+
+    def _read_only(self, *args, **kwargs):
+        raise TypeError("data_context is read-only inside a gene; return the new value instead.")
+
+    __setitem__ = __delitem__ = __ior__ = _read_only
+    clear = pop = popitem = setdefault = update = _read_only
+
+    # Outputs spilled to disk (see spill.py) are loaded back when a gene reads them.
+    def __getitem__(self, key):
+        return resolve(dict.__getitem__(self, key))
+
+    def get(self, key, default=None):
+        return resolve(dict.get(self, key, default))
+
+    def values(self):
+        return [resolve(value) for value in dict.values(self)]
+
+    def items(self):
+        return [(key, resolve(value)) for key, value in dict.items(self)]
+
+    def __copy__(self):
+        return dict(self.items())
+
+    def __deepcopy__(self, memo):
+        return copy.deepcopy(dict(self.items()), memo)
+
+    def __reduce__(self):
+        return (dict, (dict(self.items()),))
+
+
+def _context_for_gene(data_context, step):
+    """Returns the data_context argument for a gene: a shared snapshot, or a deep copy on opt-in."""
+    if step.private_context:
+        # Lazy streams of fused genes belong to their pipeline and cannot be copied. Spilled
+        # outputs hold an open file; each load() already returns a fresh, private copy.
+        private = {}
+        for key, value in data_context.items():
+            if isinstance(value, SpilledValue):
+                private[key] = value.load()
+            elif not isinstance(value, collections.abc.Iterator):
+                private[key] = copy.deepcopy(value)
+        return private
+    return ContextView(data_context)
+
+
+def _lookup(data, path):
+    """Looks up a pre-split key path in nested dicts, returning None if any step is missing."""
+    value = data
+    for key in path:
+        if isinstance(value, dict):
+            value = resolve(value.get(key))
+        else:
+            return None
+    return value
+
+
+# --- Genome Plans ---
+
+GeneStep = collections.namedtuple('GeneStep', [
+    'index', 'gene_id', 'gene_type', 'function', 'config', 'config_is_flat',
+    'input_from', 'input_path', 'output_key', 'skip_if', 'should_skip',
+    'private_context', 'definition', 'stream_function', 'emits_stream', 'cache', 'coalesce_window',
+    'timeout', 'retry', 'executor', 'columnar', 'keeps_stream',
+])
+GeneStep.__doc__ = "One gene of a compiled genome, with its callable, key paths and skip predicate resolved up front."
+
+CachePolicy = collections.namedtuple('CachePolicy', ['ttl', 'per_organism', 'reads'])
+CachePolicy.__doc__ = "A gene's memoization settings: TTL in seconds, whether entries are per organism, and the extra context keys in its key."
+
+GenomePlan = collections.namedtuple('GenomePlan', ['content_hash', 'genome', 'steps', 'deps', 'gene_map', 'stream_keys',
+                                                   'lifetimes'])
+GenomePlan.__doc__ = "An immutable, reusable execution plan for one genome. Build it with compile_genome()."
+
+PLAN_CACHE_SIZE = 256
+_plan_cache = collections.OrderedDict()
+_plan_cache_lock = threading.Lock()
+
+
+def _compile_step(index, gene_def, execution=None):
+    gene_type = gene_def['type']
+    config = gene_def.get('config') or {}
+    input_from = gene_def.get('input_from')
+    skip_if = gene_def.get('skip_if')
+    return GeneStep(
+        index=index,
+        gene_id=gene_def['id'],
+        gene_type=gene_type,
+        function=GENE_MAP.get(gene_type),
+        config=config,
+        config_is_flat=not any(isinstance(value, (dict, list)) for value in config.values()),
+        input_from=input_from,
+        input_path=tuple(input_from.split('.')) if input_from else None,
+        # If 'output_as' is specified, use it. Otherwise, default to the gene's 'id'.
+        output_key=gene_def.get('output_as', gene_def['id']),
+        skip_if=skip_if,
+        should_skip=compile_condition(skip_if)[0] if skip_if else None,
+        private_context=gene_def.get('private_context', GENE_TRAITS.get(gene_type, {}).get('private_context', False)),
+        definition=gene_def,
+        stream_function=None,
+        emits_stream=False,
+        cache=_cache_policy(gene_def),
+        coalesce_window=_coalesce_window(gene_def),
+        timeout=gene_def.get('timeout'),
+        retry=retry_policy.compile_retry(gene_def.get('retry')),
+        executor=_executor(gene_def, GENE_MAP.get(gene_type)),
+        columnar=gene_def.get('columnar', (execution or {}).get('columnar', False)),
+        keeps_stream=False,
+    )
+
+
+def _coalesce_window(gene_def):
+    """
+    Freshness window in seconds for sharing identical calls of a 'coalesce'
+    gene (see gene_cache.SingleFlight), or None. Genomes tune it per gene with
+    "coalesce": {"window": seconds} or turn it off with "coalesce": false.
+    """
+    if not GENE_TRAITS.get(gene_def['type'], {}).get('coalesce'):
+        return None
+    setting = gene_def.get('coalesce', True)
+    if setting is False:
+        return None
+    if isinstance(setting, dict):
+        return setting.get('window', COALESCE_WINDOW)
+    return COALESCE_WINDOW
+
+
+def _cache_policy(gene_def):
+    """
+    Compiles a gene's "cache": {"ttl": seconds, "scope": "organism"} stanza.
+    Genes that may read any context key cannot be keyed, so they never cache.
+    """
+    cache = gene_def.get('cache')
+    if not isinstance(cache, dict) or not cache.get('ttl'):
+        return None
+    reads = _gene_reads({'type': gene_def['type'], 'config': gene_def.get('config')})
+    if reads is None:
+        return None
+    return CachePolicy(ttl=cache['ttl'], per_organism=cache.get('scope') == 'organism', reads=tuple(sorted(reads)))
+
+
+def _executor(gene_def, function):
+    """
+    'process' if the gene asked for the process pool, 'auto' if its traits
+    suggest it (used for large inputs only), or None to run in-thread.
+    """
+    requested = gene_def.get('executor')
+    if requested == 'thread':
+        return None
+    mode = 'process' if requested == 'process' else None
+    if mode is None and GENE_TRAITS.get(gene_def['type'], {}).get('executor') == 'process':
+        mode = 'auto'
+    if mode and not process_pool.runs_in_process(gene_def['type'], function):
+        return None  # Workers can only run genes registered in genes.GENE_MAP.
+    return mode
+
+
+def _stream_form(gene_def, function):
+    """Returns a gene's generator form (see genes.py 'Streaming forms'), or None if it has none or opted out."""
+    stream = getattr(function, 'stream', None)
+    if not inspect.isfunction(stream) or gene_def.get('stream') is False or gene_def.get('cache'):
+        return None
+    if gene_def.get('executor') == 'process':
+        return None  # Workers need the whole input to pickle and chunk.
+    if gene_def.get('retry'):
+        return None  # A stream can only be consumed once, so a retried attempt could not replay it.
+    if gene_def.get('timeout'):
+        return None  # A fused gene runs inside the next one, so its own deadline could not be enforced.
+    if _coalesce_window(gene_def) is not None:
+        return None  # A shared call needs a concrete result to hand out, not a one-shot generator.
+    return stream
+
+
+def _stream_links(genome, steps):
+    """
+    Finds genes whose output can be streamed straight into the next gene.
+
+    Returns {producer index: consumer index} for pairs where both genes have a
+    generator form, the consumer takes the producer's whole output as
+    input_from, is not conditional, and nothing else reads or rewrites that
+    key. Chains of such pairs run as one lazy pipeline: items flow through one
+    at a time. Genomes opt in with "execution": {"streaming": true}.
+    """
+    if genome.get('execution', {}).get('streaming') is not True:
+        return {}
+    genes = genome['genes']
+    reads = [_gene_reads(gene_def) for gene_def in genes]
+    links = {}
+    for producer in steps:
+        key = producer.output_key
+        if key == 'initial_input' or not _stream_form(producer.definition, producer.function):
+            continue
+        later = range(producer.index + 1, len(steps))
+        if any(steps[j].output_key == key for j in later):
+            continue
+        readers = [j for j in later if reads[j] is None or key in reads[j]]
+        if len(readers) != 1:
+            continue
+        consumer = steps[readers[0]]
+        if (reads[consumer.index] is None or consumer.input_from != key or consumer.skip_if
+                or not _stream_form(consumer.definition, consumer.function)
+                or key in _gene_reads({**consumer.definition, 'input_from': None})):
+            continue
+        links[producer.index] = consumer.index
+    return links
+
+
+def compile_genome(genome_json_str):
+    """
+    Returns the execution plan for a genome JSON string, compiling it on first use.
+
+    With "execution": {"streaming": true}, consecutive item-wise genes are
+    fused into lazy pipelines (see _stream_links). Plans are cached by the SHA-256 of the genome text, so repeated runs of the
+    same organism (scheduler heartbeats, manual triggers) skip JSON parsing,
+    GENE_MAP resolution, path splitting and skip_if parsing. A cached plan is
+    only reused while GENE_MAP is the same registry it was resolved against.
+    Raises json.JSONDecodeError for malformed genomes and
+    conditions.ConditionError for malformed skip_if conditions.
+    """
+    content_hash = hashlib.sha256(genome_json_str.encode('utf-8')).hexdigest()
+    with _plan_cache_lock:
+        plan = _plan_cache.get(content_hash)
+        if plan is not None and plan.gene_map is GENE_MAP:
+            _plan_cache.move_to_end(content_hash)
+            return plan
+
+    genome = json.loads(genome_json_str)
+    genes = genome['genes']
+    steps = [_compile_step(i, gene_def, genome.get('execution')) for i, gene_def in enumerate(genes)]
+    links = _stream_links(genome, steps)
+    lifetimes = _lifetimes(genome, genes)
+    released = {key for key, _ in lifetimes or ()}
+    for index in set(links) | set(links.values()):
+        step = steps[index]
+        steps[index] = step._replace(
+            stream_function=_stream_form(step.definition, step.function),
+            emits_stream=index in links,
+            # Outputs the run returns are collected as they stream past; only released ones cost no memory.
+            keeps_stream=index in links and step.output_key not in released,
+        )
+    plan = GenomePlan(
+        content_hash=content_hash,
+        genome=genome,
+        steps=tuple(steps),
+        deps=tuple(frozenset(d) for d in _build_dependencies(genes)),
+        gene_map=GENE_MAP,
+        stream_keys=tuple(steps[index].output_key for index in sorted(links)),
+        lifetimes=lifetimes,
+    )
+    with _plan_cache_lock:
+        _plan_cache[content_hash] = plan
+        _plan_cache.move_to_end(content_hash)
+        while len(_plan_cache) > PLAN_CACHE_SIZE:
+            _plan_cache.popitem(last=False)
+    return plan
+
+
+def _prepare_call(step, data_context, run_id, organism_id):
+    """Builds a gene's (config, input_data, data_context) arguments."""
+    if not step.function:
+        raise Exception(f"Gene type '{step.gene_type}' not found in GENE_MAP.")
+
+    contextual_config = dict(step.config) if step.config_is_flat else copy.deepcopy(step.config)
+    contextual_config['organism_id'] = organism_id
+    contextual_config['run_id'] = run_id
+
+    if step.input_path:
+        print(f"  -> Input: Reading from '{step.input_from}' in data_context.")
+        input_data = _lookup(data_context, step.input_path)
+    else:
+        input_data = None
+
+    return contextual_config, input_data, _context_for_gene(data_context, step)
+
+
+def _cached_output(step, args, data_context, span):
+    """
+    Looks a cached gene up in GENE_CACHE. Returns (key, hit, output); key is
+    None when the gene does not cache.
+    """
+    if step.cache is None:
+        return None, False, None
+    config, input_data, _ = args
+    context_values = {key: resolve(data_context.get(key)) for key in step.cache.reads}
+    key = cache_key(step.gene_type, config, input_data, context_values, step.cache.per_organism)
+    hit, output_data = GENE_CACHE.get(key)
+    span["cache"] = "hit" if hit else "miss"
+    if hit:
+        print(f"  -> Cache hit: reusing a stored '{step.gene_type}' result.")
+    return key, hit, output_data
+
+
+def _cache_store(step, key, output_data):
+    # Genes such as GenericAPI report failures as {"error": ...}; those are not worth keeping.
+    if isinstance(output_data, dict) and "error" in output_data:
+        return
+    GENE_CACHE.put(key, output_data, step.cache.ttl)
+
+
+def _report_cache(spans):
+    """Prints the run's gene cache hit/miss counters, if any gene used the cache."""
+    hits = sum(1 for span in spans if span.get("cache") == "hit")
+    misses = sum(1 for span in spans if span.get("cache") == "miss")
+    if hits or misses:
+        print(f"--- Gene cache: {hits} hits, {misses} misses ---")
+
+
+def _gene_callable(step, span):
+    """
+    The callable to run for a step: the gene itself, its generator form inside
+    a fused pipeline, or a single-flight wrapper for coalescing genes.
+    """
+    if step.stream_function is not None:
+        return lambda config, items, context: _call_stream(step, span, config, items, context)
+    if step.coalesce_window is not None:
+        return lambda config, items, context: _call_coalesced(step, config, items, context)
+    if step.executor is not None:
+        return lambda config, input_data, context: _call_in_process(step, span, config, input_data, context)
+    return step.function
+
+
+def _call_in_process(step, span, config, input_data, context):
+    """
+    Runs a CPU-bound gene on the process pool, sending only the context keys it
+    reads. Trait-selected ('auto') genes stay in-thread for small inputs.
+    """
+    size = len(input_data) if isinstance(input_data, (list, RecordBatch)) else None
+    if step.executor == 'auto' and (size is None or size < process_pool.PROCESS_MIN_ITEMS):
+        return step.function(config, input_data, context)
+
+    reads = _gene_reads(step.definition)
+    context = dict(context.items()) if reads is None else {key: context.get(key) for key in reads if key in context}
+    chunk_size = process_pool.PROCESS_CHUNK_SIZE if GENE_TRAITS.get(step.gene_type, {}).get('chunkable') else None
+    chunks = -(-size // chunk_size) if chunk_size and size else 1
+    print(f"  -> Running in the process pool ({chunks} chunk{'s' if chunks != 1 else ''}).")
+    output_data, cpu_seconds = process_pool.run_gene(step.gene_type, config, input_data, context, chunk_size)
+    span["_worker_cpu"] = cpu_seconds
+    return output_data
+
+
+def _call_coalesced(step, config, input_data, context):
+    """Runs a fetch gene through GENE_FLIGHTS so identical calls across organisms share one request."""
+    key = cache_key(step.gene_type, config, input_data)
+    output_data, shared = GENE_FLIGHTS.do(key, lambda: step.function(config, input_data, context),
+                                          step.coalesce_window, label=step.gene_type)
+    if shared:
+        print(f"  -> Coalesced with an identical '{step.gene_type}' call; reusing its result.")
+    return output_data
+
+
+def _call_stream(step, span, config, items, context):
+    """
+    Runs a fused gene's generator form. A producer hands on a lazy, counted
+    iterator (its items are pulled later by the next gene); the last gene of
+    the pipeline drains it into a list.
+    """
+    stream = step.stream_function(config, items if items is not None else (), context)
+    if not step.emits_stream:
+        return list(stream)
+    span["output_items"] = 0
+    stream = _counted(step, span, stream)
+    return _KeptStream(stream) if step.keeps_stream else stream
+
+
+def _counted(step, span, stream):
+    """Passes items through, counting them on the producer's span and attributing errors to it."""
+    try:
+        for item in stream:
+            span["output_items"] += 1
+            yield item
+    except Exception as e:
+        span["status"], span["error_type"] = "failed", type(e).__name__
+        raise Exception(f"streamed gene '{step.gene_id}' failed: {e}") from e
+
+
+class _KeptStream(collections.abc.Iterator):
+    """A fused producer's stream that also keeps the items passing through, so the run can return its output."""
+
+    def __init__(self, stream):
+        self._stream = stream
+        self.items = []
+        self.done = False
+
+    def __next__(self):
+        try:
+            item = next(self._stream)
+        except StopIteration:
+            self.done = True
+            raise
+        self.items.append(item)
+        return item
+
+
+def _finish_streams(plan, data_context):
+    """
+    Replaces the spent iterators of fused genes with the items they produced,
+    as the list forms would have stored them. Streams that were not kept, or
+    were cut short by a failure, are removed.
+    """
+    for key in plan.stream_keys:
+        stream = data_context.pop(key, None)
+        if isinstance(stream, _KeptStream) and stream.done:
+            data_context[key] = stream.items
+
+
+# --- Tracing ---
+
+def _approx_size(value, _depth=0):
+    """
+    Cheap estimate of a value's in-memory size in bytes. Large lists are
+    sampled and extrapolated rather than walked item by item. Lazy streams
+    have no size until they are drained, so they return None.
+    """
+    if _depth == 0 and isinstance(value, collections.abc.Iterator):
+        return None
+    if isinstance(value, RecordBatch):
+        return value.nbytes
+    size = sys.getsizeof(value)
+    if _depth > 4:
+        return size
+    if isinstance(value, dict):
+        items = list(value.items())
+        sample = items[:50]
+        sampled = sum(_approx_size(k, _depth + 1) + _approx_size(v, _depth + 1) for k, v in sample)
+        return size + (sampled * len(items) // len(sample) if sample else 0)
+    if isinstance(value, (list, tuple, set)):
+        items = value if isinstance(value, (list, tuple)) else list(value)
+        sample = items[:50]
+        sampled = sum(_approx_size(item, _depth + 1) for item in sample)
+        return size + (sampled * len(items) // len(sample) if sample else 0)
+    return size
+
+
+def _count_items(value):
+    """Number of items a gene consumed or produced: list length, 1 for a single value, 0 for None."""
+    if value is None:
+        return 0
+    if isinstance(value, collections.abc.Iterator):
+        return None
+    if isinstance(value, (list, tuple, set, RecordBatch)):
+        return len(value)
+    return 1
+
+
+def _start_span(step):
+    return {
+        "gene_index": step.index,
+        "gene_id": step.gene_id,
+        "gene_type": step.gene_type,
+        "status": None,
+        "started_at": time.time(),
+        "finished_at": None,
+        "wall_ms": None,
+        "cpu_ms": None,
+        "input_items": None,
+        "output_items": None,
+        "input_bytes": None,
+        "output_bytes": None,
+        "error_type": None,
+        "cache": None,
+        "attempts": None,
+        "_perf_start": time.perf_counter(),
+    }
+
+
+def _finish_span(span, status, output_data=None, error=None):
+    span["status"] = status
+    span["finished_at"] = time.time()
+    span["wall_ms"] = (time.perf_counter() - span.pop("_perf_start")) * 1000
+    if status == "success" and not isinstance(output_data, collections.abc.Iterator):
+        span["output_items"] = _count_items(output_data)
+        span["output_bytes"] = _approx_size(output_data)
+    if error is not None:
+        span["error_type"] = type(error).__name__
+    return span
+
+
+def _print_output(step):
+    if step.emits_stream:
+        print(f"  <- Output: Streaming items into the next gene via '{step.output_key}'.")
+    else:
+        print(f"  <- Output: Storing result in '{step.output_key}' in data_context.")
+
+
+# --- Timeouts and Cancellation ---
+
+# How often a wait on a gene wakes up to check for cancellation, in seconds.
+CANCEL_POLL_INTERVAL = 0.1
+
+# Statuses that stop a run; the first one reached becomes the run's status.
+FAILURE_STATUSES = ("failed", "timed_out", "cancelled")
+
+# Most threads that may run time-limited gene calls at once, including calls abandoned on timeout/cancel.
+LIMITED_CALL_THREADS = int(os.environ.get("FOUNDRY_LIMITED_CALL_THREADS", 64))
+
+
+def _check_limits(timeout, deadline, token):
+    if token is not None:
+        token.check()
+    if deadline is not None and time.monotonic() >= deadline:
+        raise GeneTimeout(f"Gene exceeded its timeout of {timeout}s.")
+
+
+class _CallThreads:
+    """
+    Bounded set of reusable daemon threads for time-limited gene calls. A
+    thread goes back to waiting for work when its call returns, even if the
+    caller gave up on it. At most limit threads exist; submit() returns False
+    when every one of them is busy.
+    """
+
+    def __init__(self, limit):
+        self.limit = limit
+        self._tasks = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        self._threads = 0
+        self._idle = 0
+
+    def submit(self, task):
+        with self._lock:
+            if self._idle:
+                self._idle -= 1
+            elif self._threads < self.limit:
+                self._threads += 1
+                threading.Thread(target=self._work, name="gene-call", daemon=True).start()
+            else:
+                return False
+        self._tasks.put(task)
+        return True
+
+    def _work(self):
+        while True:
+            self._tasks.get()()
+            with self._lock:
+                self._idle += 1
+
+    def stats(self):
+        with self._lock:
+            return {"threads": self._threads, "idle": self._idle}
+
+
+_call_threads = _CallThreads(LIMITED_CALL_THREADS)
+
+
+def _call_limited(function, args, timeout, token):
+    """
+    Calls function(*args), giving up when the gene's timeout passes or the
+    run's token is cancelled. Returns (result, cpu_seconds).
+
+    Python threads cannot be killed, so a limited gene runs on one of the
+    _call_threads and is abandoned there on timeout or cancel; the caller (a
+    pool worker or the run's own thread) is freed straight away and the
+    abandoned call's result is discarded whenever it returns. If all
+    LIMITED_CALL_THREADS are taken (e.g. by hung, abandoned calls), the gene
+    runs on the caller's thread and its limits are checked once it returns.
+    """
+    if timeout is None and token is None:
+        cpu_start = time.thread_time()
+        result = _call_measured(function, args)
+        return result, time.thread_time() - cpu_start
+
+    outcome = {}
+    done = threading.Event()
+    context = contextvars.copy_context()
+
+    def target():
+        cpu_start = time.thread_time()
+        try:
+            outcome['result'] = context.run(_call_measured, function, args)
+        except BaseException as e:
+            outcome['error'] = e
+        finally:
+            outcome['cpu'] = time.thread_time() - cpu_start
+            done.set()
+
+    deadline = time.monotonic() + timeout if timeout is not None else None
+    if not _call_threads.submit(target):
+        print(f"  -> Warning: all {_call_threads.limit} gene-call threads are busy; running in this thread, "
+              f"so the timeout cannot interrupt it.")
+        target()
+        _check_limits(timeout, deadline, token)
+    while True:
+        wait = CANCEL_POLL_INTERVAL if deadline is None else min(CANCEL_POLL_INTERVAL, max(deadline - time.monotonic(), 0))
+        if done.wait(wait):
+            break
+        _check_limits(timeout, deadline, token)
+    if 'error' in outcome:
+        raise outcome['error']
+    return outcome['result'], outcome['cpu']
+
+
+def _call_measured(function, args):
+    """Calls function(*args), adding the thread's CPU time to the run's resource usage."""
+    with resource_usage.measured_cpu():
+        return function(*args)
+
+
+async def _await_limited(awaitable, timeout, token):
+    """Async counterpart of _call_limited: awaits awaitable within the gene's timeout and the run's token."""
+    if timeout is None and token is None:
+        return await awaitable
+    task = asyncio.ensure_future(awaitable)
+    deadline = time.monotonic() + timeout if timeout is not None else None
+    while True:
+        wait = CANCEL_POLL_INTERVAL if deadline is None else min(CANCEL_POLL_INTERVAL, max(deadline - time.monotonic(), 0))
+        done, _ = await asyncio.wait({task}, timeout=wait)
+        if done:
+            return task.result()
+        try:
+            _check_limits(timeout, deadline, token)
+        except RunCancelled:
+            task.cancel()
+            raise
+
+
+def _retry_wait(step, attempt, error=None, output=None):
+    """
+    Decides whether a failed attempt of a gene with a retry policy is tried
+    again. Returns the backoff delay in seconds, or None to give up (re-raise
+    the error or keep the result).
+    """
+    policy = step.retry
+    if policy is None or attempt >= policy.max_attempts:
+        return None
+    if error is not None:
+        if not retry_policy.should_retry(policy, error):
+            return None
+        reason, retry_after = f"{type(error).__name__}: {error}", retry_policy.retry_after_of(error)
+    else:
+        status = retry_policy.retryable_status(policy, output)
+        if status is None:
+            return None
+        reason, retry_after = f"status {status}", retry_policy.retry_after_of(output=output)
+    delay = retry_policy.backoff_delay(policy, attempt, retry_after)
+    print(f"  -> Attempt {attempt}/{policy.max_attempts} failed ({reason}); retrying in {delay:.1f}s.")
+    return delay
+
+
+def _call_with_retries(step, span, args, token):
+    """
+    Calls a gene within its timeout, retrying failed attempts as its retry
+    policy allows. Records the number of attempts on the span. Returns
+    (result, cpu_seconds).
+    """
+    function = _gene_callable(step, span)
+    attempt = 1
+    while True:
+        span["attempts"] = attempt
+        try:
+            output_data, cpu_seconds = _call_limited(function, args, step.timeout, token)
+            delay = _retry_wait(step, attempt, output=output_data) if step.retry else None
+            if delay is None:
+                return output_data, cpu_seconds
+        except RunCancelled:
+            raise
+        except Exception as e:
+            delay = _retry_wait(step, attempt, error=e)
+            if delay is None:
+                raise
+        run_control.sleep(delay, token)
+        attempt += 1
+
+
+async def _call_with_retries_async(step, span, args, token, executor):
+    """Async counterpart of _call_with_retries. cpu_seconds is None for async genes."""
+    attempt = 1
+    while True:
+        span["attempts"] = attempt
+        try:
+            if inspect.iscoroutinefunction(step.function):
+                # CPU time is not attributable to one coroutine on a shared loop.
+                output_data, cpu_seconds = await _await_limited(step.function(*args), step.timeout, token), None
+            else:
+                call = asyncio.get_running_loop().run_in_executor(
+                    executor, contextvars.copy_context().run, _call_logged, current_log(), _gene_callable(step, span), args
+                )
+                output_data, cpu_seconds = await _await_limited(call, step.timeout, token)
+            delay = _retry_wait(step, attempt, output=output_data) if step.retry else None
+            if delay is None:
+                return output_data, cpu_seconds
+        except RunCancelled:
+            raise
+        except Exception as e:
+            delay = _retry_wait(step, attempt, error=e)
+            if delay is None:
+                raise
+        await _await_limited(asyncio.sleep(delay), None, token)
+        attempt += 1
+
+
+def _run_token(plan, cancel_token):
+    """
+    The CancelToken for a run: the caller's, else the enclosing run's (so a
+    sub-organism stops with its parent). The genome's "execution":
+    {"time_budget": seconds} adds a wall-clock deadline on top.
+    """
+    token = cancel_token or current_token()
+    budget = plan.genome.get('execution', {}).get('time_budget')
+    if budget:
+        token = CancelToken(deadline=time.monotonic() + budget, parent=token)
+    return token
+
+
+def _run_step(step, data_context, run_id, organism_id):
+    """
+    Evaluates skip_if and executes a single gene against data_context.
+    Returns (status, output_key, output_data, span) where status is 'success',
+    'skipped', 'failed', 'timed_out' or 'cancelled' and span is the gene's
+    tracing record.
+    """
+    span = _start_span(step)
+    token = current_token()
+    if step.should_skip and step.should_skip(data_context):
+        print(f"Skipping gene '{step.gene_id}' due to condition: {step.skip_if}")
+        return "skipped", step.output_key, None, _finish_span(span, "skipped")
+
+    print(f"[Executing Gene] ID: {step.gene_id}, Type: {step.gene_type}")
+    try:
+        if token is not None:
+            token.check()
+        args = _prepare_call(step, data_context, run_id, organism_id)
+        span["input_items"], span["input_bytes"] = _count_items(args[1]), _approx_size(args[1])
+        key, hit, output_data = _cached_output(step, args, data_context, span)
+        if not hit:
+            with resource_usage.allocations(span):
+                output_data, cpu_seconds = _call_with_retries(step, span, args, token)
+            if step.columnar:
+                output_data = columnar(output_data)
+            span["cpu_ms"] = (cpu_seconds + span.pop("_worker_cpu", 0)) * 1000
+            if key is not None:
+                _cache_store(step, key, output_data)
+        _print_output(step)
+        return "success", step.output_key, output_data, _finish_span(span, "success", output_data)
+    except RunCancelled as e:
+        print(f"  **{e.status.upper()}** gene '{step.gene_id}' stopped: {e}")
+        return e.status, step.output_key, None, _finish_span(span, e.status, error=e)
+    except Exception as e:
+        print(f"  **ERROR** during execution of gene '{step.gene_id}': {e}")
+        return "failed", step.output_key, None, _finish_span(span, "failed", error=e)
+
+
+async def _run_step_async(step, data_context, run_id, organism_id, executor):
+    """Async counterpart of _run_step: awaits async genes, runs sync genes on executor."""
+    span = _start_span(step)
+    token = current_token()
+    if step.should_skip and step.should_skip(data_context):
+        print(f"Skipping gene '{step.gene_id}' due to condition: {step.skip_if}")
+        return "skipped", step.output_key, None, _finish_span(span, "skipped")
+
+    print(f"[Executing Gene] ID: {step.gene_id}, Type: {step.gene_type}")
+    try:
+        if token is not None:
+            token.check()
+        args = _prepare_call(step, data_context, run_id, organism_id)
+        span["input_items"], span["input_bytes"] = _count_items(args[1]), _approx_size(args[1])
+        key, hit, output_data = _cached_output(step, args, data_context, span)
+        if not hit:
+            with resource_usage.allocations(span):
+                output_data, cpu_seconds = await _call_with_retries_async(step, span, args, token, executor)
+            if step.columnar:
+                output_data = columnar(output_data)
+            if cpu_seconds is not None:
+                span["cpu_ms"] = (cpu_seconds + span.pop("_worker_cpu", 0)) * 1000
+            if key is not None:
+                _cache_store(step, key, output_data)
+        _print_output(step)
+        return "success", step.output_key, output_data, _finish_span(span, "success", output_data)
+    except RunCancelled as e:
+        print(f"  **{e.status.upper()}** gene '{step.gene_id}' stopped: {e}")
+        return e.status, step.output_key, None, _finish_span(span, e.status, error=e)
+    except Exception as e:
+        print(f"  **ERROR** during execution of gene '{step.gene_id}': {e}")
+        return "failed", step.output_key, None, _finish_span(span, "failed", error=e)
+
+
+# --- Dependency Graph ---
+
+_TEMPLATE = re.compile(r"\{\{([^}]+)\}\}")
+
+
+def _template_reads(value):
+    """Top-level data_context keys named by {{key.path}} templates anywhere in a config value."""
+    if isinstance(value, str):
+        return {match.strip().split('.')[0] for match in _TEMPLATE.findall(value)}
+    reads = set()
+    if isinstance(value, dict):
+        value = value.values()
+    if isinstance(value, (list, tuple, collections.abc.ValuesView)):
+        for item in value:
+            reads |= _template_reads(item)
+    return reads
+
+
+def _gene_reads(gene_def):
+    """
+    Returns the set of top-level data_context keys a gene reads, or None if it
+    may read anything (its dependencies cannot be known statically).
+    """
+    traits = GENE_TRAITS.get(gene_def['type'], {})
+    if traits.get('reads_context'):
+        return None
+
+    config = gene_def.get('config') or {}
+    # A nested gene list runs against its own context, so its templates are not reads of this one.
+    reads = _template_reads({field: value for field, value in config.items() if field != traits.get('sub_genome')})
+    if gene_def.get('input_from'):
+        reads.add(gene_def['input_from'].split('.')[0])
+    if gene_def.get('skip_if'):
+        reads.update(compile_condition(gene_def['skip_if'])[1])
+
+    for field in traits.get('context_keys', []):
+        value = config.get(field)
+        if isinstance(value, str):
+            reads.add(value)
+        elif isinstance(value, list):
+            reads.update(key for key in value if isinstance(key, str))
+    return reads
+
+
+def _is_stateful(gene_def):
+    """Whether a gene has the 'stateful' trait, or runs a nested gene list (see 'sub_genome') with a stateful gene."""
+    traits = GENE_TRAITS.get(gene_def.get('type'), {})
+    if traits.get('stateful'):
+        return True
+    nested = (gene_def.get('config') or {}).get(traits.get('sub_genome')) if traits.get('sub_genome') else None
+    return isinstance(nested, list) and any(isinstance(inner, dict) and _is_stateful(inner) for inner in nested)
+
+
+def _lifetimes(genome, genes):
+    """
+    Liveness of data_context keys, for genomes that opt in with
+    "execution": {"free_dead_outputs": true} or {"keep_only_final": true}.
+    Returns (key, holders) pairs: once every gene in holders (the genes that
+    read or write the key) is done, the key can be released. Returns None
+    when the genome keeps every output.
+
+    free_dead_outputs releases keys that later genes read (intermediate
+    results such as raw fetched articles); outputs nobody reads are kept.
+    keep_only_final also releases those, keeping only the outputs of genes
+    marked "final": true.
+    """
+    execution = genome.get('execution') or {}
+    keep_only_final = execution.get('keep_only_final', False)
+    if not (keep_only_final or execution.get('free_dead_outputs', False)):
+        return None
+
+    holders = {"initial_input": set()}
+    read = set()
+    final = set()
+    for i, gene_def in enumerate(genes):
+        reads = _gene_reads(gene_def)
+        # A gene that may read anything holds every key that exists before it.
+        for key in (holders if reads is None else reads):
+            holders.setdefault(key, set()).add(i)
+            read.add(key)
+        output_key = gene_def.get('output_as', gene_def['id'])
+        holders.setdefault(output_key, set()).add(i)
+        if gene_def.get('final'):
+            final.add(output_key)
+
+    return tuple(
+        (key, frozenset(indices)) for key, indices in holders.items()
+        if key not in final and (keep_only_final or key in read)
+    )
+
+
+class _Liveness:
+    """
+    Releases dead data_context keys during a run (see _lifetimes) and tracks
+    the context's approximate size, with and without the releases, for the
+    report at the end of the run.
+    """
+
+    def __init__(self, lifetimes, data_context):
+        self.holders = {key: set(indices) for key, indices in lifetimes}
+        self.sizes = {key: _approx_size(value) or 0 for key, value in data_context.items()}
+        self.kept_sizes = dict(self.sizes)
+        self.peak = self.peak_kept = sum(self.sizes.values())
+        self.released = 0
+
+    def done(self, index, data_context, output_key=None, output_bytes=None):
+        """Records a finished gene (and the size of what it stored), then releases the keys it was last to hold."""
+        if output_key is not None:
+            self.sizes[output_key] = self.kept_sizes[output_key] = output_bytes or 0
+            self.peak = max(self.peak, sum(self.sizes.values()))
+            self.peak_kept = max(self.peak_kept, sum(self.kept_sizes.values()))
+        for key, holders in self.holders.items():
+            holders.discard(index)
+            if not holders and key in data_context:
+                del data_context[key]
+                self.sizes.pop(key, None)
+                self.released += 1
+
+    def report(self):
+        print(f"--- Context size: peak {_format_bytes(self.peak)} "
+              f"(peak {_format_bytes(self.peak_kept)} without releasing), {self.released} dead outputs released ---")
+
+
+def _format_bytes(size):
+    for unit in ("B", "KB", "MB"):
+        if size < 1024:
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GB"
+
+
+def _build_dependencies(genes):
+    """
+    Derives, for each gene, the indices of earlier genes it must wait for.
+
+    A gene depends on the last earlier writer of every key it reads, and on the
+    previous writer and readers of the key it writes (so re-used output keys
+    keep their genome order). Genes whose reads are unknown act as barriers,
+    and 'stateful' genes keep their relative order.
+    """
+    deps = []
+    last_writer = {}
+    readers_since_write = {}
+    last_barrier = None
+    last_stateful = None
+
+    for i, gene_def in enumerate(genes):
+        reads = _gene_reads(gene_def)
+        output_key = gene_def.get('output_as', gene_def['id'])
+        gene_deps = set()
+
+        if reads is None:
+            gene_deps.update(range(i))
+        else:
+            gene_deps.update(last_writer[key] for key in reads if key in last_writer)
+        if output_key in last_writer:
+            gene_deps.add(last_writer[output_key])
+        gene_deps.update(readers_since_write.get(output_key, ()))
+        if last_barrier is not None:
+            gene_deps.add(last_barrier)
+        if _is_stateful(gene_def):
+            if last_stateful is not None:
+                gene_deps.add(last_stateful)
+            last_stateful = i
+
+        if reads is None:
+            last_barrier = i
+        else:
+            for key in reads:
+                readers_since_write.setdefault(key, set()).add(i)
+        last_writer[output_key] = i
+        readers_since_write[output_key] = set()
+        gene_deps.discard(i)
+        deps.append(gene_deps)
+    return deps
+
+
+# --- Log Capture ---
+
+def _call_logged(stream, function, args):
+    """
+    Calls function(*args) on a worker thread with its prints routed to stream.
+    Returns (result, cpu_seconds spent on this thread).
+    """
+    with log_to(stream):
+        cpu_start = time.thread_time()
+        result = _call_measured(function, args)
+        return result, time.thread_time() - cpu_start
+
+
+# --- Checkpoints ---
+
+def _definition_hash(gene_def):
+    """Fingerprint of a gene's definition, saved with its checkpoint so that a gene edited before a resume runs again."""
+    return hashlib.sha256(json.dumps(gene_def, sort_keys=True, default=repr).encode('utf-8')).hexdigest()
+
+
+def _save_checkpoint(checkpoint, step, output_data):
+    """Hands a successful gene's output to the checkpoint callback. A failing callback only costs the checkpoint."""
+    if checkpoint is None or step.emits_stream:
+        return  # A live stream is not data yet; its pipeline's last gene is checkpointed instead.
+    try:
+        checkpoint(step.index, step.gene_id, step.output_key, to_builtin(output_data), _definition_hash(step.definition))
+    except Exception as e:
+        print(f"  -> Warning: could not checkpoint gene '{step.gene_id}': {e}")
+
+
+def _restored_step(step, value):
+    """A copy of step that returns its checkpointed output instead of running the gene."""
+    def restored(config, input_data, data_context):
+        print("  -> Restored from checkpoint.")
+        return value
+    # Nothing that would route the call elsewhere (single-flight, process pool, retries, deadlines) applies to a saved value.
+    return step._replace(function=restored, input_from=None, input_path=None, should_skip=None, skip_if=None,
+                         private_context=False, stream_function=None, emits_stream=False, cache=None,
+                         coalesce_window=None, executor=None, retry=None, timeout=None, columnar=False)
+
+
+def _resume_plan(plan, checkpoints, data_context):
+    """
+    Returns a copy of plan in which genes saved in checkpoints, rows of
+    (gene_index, gene_id, output_key, value, definition_hash), return their
+    saved output. Rows are matched by index, id and definition hash, so genes
+    edited since are run again, and so is every gene that depends on one. A
+    streaming producer is restored too when its consumer was, since nothing
+    would read its stream. Index -1 rows seed data_context.
+    """
+    saved = {}
+    edited = set()
+    for gene_index, gene_id, output_key, value, definition_hash in checkpoints:
+        if gene_index < 0:
+            data_context[output_key] = value
+        elif gene_index < len(plan.steps) and plan.steps[gene_index].gene_id == gene_id:
+            if definition_hash == _definition_hash(plan.steps[gene_index].definition):
+                saved[gene_index] = value
+            else:
+                edited.add(gene_index)
+    for step in plan.steps:
+        # A saved output computed from an edited gene's old output is stale too.
+        if step.index in edited or not edited.isdisjoint(plan.deps[step.index]):
+            edited.add(step.index)
+            saved.pop(step.index, None)
+
+    steps = list(plan.steps)
+    for step in reversed(plan.steps):
+        if step.index in saved:
+            steps[step.index] = _restored_step(step, saved[step.index])
+        elif step.emits_stream and any(
+                later.input_from == step.output_key and later.index in saved for later in plan.steps[step.index + 1:]):
+            saved[step.index] = None
+            steps[step.index] = _restored_step(step, None)
+    print(f"Resuming from checkpoint: {len(saved)} of {len(steps)} genes restored.\n")
+    return plan._replace(steps=tuple(steps))
+
+
+def _start_context(plan, initial_input, checkpoint, resume):
+    """Builds the run's starting data_context (and resumed plan), checkpointing the initial input."""
+    data_context = {"initial_input": initial_input} if initial_input else {}
+    if resume:
+        plan = _resume_plan(plan, resume, data_context)
+    if checkpoint is not None and "initial_input" in data_context:
+        try:
+            checkpoint(-1, None, "initial_input", data_context["initial_input"], None)
+        except Exception as e:
+            print(f"  -> Warning: could not checkpoint the initial input: {e}")
+    return plan, data_context
+
+
+# --- Execution Modes ---
+
+DEFAULT_EXECUTION_MODE = os.environ.get("FOUNDRY_EXECUTION_MODE", "sequential")
+DEFAULT_MAX_WORKERS = 4
+
+
+class _GraphRun:
+    """
+    Bookkeeping for running genes as a dependency graph, shared by the thread
+    pool and asyncio drivers. Each gene logs into its own buffer, and buffers
+    are written to the run log in genome order, so the log reads the same as
+    a sequential run.
+    """
+
+    def __init__(self, steps, data_context, deps, trace, checkpoint=None, liveness=None, spiller=None):
+        self.steps = steps
+        self.trace = trace
+        self.checkpoint = checkpoint
+        self.liveness = liveness
+        self.spiller = spiller
+        self.data_context = data_context
+        self.deps = deps
+        self.buffers = [io.StringIO() for _ in steps]
+        self.started = set()
+        self.done = set()
+        self.flushed = 0
+        self.status = "success"
+
+    def ready(self, limit):
+        """Marks up to limit runnable genes as started and returns their indices."""
+        if self.status != "success":
+            return []
+        ready = []
+        for i in range(len(self.steps)):
+            if len(ready) >= limit:
+                break
+            if i not in self.started and self.deps[i] <= self.done:
+                self.started.add(i)
+                ready.append(i)
+        return ready
+
+    def complete(self, index, result):
+        status, output_key, output_data, span = result
+        if self.trace is not None:
+            self.trace.append(span)
+        if status in FAILURE_STATUSES:
+            if self.status == "success":
+                self.status = status
+        elif status == "success":
+            self.data_context[output_key] = output_data
+            _save_checkpoint(self.checkpoint, self.steps[index], output_data)
+        if self.liveness is not None:
+            stored = status == "success"
+            self.liveness.done(index, self.data_context, output_key if stored else None, span.get("output_bytes"))
+        if self.spiller is not None and status == "success":
+            with log_to(self.buffers[index]):
+                self.spiller.stored(output_key, self.data_context, span.get("output_bytes"))
+        self.done.add(index)
+        while self.flushed < len(self.steps) and self.flushed in self.done:
+            sys.stdout.write(self.buffers[self.flushed].getvalue())
+            self.buffers[self.flushed] = None
+            self.flushed += 1
+        sys.stdout.flush()
+
+    def finish(self):
+        for buffer in self.buffers[self.flushed:]:
+            sys.stdout.write(buffer.getvalue())
+        sys.stdout.flush()
+        # Keep the context in genome order regardless of completion order.
+        writers = {step.output_key: step.index for step in self.steps}
+        ordered = sorted(self.data_context, key=lambda key: writers.get(key, -1))
+        reordered = {key: self.data_context[key] for key in ordered}
+        self.data_context.clear()
+        self.data_context.update(reordered)
+        if self.trace is not None:
+            self.trace.sort(key=lambda span: span["gene_index"])
+        return self.status
+
+
+def _run_sequential(plan, data_context, run_id, organism_id, trace, checkpoint=None, liveness=None, spiller=None):
+    """Runs genes strictly in genome order. Returns the final status."""
+    for step in plan.steps:
+        status, output_key, output_data, span = _run_step(step, data_context, run_id, organism_id)
+        if trace is not None:
+            trace.append(span)
+        sys.stdout.flush()
+        if status in FAILURE_STATUSES:
+            return status
+        if status == "success":
+            data_context[output_key] = output_data
+            _save_checkpoint(checkpoint, step, output_data)
+        if liveness is not None:
+            stored = status == "success"
+            liveness.done(step.index, data_context, output_key if stored else None, span.get("output_bytes"))
+        if spiller is not None and status == "success":
+            spiller.stored(output_key, data_context, span.get("output_bytes"))
+    return "success"
+
+
+def _run_parallel(plan, data_context, run_id, organism_id, max_workers, trace, checkpoint=None, liveness=None,
+                  spiller=None):
+    """Runs genes as a dependency graph on a bounded thread pool. Returns the final status."""
+    graph = _GraphRun(plan.steps, data_context, plan.deps, trace, checkpoint, liveness, spiller)
+
+    def run_buffered(index, context):
+        with log_to(graph.buffers[index]):
+            return _run_step(plan.steps[index], context, run_id, organism_id)
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as pool:
+        pending = {}
+        while True:
+            for i in graph.ready(len(plan.steps)):
+                # copy_context carries the run's CancelToken onto the pool thread.
+                pending[pool.submit(contextvars.copy_context().run, run_buffered, i, ContextView(data_context))] = i
+            if not pending:
+                break
+            finished, _ = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in sorted(finished, key=pending.get):
+                graph.complete(pending.pop(future), future.result())
+
+    return graph.finish()
+
+
+def run_organism(genome_json_str, run_id, organism_id, initial_input=None, mode=None, trace=None, log_sink=None,
+                 checkpoint=None, resume=None, cancel_token=None, usage=None):
+    """
+    Executes a workflow defined by a genome JSON string and captures logs.
+
+    Genes run one after another in genome order by default; with 'parallel'
+    they run as a dependency graph on a thread pool. The mode comes from the
+    'mode' argument, then the genome's "execution" block, then
+    FOUNDRY_EXECUTION_MODE.
+
+    If trace is a list, one span dict per gene (timings, item counts, sizes,
+    status, error type) is appended to it in genome order. In a fused
+    streaming pipeline the work happens when the last gene drains it, so that
+    gene's span carries the pipeline's time and the producers' spans only
+    count their items. Spans of genes with a "cache" stanza note a cache
+    "hit" or "miss", and the run's counters are printed at the end of the log.
+
+    Logs go to log_sink if given (e.g. a run_log.RunLogSink that streams
+    chunks to storage; it is flushed after every gene), otherwise to an
+    in-memory buffer. The returned log is log_sink.getvalue().
+
+    checkpoint(gene_index, gene_id, output_key, value, definition_hash) is
+    called with every successful gene's output (and the initial_input, as
+    index -1), so a failed run can be resumed. Pass those saved rows back as
+    resume to skip the genes that already succeeded and are unchanged, and
+    restore their outputs.
+
+    Genes stop after their "timeout" (seconds) and the run after the genome's
+    "execution": {"time_budget": seconds}, with status 'timed_out'. Cancelling
+    cancel_token (see run_control) stops the run with status 'cancelled'.
+    A gene's "retry" policy (see retry_policy) re-runs failed attempts with
+    jittered exponential backoff; each span records its "attempts".
+    With execution.free_dead_outputs or keep_only_final, outputs are released
+    from data_context once no remaining gene reads them (see _lifetimes), and
+    the context's peak size is reported at the end of the log. Outputs above
+    execution.spill_threshold_mb (or beyond memory_ceiling_mb) are spilled to
+    disk while the run lasts and loaded back into the returned data_context.
+
+    If usage is a resource_usage.RunUsage, the run's CPU time, peak RSS growth
+    and HTTP traffic are recorded into it (and summarized at the end of the
+    log). execution.trace_allocations adds tracemalloc's top allocation sites
+    per gene.
+    """
+    log_stream = log_sink if log_sink is not None else io.StringIO()
+    with log_to(log_stream):
         print("--- Running Organism ---\n")
         try:
-            genome = json.loads(genome_json_str)
+            plan = compile_genome(genome_json_str)
         except json.JSONDecodeError as e:
             print(f"Error: Invalid genome JSON provided. {e}")
-            return log_stream.getvalue(), "failed"
-
-        data_context = {"initial_input": initial_input} if initial_input else {}
-        final_status = "success"
-
-        for gene_def in genome['genes']:
-            gene_id = gene_def['id']
-            gene_type = gene_def['type']
-            
-            if "skip_if" in gene_def:
-                # Basic evaluator for "key.subkey == value"
-                # This is a prototype and can be made more robust later
-                condition_str = gene_def["skip_if"]
-                parts = condition_str.replace(" ", "").split("==")
-                key_path, expected_value_str = parts[0], parts[1]
-                
-                # Safely get the actual value from data_context
-                keys = key_path.split('.')
-                actual_value = data_context
-                for key in keys:
-                    if isinstance(actual_value, dict):
-                        actual_value = actual_value.get(key)
-                    else:
-                        actual_value = None
-                        break
-                        
-                # Convert expected value string to the type of the actual value
-                if expected_value_str.lower() == 'true':
-                    expected_value = True
-                elif expected_value_str.lower() == 'false':
-                    expected_value = False
-                elif actual_value is not None:
-                    try:
-                        expected_value = type(actual_value)(expected_value_str)
-                    except (ValueError, TypeError):
-                        expected_value = expected_value_str
-                else:
-                    expected_value = expected_value_str
-
-                if actual_value == expected_value:
-                    print(f"Skipping gene '{gene_def['id']}' due to condition: {condition_str}")
-                    continue # Skip to the next gene
-            
-            print(f"[Executing Gene] ID: {gene_id}, Type: {gene_type}")
-
-            try:
-                gene_function = GENE_MAP.get(gene_type)
-                if not gene_function:
-                    raise Exception(f"Gene type '{gene_type}' not found in GENE_MAP.")
-                
-                config = gene_def.get('config', {})
-                contextual_config = copy.deepcopy(config) if config else {}
-                contextual_config['organism_id'] = organism_id
-                contextual_config['run_id'] = run_id
-                
-                input_key_path = gene_def.get('input_from')
-                if input_key_path:
-                    print(f"  -> Input: Reading from '{input_key_path}' in data_context.")
-                    # Handle nested lookups
-                    keys = input_key_path.split('.')
-                    input_data = data_context
-                    for key in keys:
-                        if isinstance(input_data, dict):
-                            input_data = input_data.get(key)
-                        else:
-                            input_data = None
-                            break
-                else:
-                    input_data = None
-                
-                # Execute the gene
-                output_data = gene_function(contextual_config, input_data, copy.deepcopy(data_context))
-
-                # --- The Definitive Engine Fix ---
-                # If 'output_as' is specified, use it. Otherwise, default to the gene's 'id'.
-                output_key = gene_def.get('output_as', gene_id)
-                
-                data_context[output_key] = output_data
-                print(f"  <- Output: Storing result in '{output_key}' in data_context.")
-
-            except Exception as e:
-                print(f"  **ERROR** during execution of gene '{gene_id}': {e}")
-                final_status = "failed"
-                break
+            log_stream.flush()
+            return log_stream.getvalue(), "failed", {}
+        except ConditionError as e:
+            print(f"Error: Invalid skip_if condition. {e}")
+            log_stream.flush()
+            return log_stream.getvalue(), "failed", {}
+
+        plan, data_context = _start_context(plan, initial_input, checkpoint, resume)
+        liveness = _Liveness(plan.lifetimes, data_context) if plan.lifetimes is not None else None
+        spans = trace if trace is not None else []
+        execution = plan.genome.get('execution', {})
+        spiller = Spiller.for_run(run_id, execution)
+        mode = mode or execution.get('mode', DEFAULT_EXECUTION_MODE)
+        usage = usage if usage is not None else RunUsage()
+        usage.begin(execution.get('trace_allocations', resource_usage.TRACE_ALLOCATIONS))
+
+        with use_token(_run_token(plan, cancel_token)), use_usage(usage):
+            if mode == "sequential":
+                final_status = _run_sequential(plan, data_context, run_id, organism_id, spans, checkpoint, liveness,
+                                               spiller)
+            else:
+                max_workers = execution.get('max_workers', DEFAULT_MAX_WORKERS)
+                final_status = _run_parallel(plan, data_context, run_id, organism_id, max_workers, spans, checkpoint,
+                                             liveness, spiller)
+        _finish_streams(plan, data_context)
+        if spiller is not None:
+            data_context = materialized(data_context)  # Callers get plain values, not handles.
+            spiller.close()
+        _report_cache(spans)
+        if liveness is not None:
+            liveness.report()
+        usage.end()
+        usage.report()
+
+        print(f"\n--- Organism Run Finished with status: {final_status} ---")
+        log_stream.flush()
+        return log_stream.getvalue(), final_status, data_context
+
+# --- Asyncio Engine ---
+
+ASYNC_EXECUTOR_WORKERS = int(os.environ.get("FOUNDRY_ASYNC_EXECUTOR_WORKERS", 32))
+_async_executor = None
+_async_executor_lock = threading.Lock()
+
+
+def _get_async_executor():
+    """Returns the shared, bounded thread pool that runs sync genes for the asyncio engine."""
+    global _async_executor
+    with _async_executor_lock:
+        if _async_executor is None:
+            _async_executor = concurrent.futures.ThreadPoolExecutor(
+                max_workers=ASYNC_EXECUTOR_WORKERS, thread_name_prefix="gene"
+            )
+        return _async_executor
+
+
+async def _run_graph_async(plan, data_context, run_id, organism_id, deps, max_concurrency, trace, checkpoint=None,
+                           liveness=None, spiller=None):
+    """Runs genes as a dependency graph of asyncio tasks. Returns the final status."""
+    graph = _GraphRun(plan.steps, data_context, deps, trace, checkpoint, liveness, spiller)
+    executor = _get_async_executor()
+
+    async def run_buffered(index, context):
+        with log_to(graph.buffers[index]):
+            return await _run_step_async(plan.steps[index], context, run_id, organism_id, executor)
+
+    pending = {}
+    while True:
+        for i in graph.ready(max_concurrency - len(pending)):
+            pending[asyncio.ensure_future(run_buffered(i, ContextView(data_context)))] = i
+        if not pending:
+            break
+        finished, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        for task in sorted(finished, key=pending.get):
+            graph.complete(pending.pop(task), task.result())
+
+    return graph.finish()
+
+
+async def run_organism_async(genome_json_str, run_id, organism_id, initial_input=None, mode=None, trace=None, log_sink=None,
+                             checkpoint=None, resume=None, cancel_token=None, usage=None):
+    """
+    Asyncio counterpart of run_organism with the same (log, status, data_context) result.
+
+    Genes defined with 'async def' are awaited on the event loop; sync genes run
+    on a shared bounded thread pool, so many organisms can share one loop
+    without holding an OS thread each. Run several at once with asyncio.gather.
+    CPU time of 'async def' genes is not counted in usage.
+    """
+    log_stream = log_sink if log_sink is not None else io.StringIO()
+    with log_to(log_stream):
+        print("--- Running Organism ---\n")
+        try:
+            plan = compile_genome(genome_json_str)
+        except json.JSONDecodeError as e:
+            print(f"Error: Invalid genome JSON provided. {e}")
+            log_stream.flush()
+            return log_stream.getvalue(), "failed", {}
+        except ConditionError as e:
+            print(f"Error: Invalid skip_if condition. {e}")
+            log_stream.flush()
+            return log_stream.getvalue(), "failed", {}
+
+        plan, data_context = _start_context(plan, initial_input, checkpoint, resume)
+        liveness = _Liveness(plan.lifetimes, data_context) if plan.lifetimes is not None else None
+        spans = trace if trace is not None else []
+        execution = plan.genome.get('execution', {})
+        spiller = Spiller.for_run(run_id, execution)
+        mode = mode or execution.get('mode', DEFAULT_EXECUTION_MODE)
+        usage = usage if usage is not None else RunUsage()
+        usage.begin(execution.get('trace_allocations', resource_usage.TRACE_ALLOCATIONS))
+
+        with use_token(_run_token(plan, cancel_token)), use_usage(usage):
+            if mode == "sequential":
+                deps = [{i - 1} if i else set() for i in range(len(plan.steps))]
+                final_status = await _run_graph_async(plan, data_context, run_id, organism_id, deps, 1, spans, checkpoint,
+                                                      liveness, spiller)
+            else:
+                max_workers = execution.get('max_workers', DEFAULT_MAX_WORKERS)
+                final_status = await _run_graph_async(plan, data_context, run_id, organism_id, plan.deps, max_workers,
+                                                      spans, checkpoint, liveness, spiller)
+        _finish_streams(plan, data_context)
+        if spiller is not None:
+            data_context = materialized(data_context)  # Callers get plain values, not handles.
+            spiller.close()
+        _report_cache(spans)
+        if liveness is not None:
+            liveness.report()
+        usage.end()
+        usage.report()
 
         print(f"\n--- Organism Run Finished with status: {final_status} ---")
+        log_stream.flush()
         return log_stream.getvalue(), final_status, data_context
 
 # --- Main Execution Loop (Legacy - disabled as of Flask-APScheduler integration) ---
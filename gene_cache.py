@@ -0,0 +1,220 @@
+import os
+import copy
+import json
+import time
+import hashlib
+import threading
+import collections
+from record_batch import RecordBatch, RecordRow
+
+# --- Gene output memoization ---
+# Genes opt in per genome with a "cache": {"ttl": <seconds>} stanza. Outputs
+# are keyed by (gene type, normalized config, input hash) and kept in a bounded
+# in-memory LRU. An optional persistent tier (see GeneCache.attach_store) lets
+# entries survive restarts and be shared between processes.
+
+GENE_CACHE_SIZE = int(os.environ.get("FOUNDRY_GENE_CACHE_SIZE", 256))
+COALESCE_WINDOW = float(os.environ.get("FOUNDRY_COALESCE_WINDOW", 60))
+
+# Config keys the engine adds to every call; they never change a gene's result.
+_RUN_KEYS = ('run_id', 'organism_id')
+
+
+def _key_material(value):
+    """json.dumps fallback: record batches by their contents, anything else by repr."""
+    if isinstance(value, RecordBatch):
+        return {"RecordBatch": value.to_records()}
+    if isinstance(value, RecordRow):
+        return dict(value)
+    return repr(value)
+
+
+def cache_key(gene_type, config, input_data, context_values=None, per_organism=False):
+    """
+    Returns the cache key for one gene call: a SHA-256 over the gene type, its
+    config (without run_id, and without organism_id unless per_organism), its
+    input and the values of any other data_context keys it reads.
+    """
+    ignored = ('run_id',) if per_organism else _RUN_KEYS
+    normalized = {key: value for key, value in config.items() if key not in ignored}
+    material = json.dumps([gene_type, normalized, input_data, context_values or {}],
+                          sort_keys=True, default=_key_material)
+    return hashlib.sha256(material.encode('utf-8')).hexdigest()
+
+
+class GeneCache:
+    """
+    Thread-safe LRU of gene outputs with per-entry expiry.
+
+    Values are deep-copied on the way in and out, because genes may mutate
+    the data they receive. Errors from the persistent tier are reported and
+    otherwise ignored, so a locked database never fails a run.
+    """
+
+    def __init__(self, max_entries=GENE_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self._load = None
+        self._store = None
+        self.hits = 0
+        self.misses = 0
+
+    def attach_store(self, load, store):
+        """
+        Adds a persistent tier. load(key) returns (expires_at, value_json) or
+        None; store(key, expires_at, value_json) saves an entry.
+        """
+        self._load, self._store = load, store
+
+    def get(self, key):
+        """Returns (True, value) for a fresh entry, otherwise (False, None)."""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= now:
+                del self._entries[key]
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return True, copy.deepcopy(entry[1])
+
+        if self._load is not None:
+            try:
+                row = self._load(key)
+                if row is not None and row[0] > now:
+                    value = json.loads(row[1])
+                    with self._lock:
+                        self._remember(key, row[0], value)
+                        self.hits += 1
+                    return True, copy.deepcopy(value)
+            except Exception as e:
+                print(f"  -> Warning: gene cache store unavailable ({e}).")
+
+        with self._lock:
+            self.misses += 1
+        return False, None
+
+    def put(self, key, value, ttl):
+        """Caches value under key for ttl seconds."""
+        expires_at = time.time() + ttl
+        value = copy.deepcopy(value)
+        with self._lock:
+            self._remember(key, expires_at, value)
+
+        if self._store is not None:
+            try:
+                value_json = json.dumps(value)
+            except (TypeError, ValueError):
+                return  # Not JSON-serializable; keep it in memory only.
+            try:
+                self._store(key, expires_at, value_json)
+            except Exception as e:
+                print(f"  -> Warning: gene cache store unavailable ({e}).")
+
+    def _remember(self, key, expires_at, value):
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+# --- Single-flight request coalescing ---
+# Fetch genes (GENE_TRAITS 'coalesce') often run with the same config in many
+# organisms within one scheduler heartbeat. Identical calls that overlap, or
+# that start within the freshness window after one finished, share a single
+# execution and its result instead of each hitting the API.
+
+class _Flight:
+    __slots__ = ('event', 'result', 'error', 'finished_at', 'window')
+
+    def __init__(self, window):
+        self.window = window
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+        self.finished_at = None
+
+
+class SingleFlight:
+    """
+    Runs at most one call per key at a time and shares its result with every
+    caller that arrives while it is in flight or within window seconds after
+    it finished. Each caller gets its own deep copy. Failures are shared with
+    callers that were already waiting, but never reused afterwards.
+    """
+
+    def __init__(self):
+        self._flights = {}
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def do(self, key, function, window, label=None):
+        """Returns (result, shared): function()'s result, and whether it came from another caller's call."""
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            flight = self._flights.get(key)
+            if flight is not None and flight.finished_at is not None and now - flight.finished_at > window:
+                flight = None  # Fresh enough for its own caller, but not for this one.
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight(window)
+            stats = self._stats.setdefault(label, {"calls": 0, "shared": 0})
+            stats["calls"] += 1
+            if not leader:
+                stats["shared"] += 1
+
+        if not leader:
+            flight.event.wait()
+            if flight.error is not None:
+                raise flight.error
+            return copy.deepcopy(flight.result), True
+
+        try:
+            result = function()
+            flight.result = copy.deepcopy(result)
+            return result, False
+        except Exception as e:
+            flight.error = e
+            with self._lock:
+                if self._flights.get(key) is flight:
+                    del self._flights[key]
+            raise
+        finally:
+            flight.finished_at = time.monotonic()
+            flight.event.set()
+
+    def _expire(self, now):
+        stale = [key for key, flight in self._flights.items()
+                 if flight.finished_at is not None and now - flight.finished_at > flight.window]
+        for key in stale:
+            del self._flights[key]
+
+    def clear(self):
+        with self._lock:
+            self._flights.clear()
+            self._stats.clear()
+
+    def stats(self):
+        """Per-label call counts, shared (deduplicated) calls and dedup rate, plus the totals."""
+        with self._lock:
+            report = {label: dict(counts, dedup_rate=counts["shared"] / counts["calls"])
+                      for label, counts in self._stats.items()}
+        calls = sum(counts["calls"] for counts in report.values())
+        shared = sum(counts["shared"] for counts in report.values())
+        return {"calls": calls, "shared": shared, "dedup_rate": shared / calls if calls else 0.0, "by_gene": report}
+
+
+GENE_CACHE = GeneCache()
+GENE_FLIGHTS = SingleFlight()
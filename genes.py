@@ -7,12 +7,17 @@ import requests
 from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
 import database
 from database import save_memory, query_memory
+from run_control import capped_timeout
+from record_batch import RecordBatch, to_builtin
+import numpy as np
 import json
 import os
 from openai import OpenAI
 import subprocess
 import shlex
 import re
+import functools
+import collections.abc
 
 def get_env_variable(var_name):
     """Safely reads an environment variable and raises an Exception if it's not found."""
@@ -36,26 +41,32 @@ def fetch_reddit_posts(config, input_data=None, data_context=None):
         - type: list_of_dicts
           keys: ['id', 'title', 'text', 'url']
     """
+    return list(fetch_reddit_posts_stream(config))
+
+def fetch_reddit_posts_stream(config, items=None, data_context=None):
+    """Streaming form of FetchRedditPosts: yields posts as PRAW pages through the listing."""
     reddit = praw.Reddit(
         client_id=get_env_variable("REDDIT_CLIENT_ID"),
         client_secret=get_env_variable("REDDIT_CLIENT_SECRET"),
         user_agent=get_env_variable("REDDIT_USER_AGENT"),
+        timeout=capped_timeout(16),
     )
     subreddit_name = config.get("subreddit", "python")
     limit = config.get("limit", 25)
 
     subreddit = reddit.subreddit(subreddit_name)
-    posts = subreddit.new(limit=limit)
-
-    return [
-        {
+    for post in subreddit.new(limit=limit):
+        yield {
             "id": post.id, # <-- CRUCIAL: Add the post ID
             "title": post.title,
             "text": post.selftext,
             "url": post.url,
         }
-        for post in posts
-    ]
+
+@functools.lru_cache(maxsize=None)
+def _sentiment_analyzer():
+    # Loading the VADER lexicon dominates small batches, so each process loads it once.
+    return SentimentIntensityAnalyzer()
 
 def analyze_sentiment(config, input_data, data_context=None):
     """
@@ -74,7 +85,11 @@ def analyze_sentiment(config, input_data, data_context=None):
     if not input_data:
         return []
 
-    analyzer = SentimentIntensityAnalyzer()
+    analyzer = _sentiment_analyzer()
+    if isinstance(input_data, RecordBatch):
+        # Batches are immutable: the scores come back as a new column.
+        scores = [analyzer.polarity_scores(f"{post.get('title', '')} {post.get('text', '')}")['compound'] for post in input_data]
+        return input_data.with_column('sentiment_score', scores)
     for post in input_data:
         text_to_analyze = f"{post.get('title', '')} {post.get('text', '')}"
         sentiment = analyzer.polarity_scores(text_to_analyze)
@@ -82,6 +97,18 @@ def analyze_sentiment(config, input_data, data_context=None):
 
     return input_data
 
+def analyze_sentiment_stream(config, items, data_context=None):
+    """Streaming form of AnalyzeSentiment: scores each item in place, like the list form, as it passes."""
+    analyzer = _sentiment_analyzer()
+    for post in items:
+        text_to_analyze = f"{post.get('title', '')} {post.get('text', '')}"
+        score = analyzer.polarity_scores(text_to_analyze)['compound']
+        if isinstance(post, dict):
+            post['sentiment_score'] = score
+            yield post
+        else:
+            yield {**post, 'sentiment_score': score}  # RecordBatch rows are read-only.
+
 def filter_data(config, input_data, data_context):
     """
     [GENE] FilterData
@@ -105,7 +132,45 @@ def filter_data(config, input_data, data_context):
     print(f"Executing Gene: filter_data")
     field = config['field']
     condition = config['condition']
-    
+    value = _filter_value(config, data_context)
+
+    print(f"  -> Filtering where '{field}' is {condition} ...")
+
+    if input_data is None:
+        print("  -> Input data is None, cannot filter.")
+        return []
+
+    if isinstance(input_data, RecordBatch):
+        if condition not in FILTER_CONDITIONS:
+            raise ValueError(f"Condition '{condition}' is not supported.")
+        filtered_batch = input_data.take(_filter_mask(input_data, field, condition, value))
+        print(f"  -> Found {len(filtered_batch)} matching items.")
+        return filtered_batch
+
+    matches = _filter_predicate(field, condition, value)
+    filtered_list = [item for item in input_data if matches(item)]
+
+    if condition not in FILTER_CONDITIONS:
+        raise ValueError(f"Condition '{condition}' is not supported.")
+
+    print(f"  -> Found {len(filtered_list)} matching items.")
+    return filtered_list
+
+def filter_data_stream(config, items, data_context):
+    """Streaming form of FilterData: yields matching items as they arrive."""
+    field = config['field']
+    condition = config['condition']
+    if condition not in FILTER_CONDITIONS:
+        raise ValueError(f"Condition '{condition}' is not supported.")
+    matches = _filter_predicate(field, condition, _filter_value(config, data_context))
+    for item in items:
+        if matches(item):
+            yield item
+
+FILTER_CONDITIONS = ("less_than", "greater_than", "contains", "not_in")
+
+def _filter_value(config, data_context):
+    """Resolves FilterData's comparison value from the config or the data_context."""
     # --- The Definitive Fix: Explicitly check for both keys ---
     if 'value_from_context' in config:
         context_key = config['value_from_context']
@@ -116,55 +181,82 @@ def filter_data(config, input_data, data_context):
         print(f"  -> Using direct comparison value from config.")
     else:
         raise ValueError("FilterData config must contain 'value' or 'value_from_context'")
-
-    print(f"  -> Filtering where '{field}' is {condition} ...")
-
-    if input_data is None:
-        print("  -> Input data is None, cannot filter.")
-        return []
-
-    filtered_list = []
-    
+    return value
+
+def _comparison_set(field, value):
+    """The set of values a 'not_in' FilterData excludes."""
+    comparison_set = set()
+    if isinstance(value, list) and value and isinstance(value[0], dict):
+        print(f"  -> Building comparison set from a list of {len(value)} dictionaries.")
+        for dict_item in value:
+            if field in dict_item:
+                comparison_set.add(dict_item[field])
+    elif isinstance(value, list):
+        print(f"  -> Building comparison set from a simple list of {len(value)} items.")
+        comparison_set = set(value)
+    return comparison_set
+
+def _filter_predicate(field, condition, value):
+    """Returns a function that tells whether one item passes a FilterData condition."""
     # Create a dedicated comparison set for 'not_in'
-    if condition == "not_in":
-        comparison_set = set()
-        if isinstance(value, list) and value and isinstance(value[0], dict):
-            print(f"  -> Building comparison set from a list of {len(value)} dictionaries.")
-            for dict_item in value:
-                if field in dict_item:
-                    comparison_set.add(dict_item[field])
-        elif isinstance(value, list):
-            print(f"  -> Building comparison set from a simple list of {len(value)} items.")
-            comparison_set = set(value)
-    
-    for item in input_data:
+    comparison_set = _comparison_set(field, value) if condition == "not_in" else set()
+
+    def matches(item):
         if field not in item:
-            continue
+            return False
         item_value = item[field]
 
         # --- Condition Logic ---
         if condition == "less_than":
-            if isinstance(item_value, (int, float)) and isinstance(value, (int, float)) and item_value < value:
-                filtered_list.append(item)
-        
+            return isinstance(item_value, (int, float)) and isinstance(value, (int, float)) and item_value < value
         elif condition == "greater_than":
-            if isinstance(item_value, (int, float)) and isinstance(value, (int, float)) and item_value > value:
-                filtered_list.append(item)
-
+            return isinstance(item_value, (int, float)) and isinstance(value, (int, float)) and item_value > value
         elif condition == "contains":
-            if isinstance(item_value, str) and isinstance(value, str) and value.lower() in item_value.lower():
-                filtered_list.append(item)
-        
+            return isinstance(item_value, str) and isinstance(value, str) and value.lower() in item_value.lower()
         elif condition == "not_in":
             # The comparison_set is already prepared; this is a simple and correct check.
-            if item_value not in comparison_set:
-                filtered_list.append(item)
-    
-    if condition not in ["less_than", "greater_than", "contains", "not_in"]:
-        raise ValueError(f"Condition '{condition}' is not supported.")
+            return item_value not in comparison_set
+        return False
 
-    print(f"  -> Found {len(filtered_list)} matching items.")
-    return filtered_list
+    return matches
+
+def _filter_mask(batch, field, condition, value):
+    """
+    FilterData over a RecordBatch: a boolean row mask computed on the field's
+    column. Numeric columns are compared in NumPy; string conditions run over
+    the column's values (NumPy's string kernels are slower than str methods),
+    and mixed columns fall back to _filter_predicate row by row.
+    """
+    present = batch.present(field)
+    mask = np.zeros(len(batch), dtype=bool)
+    if not present.any():
+        return mask
+    column = batch.column(field)
+    numeric = column.dtype != object  # bool, int64 or float64
+
+    if condition in ("less_than", "greater_than"):
+        if not isinstance(value, (int, float)):
+            return mask
+        if numeric:
+            return present & (column < value if condition == "less_than" else column > value)
+    elif condition == "contains":
+        if not isinstance(value, str) or numeric:
+            return mask
+        if batch.is_string(field):
+            needle, values = value.lower(), column[present]
+            mask[present] = np.fromiter((needle in text.lower() for text in values), dtype=bool, count=len(values))
+            return mask
+    elif condition == "not_in":
+        comparison_set = _comparison_set(field, value)
+        if numeric:
+            excluded = [item for item in comparison_set if isinstance(item, (int, float))]
+            return present & ~np.isin(column, np.asarray(excluded))
+        values = column[present]
+        mask[present] = np.fromiter((item not in comparison_set for item in values), dtype=bool, count=len(values))
+        return mask
+
+    matches = _filter_predicate(field, condition, value)
+    return np.fromiter((matches(item) for item in batch), dtype=bool, count=len(batch))
 
 def post_to_slack(config, input_data, data_context=None):
     """
@@ -210,7 +302,7 @@ def post_to_slack(config, input_data, data_context=None):
         })
 
     try:
-        response = requests.post(webhook_url, json={"blocks": blocks}, timeout=10)
+        response = requests.post(webhook_url, json={"blocks": blocks}, timeout=capped_timeout(10))
         response.raise_for_status()
         print("Successfully posted to Slack.")
     except requests.exceptions.RequestException as e:
@@ -239,7 +331,7 @@ def write_to_memory(config, input_data, data_context=None):
     organism_id = config['organism_id'] 
     
     # Store the value as a JSON string for flexibility
-    value_str = json.dumps(input_data)
+    value_str = json.dumps(to_builtin(input_data))
     
     conn = database.get_db_connection()
     # Use REPLACE to handle both insert and update
@@ -279,6 +371,87 @@ def read_from_memory(config, input_data, data_context=None):
         print(f"  -> No value found in memory for key '{key}'")
         return None # Return None if the key doesn't exist
 
+# --- Set-backed memory ---
+# FilterNotInSet and AddToSet keep e.g. processed IDs as rows of a per-organism
+# set, so deduplication reads and writes only this run's items instead of the
+# whole history. Members are stored as strings (so 42 and "42" are the same
+# member); dicts and lists are stored as canonical JSON.
+
+def _set_member(value):
+    if isinstance(value, (dict, list)):
+        return json.dumps(to_builtin(value), sort_keys=True, default=str)
+    return str(value)
+
+def _set_keys(config, items):
+    """(index, member) for each item that has a member: its config['field'], or the item itself without a field."""
+    field = config.get('field')
+    for index, item in enumerate(items):
+        if field is None:
+            if item is not None:
+                yield index, _set_member(item)
+        elif isinstance(item, collections.abc.Mapping) and item.get(field) is not None:
+            yield index, _set_member(item[field])
+
+def filter_not_in_set(config, input_data, data_context=None):
+    """
+    [GENE] FilterNotInSet
+    description: Keeps the items whose field value is not yet a member of the organism's named set (e.g. items not processed before). Items without the field are dropped. Use AddToSet afterwards to record them.
+    config: { 'set': 'processed_ids', 'field': 'id' } (without 'field', the items themselves are the values)
+    manifest:
+      inputs:
+        - name: input_data
+          type: list_of_dicts
+        - name: config.set
+          type: string
+        - name: config.field
+          type: string
+      outputs:
+        - type: list_of_dicts
+    """
+    set_name = config['set']
+    organism_id = config['organism_id']
+    if not input_data:
+        print(f"  -> No items to check against set '{set_name}'.")
+        return []
+    keys = list(_set_keys(config, input_data))
+    seen = database.find_set_members(organism_id, set_name, (member for _, member in keys))
+    keep = [index for index, member in keys if member not in seen]
+    print(f"  -> {len(keep)} of {len(input_data)} items are not in set '{set_name}'.")
+    if isinstance(input_data, RecordBatch):
+        mask = np.zeros(len(input_data), dtype=bool)
+        mask[keep] = True
+        return input_data.take(mask)
+    return [input_data[index] for index in keep]
+
+def add_to_set(config, input_data, data_context=None):
+    """
+    [GENE] AddToSet
+    description: Adds values to the organism's named set: the field of each input item, or the input values themselves. Members already in the set are ignored.
+    config: { 'set': 'processed_ids', 'field': 'id' } (without 'field', the items themselves are the values)
+    manifest:
+      inputs:
+        - name: input_data
+          type: list_of_dicts
+        - name: config.set
+          type: string
+        - name: config.field
+          type: string
+      outputs:
+        - type: dict
+          keys: ['status', 'set', 'added']
+    """
+    set_name = config['set']
+    organism_id = config['organism_id']
+    if input_data is None:
+        items = []
+    elif isinstance(input_data, (list, tuple, RecordBatch)):
+        items = input_data
+    else:
+        items = [input_data]
+    added = database.add_set_members(organism_id, set_name, [member for _, member in _set_keys(config, items)])
+    print(f"  -> Added {added} new members to set '{set_name}'.")
+    return {"status": "success", "set": set_name, "added": added}
+
 def merge_data(config, input_data, data_context):
     """
     [GENE] MergeData
@@ -304,6 +477,12 @@ def merge_data(config, input_data, data_context):
     if not dedup_field:
         raise ValueError("MergeData config requires 'deduplicate_by_field'.")
 
+    sources = [data_context.get(key) for key in keys_to_merge]
+    if any(isinstance(source, RecordBatch) for source in sources):
+        merged_batch = _merge_batches(sources, dedup_field)
+        print(f"  -> Merged lists into a single list of {len(merged_batch)} unique items.")
+        return merged_batch
+
     seen_ids = set()
 
     for key in keys_to_merge:
@@ -319,6 +498,31 @@ def merge_data(config, input_data, data_context):
     print(f"  -> Merged lists into a single list of {len(merged_list)} unique items.")
     return merged_list
 
+def _merge_batches(sources, dedup_field):
+    """MergeData for sources that include RecordBatches: concatenates the columns and keeps each dedup value's first row."""
+    batches = []
+    for source in sources:
+        if isinstance(source, RecordBatch):
+            batches.append(source)
+        elif isinstance(source, list):
+            batches.append(RecordBatch.from_records(item for item in source if isinstance(item, dict)))
+    combined = RecordBatch.concat(batches)
+    candidates = np.flatnonzero(combined.present(dedup_field))
+    if not len(candidates):
+        return combined.take(candidates)
+    values = combined.column(dedup_field)[candidates]
+    try:
+        _, first = np.unique(values, return_index=True)
+        keep = candidates[np.sort(first)]
+    except TypeError:
+        # Values of mixed types cannot be sorted; fall back to a set of seen values.
+        seen_ids, keep = set(), []
+        for index, item_id in zip(candidates, values.tolist()):
+            if item_id not in seen_ids:
+                seen_ids.add(item_id)
+                keep.append(index)
+    return combined.take(np.asarray(keep, dtype=np.intp))
+
 def extract_field_list(config, input_data, data_context=None):
     """
     [GENE] ExtractFieldList
@@ -336,6 +540,11 @@ def extract_field_list(config, input_data, data_context=None):
     if not field:
         raise ValueError("ExtractFieldList requires 'field' in config.")
     
+    if isinstance(input_data, RecordBatch):
+        extracted_list = input_data.column(field)[input_data.present(field)].tolist() if field in input_data.fields else []
+        print(f"  -> Extracted {len(extracted_list)} '{field}' values.")
+        return extracted_list
+
     if not isinstance(input_data, list):
         print("Warning: Input to ExtractFieldList is not a list. Returning empty list.")
         return []
@@ -348,6 +557,15 @@ def extract_field_list(config, input_data, data_context=None):
     print(f"  -> Extracted {len(extracted_list)} '{field}' values.")
     return extracted_list
 
+def extract_field_list_stream(config, items, data_context=None):
+    """Streaming form of ExtractFieldList: yields the field's value from each item that has it."""
+    field = config.get('field')
+    if not field:
+        raise ValueError("ExtractFieldList requires 'field' in config.")
+    for item in items:
+        if isinstance(item, collections.abc.Mapping) and field in item:  # dicts and RecordBatch rows
+            yield item[field]
+
 def fetch_news_api(config, input_data=None, data_context=None):
     """
     [GENE] FetchNewsAPI
@@ -374,7 +592,7 @@ def fetch_news_api(config, input_data=None, data_context=None):
     }
 
     try:
-        response = requests.get(base_url, params=params, timeout=10)
+        response = requests.get(base_url, params=params, timeout=capped_timeout(10))
         response.raise_for_status() # Raise HTTPError for bad responses (4xx or 5xx)
         articles_data = response.json().get("articles", [])
 
@@ -411,6 +629,7 @@ def summarize_articles(config, input_data, data_context=None):
         print("No articles to summarize.")
         return []
 
+    input_data = to_builtin(input_data)  # Articles are annotated in place, which a RecordBatch does not allow.
     summarized_articles = []
     client = OpenAI() # Assumes OPENAI_API_KEY is loaded globally or by dotenv in genes.py
 
@@ -578,7 +797,7 @@ def execute_in_runtime(config, input_data, data_context):
     timeout = config.get("timeout", 60)
     try:
         args = shlex.split(command)
-        process = subprocess.run(args, capture_output=True, text=True, timeout=timeout)
+        process = subprocess.run(args, capture_output=True, text=True, timeout=capped_timeout(timeout))
         return {"command": command, "stdout": process.stdout.strip(), "stderr": process.stderr.strip(), "return_code": process.returncode}
     # ... (rest of the exception handling is the same) ...
     except Exception as e:
@@ -693,7 +912,7 @@ def generic_api_call(config, input_data, data_context):
             headers=headers,
             params=params,
             json=json_body if method in ["POST", "PUT"] else None,
-            timeout=timeout
+            timeout=capped_timeout(timeout)
         )
         
         # Attempt to parse the response body as JSON, fall back to raw text
@@ -714,6 +933,104 @@ def generic_api_call(config, input_data, data_context):
             "reason": str(e)
         }
 
+FOREACH_MAX_CONCURRENCY = int(os.environ.get("FOUNDRY_FOREACH_MAX_CONCURRENCY", 8))
+
+def for_each(config, input_data, data_context):
+    """
+    Runs a nested list of genes once per item of the input list, several items
+    at a time. Each item runs as its own small organism whose initial_input is
+    the item, so the nested genes read it with "input_from": "initial_input".
+    manifest:
+      type: ForEach
+      description: "Applies a sequence of genes to every item of a list (e.g. summarize or enrich each article), running up to max_concurrency items in parallel. A failing item does not stop the others."
+      config_schema:
+        - name: genes
+          type: list
+          required: true
+          description: "The gene definitions to run for each item, in the same format as a genome's 'genes'."
+        - name: output
+          type: string
+          required: false
+          description: "The key of the nested run's data_context to collect per item. Defaults to the last nested gene's output."
+        - name: max_concurrency
+          type: int
+          required: false
+          description: "How many items run at once (default FOUNDRY_FOREACH_MAX_CONCURRENCY, 8)."
+        - name: ordered
+          type: bool
+          required: false
+          description: "Keep results in input order (default true); false collects them as items finish."
+        - name: on_error
+          type: string
+          required: false
+          description: "'skip' (default) drops failed items, 'include' puts an {'error': ..., 'index': i} record in their place, 'fail' fails the gene."
+      inputs:
+        - name: items
+          type: list_of_dicts
+          required: true
+      outputs:
+        - type: list
+          description: "One result per item."
+    """
+    from engine import run_organism
+    import concurrent.futures
+    import contextvars
+    from run_control import current_token
+    from spill import resolve
+
+    nested = config.get("genes")
+    if not isinstance(nested, list) or not nested:
+        return {"error": "ForEach requires a non-empty 'genes' list in its config."}
+    if input_data is None:
+        input_data = []
+    if not isinstance(input_data, (list, RecordBatch)):
+        return {"error": "ForEach requires a list as input.", "received_type": type(input_data).__name__}
+    items = to_builtin(input_data)
+
+    last = nested[-1]
+    output_key = config.get("output") or last.get("output_as", last.get("id"))
+    on_error = config.get("on_error", "skip")
+    # Items already run side by side, so each one runs its genes in order.
+    sub_genome = json.dumps({
+        "name": "ForEach item",
+        "genes": nested,
+        "execution": {"mode": "sequential", **(config.get("execution") or {})},
+    })
+
+    def run_item(index, item):
+        log, status, context = run_organism(sub_genome, config.get("run_id"), config.get("organism_id"), item)
+        if status != "success":
+            errors = [line.strip() for line in log.splitlines() if "**" in line]
+            return index, False, {"error": f"Item {index} {status}.", "index": index,
+                                  "reason": errors[-1] if errors else status}
+        return index, True, resolve(context.get(output_key))
+
+    workers = max(1, min(config.get("max_concurrency") or FOREACH_MAX_CONCURRENCY, len(items) or 1))
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as pool:
+        # copy_context carries the run's CancelToken to the item threads.
+        futures = [pool.submit(contextvars.copy_context().run, run_item, i, item) for i, item in enumerate(items)]
+        outcomes = [future.result() for future in concurrent.futures.as_completed(futures)]
+
+    token = current_token()
+    if token is not None:
+        token.check()
+    if config.get("ordered", True):
+        outcomes.sort(key=lambda outcome: outcome[0])
+
+    results, failed = [], []
+    for index, succeeded, result in outcomes:
+        if not succeeded:
+            failed.append(result)
+            print(f"  -> {result['error']} {result['reason']}")
+            if on_error == "include":
+                results.append(result)
+        else:
+            results.append(result)
+    print(f"  -> ForEach: {len(items) - len(failed)} of {len(items)} items succeeded ({workers} at a time).")
+    if failed and on_error == "fail":
+        raise Exception(f"ForEach: {len(failed)} of {len(items)} items failed; first: {failed[0]['reason']}")
+    return results
+
 # --- Update the GENE_MAP ---
 GENE_MAP = {
     "StoreValue": store_value,
@@ -723,6 +1040,8 @@ GENE_MAP = {
     "PostToSlack": post_to_slack,
     "WriteToMemory": write_to_memory,
     "ReadFromMemory": read_from_memory,
+    "FilterNotInSet": filter_not_in_set,
+    "AddToSet": add_to_set,
     "MergeData": merge_data,
     "ExtractFieldList": extract_field_list,
     "SummarizeArticles": summarize_articles,
@@ -733,4 +1052,52 @@ GENE_MAP = {
     "ConditionalBranch": conditional_branch,
     "CognitiveConductor": cognitive_conductor,
     "GenericAPI": generic_api_call,
+    "ForEach": for_each,
+}
+
+# --- Streaming forms ---
+# Item-wise genes also expose a generator form as '<gene function>.stream',
+# taking (config, items, data_context) with items any iterable. When such genes
+# feed each other directly, the engine chains the generators lazily instead of
+# materializing a list between them. The list forms above are unchanged.
+fetch_reddit_posts.stream = fetch_reddit_posts_stream
+analyze_sentiment.stream = analyze_sentiment_stream
+filter_data.stream = filter_data_stream
+extract_field_list.stream = extract_field_list_stream
+
+# --- Engine hints per gene type ---
+# 'private_context': the gene mutates values it finds in data_context, so the
+#     engine hands it a deep copy instead of the shared read-only snapshot.
+# 'context_keys': config fields whose values name data_context keys the gene
+#     reads, so the engine's dependency graph can see them.
+# 'reads_context': the gene may read any data_context key (e.g. templates), so
+#     it runs only after every earlier gene has finished.
+# 'stateful': the gene touches state outside the data_context (organism memory,
+#     external services, the shell); stateful genes keep their genome order.
+# 'coalesce': the gene is a read-only fetch; identical calls from concurrent
+#     organisms share one request (FOUNDRY_COALESCE_WINDOW seconds of reuse).
+# 'executor': 'process' marks CPU-bound genes the engine runs on the process
+#     pool (see process_pool) when their input is large enough.
+# 'chunkable': the gene maps a list item by item, so a large input can be split
+#     into chunks that run on several worker processes at once.
+# 'sub_genome': the config field holding a nested gene list the gene runs on
+#     its own; its templates are not reads of this run's data_context, and the
+#     gene is stateful if any nested gene is.
+GENE_TRAITS = {
+    "FetchRedditPosts": {"coalesce": True},
+    "FetchNewsAPI": {"coalesce": True},
+    "AnalyzeSentiment": {"executor": "process", "chunkable": True},
+    "FilterData": {"context_keys": ["value_from_context"]},
+    "MergeData": {"context_keys": ["source_keys"]},
+    "PostToSlack": {"stateful": True},
+    "WriteToMemory": {"stateful": True},
+    "ReadFromMemory": {"stateful": True},
+    "FilterNotInSet": {"stateful": True},
+    "AddToSet": {"stateful": True},
+    "SaveToVectorMemory": {"stateful": True},
+    "QueryVectorMemory": {"stateful": True},
+    "ExecuteInRuntime": {"stateful": True, "reads_context": True},
+    "CognitiveConductor": {"stateful": True},
+    "GenericAPI": {"stateful": True},
+    "ForEach": {"sub_genome": "genes"},
 }
@@ -119,23 +119,16 @@ def generate_genome_from_prompt(user_prompt):
             ```
 
     3.  **Comprehensive Deduplication and Processed ID Memory Management:** To prevent re-processing or re-alerting on already seen items, you MUST implement this exact pattern:
-        *   Read existing processed IDs from memory (`ReadFromMemory`).
-        *   Filter current items against these `processed_ids` (`FilterData` with `condition: "not_in"`).
-        *   Extract IDs from the new, unfiltered items (`ExtractFieldList`).
-        *   Merge the newly extracted IDs with the previously `processed_ids` (`MergeData`).
-        *   Write the comprehensive, updated list of `processed_ids` back to memory (`WriteToMemory`).
-        *   **Note:** The output of `filter_already_seen` (`new_unseen_items`) should then be used by subsequent processing steps (like summarization or alerting), while the ID management (from `extract_ids_from_new` onwards) runs in parallel to update memory.
+        *   Filter current items against the organism's set of processed IDs (`FilterNotInSet`).
+        *   Record the IDs of the new items in that set (`AddToSet`).
+        *   **Note:** The output of `filter_already_seen` (`new_unseen_items`) should then be used by subsequent processing steps (like summarization or alerting). `AddToSet` only adds this run's new IDs; do NOT read, merge and rewrite a list of all processed IDs with `ReadFromMemory`/`MergeData`/`WriteToMemory`.
         *   *Example Sub-pattern (assuming 'initial_items' is your current list of items, and 'item_id_field' is the unique identifier field like "id"):*
             ```json
             [
-              {{ "id": "read_memory_ids", "type": "ReadFromMemory", "config": {{ "key": "all_processed_ids" }}, "output_as": "old_processed_ids" }},
-              {{ "id": "filter_already_seen", "type": "FilterData", "input_from": "initial_items", "config": {{ "field": "item_id_field", "condition": "not_in", "value_from_context": "old_processed_ids" }}, "output_as": "new_unseen_items" }},
-              {{ "id": "extract_ids_from_new", "type": "ExtractFieldList", "input_from": "new_unseen_items", "config": {{ "field": "item_id_field" }}, "output_as": "newly_seen_ids" }},
-              {{ "id": "merge_all_ids", "type": "MergeData", "config": {{ "source_keys": ["old_processed_ids", "newly_seen_ids"], "deduplicate_by_field": "id" }}, "output_as": "updated_all_processed_ids" }},
-              {{ "id": "write_updated_ids", "type": "WriteToMemory", "input_from": "updated_all_processed_ids", "config": {{ "key": "all_processed_ids" }} }}
+              {{ "id": "filter_already_seen", "type": "FilterNotInSet", "input_from": "initial_items", "config": {{ "set": "processed_ids", "field": "item_id_field" }}, "output_as": "new_unseen_items" }},
+              {{ "id": "remember_new_ids", "type": "AddToSet", "input_from": "new_unseen_items", "config": {{ "set": "processed_ids", "field": "item_id_field" }} }}
             ]
             ```
-            
 
     4.  **Summarization:** Use `SummarizeArticles` for generating concise article summaries. Its output (list of dicts with 'summary' field) can be directly used for sentiment analysis and storage.
 
@@ -0,0 +1,137 @@
+import io
+import os
+import time
+import threading
+import contextlib
+import multiprocessing
+import concurrent.futures
+from concurrent.futures.process import BrokenProcessPool
+import genes
+import run_control
+import resource_usage
+from record_batch import RecordBatch
+
+# --- Process-pool execution for CPU-bound genes ---
+# Gene threads share the GIL, so CPU-bound genes (VADER scoring, embeddings)
+# serialize each other. Genes with "executor": "process" (or the 'executor'
+# trait in GENE_TRAITS) run on a warm pool of worker processes instead. Only
+# the gene type name, config, input and the context keys the gene reads are
+# sent; workers look the gene up in their own GENE_MAP. Large list inputs of
+# item-wise genes (the 'chunkable' trait) are split into chunks that run on
+# several workers at once.
+
+PROCESS_WORKERS = int(os.environ.get("FOUNDRY_PROCESS_WORKERS", os.cpu_count() or 1))
+PROCESS_CHUNK_SIZE = int(os.environ.get("FOUNDRY_PROCESS_CHUNK_SIZE", 256))
+# Inputs smaller than this stay in-thread for genes that only get the process
+# executor from their traits; pickling a handful of items costs more than it saves.
+PROCESS_MIN_ITEMS = int(os.environ.get("FOUNDRY_PROCESS_MIN_ITEMS", 64))
+
+# Modules the fork server imports once, so every worker starts warm. Importing
+# the genes is cheap: the vector store and embedding model load on first use.
+_PRELOAD = ['genes']
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def start_method():
+    """The multiprocessing start method: FOUNDRY_PROCESS_START_METHOD, else forkserver where available, else spawn."""
+    method = os.environ.get("FOUNDRY_PROCESS_START_METHOD")
+    if method:
+        return method
+    return 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+
+
+def enabled():
+    return PROCESS_WORKERS > 0
+
+
+def runs_in_process(gene_type, function):
+    """Whether function is the registered gene a worker process would find under gene_type."""
+    return enabled() and genes.GENE_MAP.get(gene_type) is function
+
+
+def _pool_instance():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            context = multiprocessing.get_context(start_method())
+            if context.get_start_method() == 'forkserver':
+                context.set_forkserver_preload(_PRELOAD)
+            _pool = concurrent.futures.ProcessPoolExecutor(
+                max_workers=PROCESS_WORKERS, mp_context=context
+            )
+        return _pool
+
+
+def shutdown():
+    """Stops the worker processes; the next process gene starts a fresh pool."""
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+def _run_in_worker(gene_type, config, input_data, context):
+    """Runs one gene call in a worker. Returns (result, printed log, cpu seconds, (user, sys) seconds)."""
+    log = io.StringIO()
+    cpu_start = time.process_time()
+    user_start, sys_start = resource_usage.process_cpu()
+    with contextlib.redirect_stdout(log):
+        result = genes.GENE_MAP[gene_type](config, input_data, context)
+    user, system = resource_usage.process_cpu()
+    return result, log.getvalue(), time.process_time() - cpu_start, (user - user_start, system - sys_start)
+
+
+def _chunks(input_data, chunk_size):
+    return [input_data[start:start + chunk_size] for start in range(0, len(input_data), chunk_size)]
+
+
+def _wait(futures):
+    """Waits for the futures, dropping queued chunks and raising RunCancelled if the run is cancelled."""
+    token = run_control.current_token()
+    pending = set(futures)
+    while pending:
+        _, pending = concurrent.futures.wait(pending, timeout=0.1)
+        if token is not None and token.cancelled:
+            for future in pending:
+                future.cancel()
+            token.check()
+
+
+def run_gene(gene_type, config, input_data, context, chunk_size=None):
+    """
+    Runs a gene on the process pool. Returns (result, cpu_seconds). A list
+    input longer than chunk_size is split into chunks run side by side and the
+    chunk results are concatenated in order. The workers' printed output is
+    replayed here, so it lands in the run's log.
+    """
+    chunked = chunk_size and isinstance(input_data, (list, RecordBatch)) and len(input_data) > chunk_size
+    parts = _chunks(input_data, chunk_size) if chunked else [input_data]
+    try:
+        pool = _pool_instance()
+        futures = [pool.submit(_run_in_worker, gene_type, config, part, context) for part in parts]
+        _wait(futures)
+        outcomes = [future.result() for future in futures]
+    except BrokenProcessPool:
+        shutdown()  # A worker died (e.g. out of memory); start over on the next call.
+        raise
+
+    results, cpu_seconds = [], 0.0
+    for result, log, cpu, (user, system) in outcomes:
+        print(log, end="")
+        results.append(result)
+        cpu_seconds += cpu
+        resource_usage.add_cpu(user, system)  # The calling thread only waited; the workers did the work.
+    if not chunked:
+        return results[0], cpu_seconds
+    if all(isinstance(result, RecordBatch) for result in results):
+        return RecordBatch.concat(results), cpu_seconds
+    for result in results:
+        if not isinstance(result, list):
+            return result, cpu_seconds  # e.g. an {"error": ...} from one chunk
+    combined = []
+    for result in results:
+        combined.extend(result)
+    return combined, cpu_seconds
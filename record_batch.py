@@ -0,0 +1,219 @@
+import sys
+import collections.abc
+import numpy as np
+
+# --- Columnar record batches ---
+# Most genes pass list_of_dicts around. A RecordBatch holds the same records as
+# one NumPy array per field, so the data-shaping genes (FilterData,
+# ExtractFieldList, MergeData) can work a column at a time instead of looping
+# over dicts in Python. It still behaves like a read-only list of dicts
+# (len, indexing, iteration, row.get(...)), so genes that know nothing about
+# batches keep working. Genes opt in with "columnar": true, or a whole genome
+# with "execution": {"columnar": true}.
+
+
+class RecordRow(collections.abc.Mapping):
+    """Dict-compatible view of one row of a RecordBatch."""
+
+    __slots__ = ('_batch', '_index')
+
+    def __init__(self, batch, index):
+        self._batch = batch
+        self._index = index
+
+    def __getitem__(self, field):
+        if not self._batch.has(field, self._index):
+            raise KeyError(field)
+        return _python(self._batch._columns[field][self._index])
+
+    def __iter__(self):
+        return (field for field in self._batch.fields if self._batch.has(field, self._index))
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __contains__(self, field):
+        return self._batch.has(field, self._index)
+
+    def __eq__(self, other):
+        return dict(self) == other
+
+    def __repr__(self):
+        return repr(dict(self))
+
+
+class RecordBatch(collections.abc.Sequence):
+    """
+    Immutable columnar table of records. columns maps each field to a NumPy
+    array; present optionally maps a field to a boolean array marking the rows
+    that have it (fields missing from some records); strings names the object
+    columns whose values are all str.
+    """
+
+    def __init__(self, columns, length, present=None, strings=()):
+        self._columns = dict(columns)
+        self._present = dict(present or {})
+        self._strings = frozenset(strings)
+        self._length = length
+
+    @classmethod
+    def from_records(cls, records):
+        """Builds a batch from an iterable of dicts."""
+        records = list(records)
+        fields = {}
+        for record in records:
+            for field in record:
+                fields.setdefault(field, None)
+        columns, present, strings = {}, {}, set()
+        for field in fields:
+            mask = np.fromiter((field in record for record in records), dtype=bool, count=len(records))
+            columns[field], is_str = _column([record.get(field) for record in records], mask)
+            if not mask.all():
+                present[field] = mask
+            if is_str:
+                strings.add(field)
+        return cls(columns, len(records), present, strings)
+
+    @classmethod
+    def concat(cls, batches):
+        """Stacks batches row-wise; fields missing from a batch are marked absent for its rows."""
+        batches = [batch for batch in batches if len(batch)]
+        fields = {}
+        for batch in batches:
+            for field in batch.fields:
+                fields.setdefault(field, None)
+        columns, present = {}, {}
+        strings = {field for field in fields if all(field in batch._strings or field not in batch._columns for batch in batches)}
+        for field in fields:
+            parts, masks = [], []
+            for batch in batches:
+                if field in batch._columns:
+                    parts.append(batch._columns[field])
+                    masks.append(batch.present(field))
+                else:
+                    parts.append(np.full(len(batch), None, dtype=object))
+                    masks.append(np.zeros(len(batch), dtype=bool))
+            dtypes = {part.dtype for part in parts}
+            columns[field] = np.concatenate(parts if len(dtypes) == 1 else [part.astype(object) for part in parts])
+            mask = np.concatenate(masks)
+            if not mask.all():
+                present[field] = mask
+        return cls(columns, sum(len(batch) for batch in batches), present, strings)
+
+    @property
+    def fields(self):
+        return list(self._columns)
+
+    @property
+    def nbytes(self):
+        """Approximate size: the column buffers, plus the objects held by object columns."""
+        total = 0
+        for column in self._columns.values():
+            total += column.nbytes
+            if column.dtype == object and len(column):
+                sample = column[:50]
+                total += sum(sys.getsizeof(value) for value in sample) * len(column) // len(sample)
+        return total
+
+    def column(self, field):
+        """The field's array (rows without the field hold a filler value; see present())."""
+        return self._columns[field]
+
+    def present(self, field):
+        """Boolean array of the rows that have field."""
+        if field not in self._columns:
+            return np.zeros(self._length, dtype=bool)
+        mask = self._present.get(field)
+        return mask if mask is not None else np.ones(self._length, dtype=bool)
+
+    def is_string(self, field):
+        """Whether every present value of field is a str."""
+        return field in self._strings
+
+    def has(self, field, index):
+        if field not in self._columns:
+            return False
+        mask = self._present.get(field)
+        return mask is None or bool(mask[index])
+
+    def take(self, selector):
+        """A new batch of the rows picked by a boolean mask or an array of indices."""
+        columns = {field: column[selector] for field, column in self._columns.items()}
+        present = {field: mask[selector] for field, mask in self._present.items()}
+        length = len(next(iter(columns.values()))) if columns else int(np.count_nonzero(selector))
+        return RecordBatch(columns, length, present, self._strings)
+
+    def with_column(self, field, values):
+        """A new batch with field set to values (one per row) on every row."""
+        columns = dict(self._columns)
+        columns[field], is_str = _column(list(values), np.ones(self._length, dtype=bool))
+        present = {name: mask for name, mask in self._present.items() if name != field}
+        strings = (self._strings | {field}) if is_str else (self._strings - {field})
+        return RecordBatch(columns, self._length, present, strings)
+
+    def to_records(self):
+        """The batch as a plain list of dicts."""
+        return [dict(row) for row in self]
+
+    def __len__(self):
+        return self._length
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self.take(np.arange(self._length)[index])
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError("RecordBatch index out of range")
+        return RecordRow(self, index)
+
+    def __eq__(self, other):
+        if isinstance(other, (RecordBatch, list)):
+            return len(self) == len(other) and all(row == item for row, item in zip(self, other))
+        return NotImplemented
+
+    def __repr__(self):
+        return f"RecordBatch({self._length} rows, fields={self.fields})"
+
+    def __reduce__(self):
+        return RecordBatch, (self._columns, self._length, self._present, self._strings)
+
+
+def _column(values, mask):
+    """
+    Packs one field's values into the narrowest array that round-trips them
+    (bool, int64, float64 or object; ints mixed with floats stay
+    objects so they come back unchanged). Returns (array, whether all present values are str).
+    """
+    present = [value for value, has in zip(values, mask) if has]
+    if present and all(isinstance(value, bool) for value in present):
+        dtype, filler = bool, False
+    elif present and all(isinstance(value, int) and not isinstance(value, bool) for value in present):
+        dtype, filler = np.int64, 0
+        if any(abs(value) >= 2 ** 63 for value in present):
+            dtype, filler = object, None
+    elif present and all(isinstance(value, float) for value in present):
+        dtype, filler = np.float64, 0.0
+    else:
+        dtype, filler = object, None
+    if dtype is object:
+        column = np.empty(len(values), dtype=object)
+        column[:] = [value if has else None for value, has in zip(values, mask)]
+        return column, bool(present) and all(isinstance(value, str) for value in present)
+    return np.array([value if has else filler for value, has in zip(values, mask)], dtype=dtype), False
+
+
+def _python(value):
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def columnar(value):
+    """Converts a non-empty list of dicts to a RecordBatch; any other value is returned unchanged."""
+    if isinstance(value, list) and value and all(isinstance(item, collections.abc.Mapping) for item in value):
+        return RecordBatch.from_records(value)
+    return value
+
+
+def to_builtin(value):
+    """A RecordBatch as a list of dicts (for JSON), any other value unchanged."""
+    return value.to_records() if isinstance(value, RecordBatch) else value
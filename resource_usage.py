@@ -0,0 +1,273 @@
+import os
+import sys
+import time
+import threading
+import contextlib
+import contextvars
+import tracemalloc
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# --- Per-run resource accounting ---
+# Every run carries a RunUsage that collects what it cost:
+#   CPU user/sys time of its genes (each gene call is measured on its own
+#     thread, plus the worker processes of process-pool genes),
+#   how far the process's peak RSS grew while it ran,
+#   optionally, tracemalloc's peak and the top allocation sites of each gene,
+#   requests made through the `requests` library, and bytes sent/received.
+# Like the CancelToken, the current run's RunUsage lives in a context
+# variable, so gene threads started with copy_context() report to the right
+# run. A sub-organism's usage is added to its parent's as well.
+
+TRACE_ALLOCATIONS = os.environ.get("FOUNDRY_TRACE_ALLOCATIONS") == "1"
+TOP_ALLOCATIONS = 3
+
+_current_usage = contextvars.ContextVar('current_usage', default=None)
+_thread_state = threading.local()
+
+
+class RunUsage:
+    """Resource counters of one run. Pass one to run_organism(usage=...) to read them afterwards."""
+
+    FIELDS = ('cpu_user_s', 'cpu_sys_s', 'peak_rss_delta_bytes', 'alloc_peak_bytes',
+              'http_requests', 'http_bytes_sent', 'http_bytes_received')
+
+    def __init__(self):
+        self.parent = None
+        self.trace_allocations = False
+        self.cpu_user_s = self.cpu_sys_s = 0.0
+        self.peak_rss_delta_bytes = self.alloc_peak_bytes = None
+        self.http_requests = self.http_bytes_sent = self.http_bytes_received = 0
+        self._rss_start = None
+        self._lock = threading.Lock()
+
+    def begin(self, trace_allocations=False):
+        """Called by the engine as the run starts."""
+        parent = current_usage()
+        self.parent = parent if parent is not self else None
+        self.trace_allocations = trace_allocations
+        self._rss_start = peak_rss()
+        if trace_allocations:
+            _start_tracing()
+
+    def end(self):
+        """Called by the engine as the run finishes."""
+        rss = peak_rss()
+        if rss is not None and self._rss_start is not None:
+            self.peak_rss_delta_bytes = rss - self._rss_start
+        if self.trace_allocations:
+            self.alloc_peak_bytes = _stop_tracing()
+
+    def add(self, **amounts):
+        """Adds to the counters (cpu_user_s=..., http_bytes_sent=..., ...), and to the parent run's."""
+        with self._lock:
+            for field, amount in amounts.items():
+                setattr(self, field, getattr(self, field) + amount)
+        if self.parent is not None:
+            self.parent.add(**amounts)
+
+    def as_dict(self):
+        return {field: getattr(self, field) for field in self.FIELDS}
+
+    def report(self):
+        line = f"--- Resources: CPU {self.cpu_user_s:.2f}s user / {self.cpu_sys_s:.2f}s sys"
+        if self.peak_rss_delta_bytes is not None:
+            line += f", peak RSS +{_format_bytes(self.peak_rss_delta_bytes)}"
+        if self.alloc_peak_bytes is not None:
+            line += f", traced allocations peak {_format_bytes(self.alloc_peak_bytes)}"
+        if self.http_requests:
+            line += (f", HTTP {self.http_requests} requests ({_format_bytes(self.http_bytes_sent)} sent, "
+                     f"{_format_bytes(self.http_bytes_received)} received)")
+        print(line + " ---")
+
+
+def current_usage():
+    """Returns the RunUsage of the run executing in this thread/task, or None."""
+    return _current_usage.get()
+
+
+@contextlib.contextmanager
+def use_usage(usage):
+    """Makes usage the current run's RunUsage for this thread or asyncio task."""
+    reset = _current_usage.set(usage)
+    try:
+        yield usage
+    finally:
+        _current_usage.reset(reset)
+
+
+def _format_bytes(size):
+    for unit in ("B", "KB", "MB"):
+        if abs(size) < 1024:
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GB"
+
+
+# --- CPU ---
+
+def thread_cpu():
+    """(user, sys) CPU seconds of the calling thread (all counted as user where the split is unavailable)."""
+    if resource is not None and hasattr(resource, 'RUSAGE_THREAD'):
+        usage = resource.getrusage(resource.RUSAGE_THREAD)
+        return usage.ru_utime, usage.ru_stime
+    return time.thread_time(), 0.0
+
+
+def process_cpu():
+    """(user, sys) CPU seconds of the whole process."""
+    if resource is not None:
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        return usage.ru_utime, usage.ru_stime
+    times = os.times()
+    return times.user, times.system
+
+
+@contextlib.contextmanager
+def measured_cpu():
+    """
+    Adds the CPU time the calling thread spends inside the block to the
+    current run. Time already claimed by a nested measurement on the same
+    thread (a sub-organism run inline by a gene) is not counted twice.
+    """
+    usage = current_usage()
+    outer = getattr(_thread_state, 'claimed', (0.0, 0.0))
+    _thread_state.claimed = (0.0, 0.0)
+    start = thread_cpu()
+    try:
+        yield
+    finally:
+        end = thread_cpu()
+        user, system = end[0] - start[0], end[1] - start[1]
+        nested = _thread_state.claimed
+        _thread_state.claimed = (outer[0] + user, outer[1] + system)
+        if usage is not None:
+            usage.add(cpu_user_s=max(user - nested[0], 0.0), cpu_sys_s=max(system - nested[1], 0.0))
+
+
+def add_cpu(user, system):
+    """Adds CPU time spent elsewhere on the run's behalf (e.g. in a worker process) to the current run."""
+    usage = current_usage()
+    if usage is not None:
+        usage.add(cpu_user_s=user, cpu_sys_s=system)
+
+
+# --- Memory ---
+
+def peak_rss():
+    """The process's peak resident set size in bytes so far, or None where unavailable."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024  # Linux reports KB.
+
+
+_tracing_lock = threading.Lock()
+_tracing_users = 0
+_tracing_started = False
+
+
+def _start_tracing():
+    global _tracing_users, _tracing_started
+    with _tracing_lock:
+        if _tracing_users == 0:
+            _tracing_started = not tracemalloc.is_tracing()
+            if _tracing_started:
+                tracemalloc.start()
+            else:
+                tracemalloc.reset_peak()
+        _tracing_users += 1
+
+
+def _stop_tracing():
+    """Returns tracemalloc's peak, stopping it once no run is tracing."""
+    global _tracing_users
+    with _tracing_lock:
+        peak = tracemalloc.get_traced_memory()[1] if tracemalloc.is_tracing() else None
+        _tracing_users -= 1
+        if _tracing_users == 0 and _tracing_started:
+            tracemalloc.stop()  # Leave tracing that was on before any run alone.
+        return peak
+
+
+_IGNORED_FRAMES = (tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__))
+
+
+@contextlib.contextmanager
+def allocations(span):
+    """
+    In runs with trace_allocations, records the memory a gene allocated (and
+    kept) on its span as 'alloc_bytes' and prints its top allocation sites.
+    Other genes running at the same time show up in the numbers too.
+    """
+    usage = current_usage()
+    if usage is None or not usage.trace_allocations or not tracemalloc.is_tracing():
+        yield
+        return
+    before = tracemalloc.take_snapshot().filter_traces(_IGNORED_FRAMES)
+    try:
+        yield
+    finally:
+        after = tracemalloc.take_snapshot().filter_traces(_IGNORED_FRAMES)
+        growth = [stat for stat in after.compare_to(before, 'lineno') if stat.size_diff > 0]
+        span["alloc_bytes"] = sum(stat.size_diff for stat in growth)
+        if growth:
+            top = ", ".join(f"{os.path.basename(stat.traceback[0].filename)}:{stat.traceback[0].lineno} "
+                            f"({_format_bytes(stat.size_diff)})" for stat in growth[:TOP_ALLOCATIONS])
+            print(f"  -> Top allocations: {top}")
+
+
+# --- HTTP ---
+# Genes call requests.get/post/request directly, so the counters sit on the
+# transport adapter every requests call goes through.
+
+def _request_size(request):
+    body = request.body
+    if isinstance(body, str):
+        body = body.encode('utf-8')
+    size = len(body) if isinstance(body, (bytes, bytearray)) else 0
+    head = f"{request.method} {request.path_url} HTTP/1.1\r\n"
+    return size + len(head) + sum(len(name) + len(value) + 4 for name, value in request.headers.items())
+
+
+def _response_size(response, stream):
+    size = sum(len(name) + len(value) + 4 for name, value in response.headers.items()) + 17
+    if stream:
+        return size + int(response.headers.get('Content-Length') or 0)
+    wire = getattr(response.raw, 'tell', None)
+    try:
+        read = wire() if wire is not None else 0
+    except Exception:
+        read = 0
+    return size + (read if isinstance(read, int) and read > 0 else len(response.content or b''))
+
+
+def _instrument_requests():
+    try:
+        from requests.adapters import HTTPAdapter
+    except ImportError:
+        return
+    if getattr(HTTPAdapter.send, '_counted', False):
+        return
+    send = HTTPAdapter.send
+
+    def counted_send(self, request, stream=False, **kwargs):
+        usage = current_usage()
+        response = send(self, request, stream=stream, **kwargs)
+        if usage is not None:
+            if not stream:
+                response.content  # Read the body now (requests would right after) so its size is known.
+            try:
+                usage.add(http_requests=1, http_bytes_sent=_request_size(request),
+                          http_bytes_received=_response_size(response, stream))
+            except Exception:
+                pass  # Accounting must never break a request.
+        return response
+
+    counted_send._counted = True
+    HTTPAdapter.send = counted_send
+
+
+_instrument_requests()
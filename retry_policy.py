@@ -0,0 +1,128 @@
+import random
+import collections
+import email.utils
+from datetime import datetime, timezone
+
+# --- Declarative retry policies ---
+# A gene opts in with "retry": {"max_attempts": 3, "backoff": 1.0,
+# "max_delay": 60, "retry_on": ["429", "5xx", "ConnectionError"]}. The engine
+# retries failed attempts with full-jitter exponential backoff, and waits as
+# long as a Retry-After header asks when the failure exposes one.
+
+DEFAULT_BACKOFF = 1.0
+DEFAULT_MAX_DELAY = 60.0
+
+# Result statuses retried by default for genes that report HTTP errors in
+# their output (e.g. GenericAPI's {"status_code": 503, ...}) instead of raising.
+_DEFAULT_RETRY_STATUSES = ("429", "5xx")
+
+RetryPolicy = collections.namedtuple('RetryPolicy', ['max_attempts', 'backoff', 'max_delay', 'retry_on'])
+RetryPolicy.__doc__ = "Compiled retry stanza: attempts, base and maximum delay in seconds, and what to retry on (None: any error)."
+
+
+def compile_retry(stanza):
+    """Compiles a gene's retry stanza, or returns None if the gene does not retry."""
+    if not isinstance(stanza, dict) or stanza.get('max_attempts', 1) <= 1:
+        return None
+    retry_on = stanza.get('retry_on')
+    return RetryPolicy(
+        max_attempts=stanza['max_attempts'],
+        backoff=stanza.get('backoff', DEFAULT_BACKOFF),
+        max_delay=stanza.get('max_delay', DEFAULT_MAX_DELAY),
+        retry_on=tuple(str(pattern) for pattern in retry_on) if retry_on else None,
+    )
+
+
+def _chain(error):
+    """The error followed by the exceptions it was raised from or while handling."""
+    seen = []
+    while error is not None and error not in seen:
+        seen.append(error)
+        error = error.__cause__ or error.__context__
+    return seen
+
+
+def _response(error):
+    """The HTTP response attached to an error or its causes (requests, openai), or None."""
+    for exc in _chain(error):
+        response = getattr(exc, 'response', None)
+        if response is not None:
+            return response
+    return None
+
+
+def status_code_of(error):
+    """The HTTP status behind an error, if the error or one of its causes exposes one."""
+    for exc in _chain(error):
+        status = getattr(exc, 'status_code', None)
+        if isinstance(status, int):
+            return status
+    response = _response(error)
+    status = getattr(response, 'status_code', None)
+    return status if isinstance(status, int) else None
+
+
+def _status_matches(status, patterns):
+    code = str(status)
+    return any(pattern == code or (len(pattern) == 3 and pattern.endswith('xx') and code[0] == pattern[0])
+               for pattern in patterns)
+
+
+def should_retry(policy, error):
+    """Whether an exception raised by a gene is worth another attempt under policy."""
+    if policy.retry_on is None:
+        return True
+    status = status_code_of(error)
+    if status is not None and _status_matches(status, policy.retry_on):
+        return True
+    names = {cls.__name__ for exc in _chain(error) for cls in type(exc).__mro__}
+    return any(pattern in names for pattern in policy.retry_on)
+
+
+def retryable_status(policy, output):
+    """The HTTP status of a gene result that reports a retryable error (e.g. a 503 from GenericAPI), or None."""
+    if not isinstance(output, dict) or not isinstance(output.get('status_code'), int):
+        return None
+    status = output['status_code']
+    return status if _status_matches(status, policy.retry_on or _DEFAULT_RETRY_STATUSES) else None
+
+
+def parse_retry_after(value):
+    """Seconds to wait from a Retry-After header value (delta-seconds or HTTP-date), or None."""
+    if value is None:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except (TypeError, ValueError):
+        pass
+    try:
+        when = email.utils.parsedate_to_datetime(str(value))
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max((when - datetime.now(timezone.utc)).total_seconds(), 0.0)
+
+
+def retry_after_of(error=None, output=None):
+    """The Retry-After delay exposed by a failed call's response headers, or None."""
+    if output is not None:
+        headers = output.get('headers') or {}
+    else:
+        headers = getattr(_response(error), 'headers', None) or {}
+    for name, value in headers.items():
+        if name.lower() == 'retry-after':
+            return parse_retry_after(value)
+    return None
+
+
+def backoff_delay(policy, attempt, retry_after=None):
+    """
+    Seconds to wait before the next attempt, after attempt number `attempt`
+    failed: full jitter, uniform in [0, backoff * 2^(attempt-1)] capped at
+    max_delay, unless the server asked for a specific Retry-After (which is
+    also capped at max_delay, so one response cannot stall a run).
+    """
+    if retry_after is not None:
+        return min(retry_after, policy.max_delay)
+    return random.uniform(0, min(policy.max_delay, policy.backoff * 2 ** (attempt - 1)))
@@ -0,0 +1,148 @@
+import time
+import threading
+import contextlib
+import contextvars
+
+# --- Run cancellation ---
+# Every cancellable run carries a CancelToken. The engine checks it between
+# genes and while waiting on a gene, and genes can check it themselves (e.g.
+# to cap an HTTP timeout) through current_token(). Runs started by the app are
+# registered by run ID so the cancel endpoint can reach them.
+
+_current_token = contextvars.ContextVar('current_token', default=None)
+
+
+class RunCancelled(Exception):
+    """Raised when a run is cancelled or runs out of time. status is 'cancelled' or 'timed_out'."""
+
+    def __init__(self, message, status="cancelled"):
+        super().__init__(message)
+        self.status = status
+
+
+class GeneTimeout(RunCancelled):
+    """Raised when a single gene exceeds its 'timeout'."""
+
+    def __init__(self, message):
+        super().__init__(message, status="timed_out")
+
+
+class CancelToken:
+    """
+    Cooperative cancellation flag for one run, with an optional wall-clock
+    deadline. A token created with a parent is also cancelled when the parent
+    is, so sub-organisms stop with the run that started them.
+    """
+
+    def __init__(self, deadline=None, parent=None):
+        self.deadline = deadline
+        self.parent = parent
+        self._event = threading.Event()
+        self._status = None
+        self._reason = None
+
+    def cancel(self, reason="Run cancelled.", status="cancelled"):
+        if not self._event.is_set():
+            self._status, self._reason = status, reason
+            self._event.set()
+
+    @property
+    def cancelled(self):
+        if self._event.is_set():
+            return True
+        if self.deadline is not None and time.monotonic() >= self.deadline:
+            self.cancel("Run exceeded its time budget.", status="timed_out")
+            return True
+        if self.parent is not None and self.parent.cancelled:
+            self.cancel(self.parent._reason, status=self.parent._status)
+            return True
+        return False
+
+    def remaining(self):
+        """Seconds left before the deadline (of this token or a parent), or None without one."""
+        remaining = None
+        if self.deadline is not None:
+            remaining = max(self.deadline - time.monotonic(), 0.0)
+        if self.parent is not None:
+            parent_remaining = self.parent.remaining()
+            if parent_remaining is not None:
+                remaining = parent_remaining if remaining is None else min(remaining, parent_remaining)
+        return remaining
+
+    def check(self):
+        """Raises RunCancelled if the run has been cancelled or is out of time."""
+        if self.cancelled:
+            raise RunCancelled(self._reason, status=self._status)
+
+
+def current_token():
+    """Returns the CancelToken of the run executing in this thread/task, or None."""
+    return _current_token.get()
+
+
+@contextlib.contextmanager
+def use_token(token):
+    """Makes token the current run's CancelToken for this thread or asyncio task."""
+    reset = _current_token.set(token)
+    try:
+        yield token
+    finally:
+        _current_token.reset(reset)
+
+
+def sleep(seconds, token=None):
+    """Sleeps like time.sleep, but wakes up and raises RunCancelled as soon as the run is cancelled."""
+    token = token or current_token()
+    if token is None:
+        time.sleep(seconds)
+        return
+    end = time.monotonic() + seconds
+    while not token.cancelled:
+        remaining = end - time.monotonic()
+        if remaining <= 0:
+            return
+        token._event.wait(min(remaining, 0.1))
+    token.check()
+
+
+def capped_timeout(timeout):
+    """Caps a network timeout (seconds) at the time the current run has left."""
+    token = current_token()
+    remaining = token.remaining() if token is not None else None
+    if remaining is None:
+        return timeout
+    return max(min(timeout, remaining), 0.1)
+
+
+# --- Registry of in-flight runs ---
+
+_active_runs = {}
+_active_lock = threading.Lock()
+
+
+def register(run_id):
+    """Creates and registers the CancelToken for a run started in the background."""
+    token = CancelToken()
+    with _active_lock:
+        _active_runs[run_id] = token
+    return token
+
+
+def unregister(run_id):
+    with _active_lock:
+        _active_runs.pop(run_id, None)
+
+
+def cancel(run_id):
+    """Cancels an in-flight run. Returns False if no such run is active in this process."""
+    with _active_lock:
+        token = _active_runs.get(run_id)
+    if token is None:
+        return False
+    token.cancel(f"Run {run_id} was cancelled.")
+    return True
+
+
+def active_runs():
+    with _active_lock:
+        return sorted(_active_runs)
@@ -0,0 +1,146 @@
+import io
+import sys
+import time
+import threading
+import contextlib
+import contextvars
+
+# --- Per-run log routing ---
+# Genes log with plain print(). Instead of swapping sys.stdout per run (which
+# is process-global and races between concurrent runs), a single router is
+# installed on sys.stdout and forwards each write to the log stream of the
+# current thread or asyncio task.
+
+_current_log = contextvars.ContextVar('current_log', default=None)
+_router_lock = threading.Lock()
+_router_users = 0
+_saved_stdout = None
+
+
+class _LogRouter(io.TextIOBase):
+    """Stand-in for sys.stdout that writes to the log stream of the current run or gene."""
+
+    def __init__(self, fallback):
+        self.fallback = fallback
+
+    def write(self, text):
+        stream = _current_log.get()
+        return (stream if stream is not None else self.fallback).write(text)
+
+    def flush(self):
+        stream = _current_log.get()
+        (stream if stream is not None else self.fallback).flush()
+
+
+def current_log():
+    """Returns the log stream print() currently writes to in this thread/task, or None."""
+    return _current_log.get()
+
+
+@contextlib.contextmanager
+def log_to(stream):
+    """
+    Routes print() output from the current thread or asyncio task to stream.
+    The router stays installed on sys.stdout while any run is using it, so
+    concurrent runs never restore stdout from under each other.
+    """
+    global _router_users, _saved_stdout
+    token = _current_log.set(stream)
+    with _router_lock:
+        if _router_users == 0 and not isinstance(sys.stdout, _LogRouter):
+            _saved_stdout = sys.stdout
+            sys.stdout = _LogRouter(sys.stdout)
+        _router_users += 1
+    try:
+        yield
+    finally:
+        _current_log.reset(token)
+        with _router_lock:
+            _router_users -= 1
+            if _router_users == 0 and _saved_stdout is not None:
+                sys.stdout, _saved_stdout = _saved_stdout, None
+
+
+# --- Streaming run log sink ---
+
+class RunLogSink(io.TextIOBase):
+    """
+    Thread-safe log stream for one run that hands its text to storage in chunks.
+
+    Writes are buffered until chunk_size characters or flush_interval seconds
+    have accumulated (or flush() is called, which the engine does after every
+    gene), then passed to on_flush(seq, text). Only the last tail_size
+    characters are kept in memory for getvalue(), so a chatty run does not
+    hold its whole log in RAM and a crash loses at most one unflushed chunk.
+
+    If on_flush fails (e.g. the database is locked) the text stays pending and
+    is retried on the next flush; beyond max_pending characters the oldest
+    pending text is dropped with a marker. Without on_flush the sink keeps the
+    whole log, like io.StringIO.
+    """
+
+    def __init__(self, on_flush=None, chunk_size=32 * 1024, flush_interval=2.0,
+                 tail_size=16 * 1024, max_pending=256 * 1024):
+        self.on_flush = on_flush
+        self.chunk_size = chunk_size
+        self.flush_interval = flush_interval
+        self.tail_size = tail_size
+        self.max_pending = max_pending
+        self._lock = threading.Lock()
+        self._pending = []
+        self._pending_size = 0
+        self._kept = []
+        self._tail = ""
+        self._seq = 0
+        self._last_flush = time.monotonic()
+
+    def writable(self):
+        return True
+
+    def write(self, text):
+        with self._lock:
+            self._pending.append(text)
+            self._pending_size += len(text)
+            if self._pending_size >= self.chunk_size or time.monotonic() - self._last_flush >= self.flush_interval:
+                self._flush_locked()
+        return len(text)
+
+    def flush(self):
+        with self._lock:
+            self._flush_locked()
+
+    def close(self):
+        self.flush()
+        super().close()
+
+    def _flush_locked(self):
+        self._last_flush = time.monotonic()
+        if not self._pending:
+            return
+        chunk = "".join(self._pending)
+        if self.on_flush is None:
+            self._kept.append(chunk)
+        else:
+            try:
+                self.on_flush(self._seq, chunk)
+            except Exception as e:
+                if len(chunk) > self.max_pending:
+                    dropped = len(chunk) - self.max_pending
+                    chunk = f"[... {dropped} log characters dropped: {e} ...]\n" + chunk[-self.max_pending:]
+                self._pending, self._pending_size = [chunk], len(chunk)
+                return
+            self._seq += 1
+            self._tail = (self._tail + chunk)[-self.tail_size:]
+        self._pending, self._pending_size = [], 0
+
+    @property
+    def chunks_flushed(self):
+        return self._seq
+
+    def getvalue(self):
+        """The whole log without on_flush; otherwise the most recent tail_size characters."""
+        with self._lock:
+            pending = "".join(self._pending)
+            if self.on_flush is None:
+                return "".join(self._kept) + pending
+            return (self._tail + pending)[-self.tail_size:]
@@ -0,0 +1,160 @@
+import os
+import mmap
+import pickle
+import shutil
+import tempfile
+import threading
+import weakref
+
+# --- Spilling large gene outputs to disk ---
+# Gene outputs above a size threshold (or the largest ones, once a run's
+# context outgrows its memory ceiling) are pickled into an append-only blob
+# file under the run's spill directory. data_context keeps a SpilledValue
+# handle instead; the engine, ContextView and skip_if conditions turn handles
+# back into values on access, straight from a memory map of the file. The
+# directory is removed once the run's context (and every handle) is gone.
+
+SPILL_DIR = os.environ.get("FOUNDRY_SPILL_DIR") or os.path.join(tempfile.gettempdir(), "foundry_spill")
+SPILL_THRESHOLD_MB = float(os.environ.get("FOUNDRY_SPILL_THRESHOLD_MB", 0))  # 0: off unless a genome sets one
+MEMORY_CEILING_MB = float(os.environ.get("FOUNDRY_RUN_MEMORY_CEILING_MB", 0))  # 0: no ceiling
+
+_MB = 1024 * 1024
+
+
+class SpillStore:
+    """Append-only, memory-mapped blob file holding one run's spilled outputs."""
+
+    def __init__(self, run_id, directory=None):
+        os.makedirs(directory or SPILL_DIR, exist_ok=True)
+        self.directory = tempfile.mkdtemp(prefix=f"run_{run_id}_", dir=directory or SPILL_DIR)
+        self.path = os.path.join(self.directory, "outputs.blob")
+        self._file = open(self.path, "a+b")
+        self._map = None
+        self._lock = threading.Lock()
+        self.size = 0
+        self._finalizer = weakref.finalize(self, _remove, self._file, self.directory)
+
+    def put(self, value):
+        """Appends a pickled value and returns its handle. Raises for values that cannot be pickled."""
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            offset = self.size
+            self._file.seek(0, os.SEEK_END)
+            self._file.write(blob)
+            self._file.flush()
+            self.size += len(blob)
+        return SpilledValue(self, offset, len(blob))
+
+    def read(self, offset, length):
+        with self._lock:
+            if self._map is None or len(self._map) < offset + length:
+                # The file has grown since it was mapped; map it again (the old map's pages stay valid).
+                self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            view = memoryview(self._map)[offset:offset + length]
+        try:
+            return pickle.loads(view)
+        finally:
+            view.release()
+
+    def close(self):
+        self._finalizer()
+
+
+def _remove(file, directory):
+    file.close()
+    shutil.rmtree(directory, ignore_errors=True)
+
+
+class SpilledValue:
+    """
+    Lazy handle to a spilled output. load() reads it back from the memory map
+    each time, so the value only lives in memory while a gene is using it.
+    """
+
+    __slots__ = ('store', 'offset', 'length')
+
+    def __init__(self, store, offset, length):
+        self.store = store
+        self.offset = offset
+        self.length = length
+
+    def load(self):
+        return self.store.read(self.offset, self.length)
+
+    def __repr__(self):
+        return f"<spilled output: {self.length} bytes on disk>"
+
+
+def resolve(value):
+    """The value behind a SpilledValue handle; any other value unchanged."""
+    return value.load() if isinstance(value, SpilledValue) else value
+
+
+def materialized(data_context):
+    """A copy of data_context with every spilled output loaded back."""
+    return {key: resolve(value) for key, value in data_context.items()}
+
+
+class Spiller:
+    """
+    Per-run spill policy. Outputs estimated above threshold bytes are spilled
+    as soon as they are stored; once the in-memory outputs exceed ceiling
+    bytes, the largest are spilled until the context fits again.
+    """
+
+    def __init__(self, run_id, threshold, ceiling=None):
+        self.run_id = run_id
+        self.threshold = threshold
+        self.ceiling = ceiling
+        self.sizes = {}
+        self.store = None
+        self.spilled = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def for_run(cls, run_id, execution):
+        """Builds the spiller from execution.spill_threshold_mb / memory_ceiling_mb (or the environment); None if both are off."""
+        threshold = execution.get('spill_threshold_mb', SPILL_THRESHOLD_MB)
+        ceiling = execution.get('memory_ceiling_mb', MEMORY_CEILING_MB)
+        if not threshold and not ceiling:
+            return None
+        return cls(run_id, threshold * _MB if threshold else None, ceiling * _MB if ceiling else None)
+
+    def stored(self, key, data_context, size):
+        """Called after a gene's output is stored under key, with its estimated size in bytes."""
+        with self._lock:
+            self.sizes.pop(key, None)
+            for released in [name for name in self.sizes if name not in data_context]:
+                del self.sizes[released]
+            if size is None or key not in data_context:
+                return  # Lazy streams and released keys have nothing to spill.
+            if self.threshold is not None and size > self.threshold:
+                self._spill(key, data_context, size)
+                return
+            self.sizes[key] = size
+            if self.ceiling is not None:
+                for candidate in sorted(self.sizes, key=self.sizes.get, reverse=True):
+                    if sum(self.sizes.values()) <= self.ceiling:
+                        break
+                    if candidate in data_context:
+                        self._spill(candidate, data_context, self.sizes.pop(candidate))
+
+    def close(self):
+        """Removes the run's spill file once its outputs have been loaded back."""
+        if self.store is not None:
+            self.store.close()
+
+    def _spill(self, key, data_context, size):
+        value = data_context[key]
+        if isinstance(value, SpilledValue):
+            return
+        try:
+            if self.store is None:
+                self.store = SpillStore(self.run_id)
+            data_context[key] = self.store.put(value)
+        except Exception as e:
+            self.sizes[key] = size
+            print(f"  -> Warning: could not spill '{key}' to disk ({e}); keeping it in memory.")
+            return
+        self.spilled += 1
+        print(f"  -> Spilled '{key}' (~{size / _MB:.1f} MB) to disk.")
@@ -0,0 +1,69 @@
+"""
+Measures the per-gene overhead of handing data_context to genes.
+
+Compares the old behaviour (a deepcopy of the whole context before every gene)
+with the read-only ContextView snapshot now used by the engine.
+
+Usage: python tests/benchmarks/bench_context_copy.py [num_items] [num_genes]
+"""
+import copy
+import json
+import sys
+import os
+import time
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+import engine
+
+
+def make_posts(num_items):
+    return [
+        {"id": f"post_{i}", "title": f"Title {i}", "text": "lorem ipsum " * 10, "url": f"https://example.com/{i}"}
+        for i in range(num_items)
+    ]
+
+
+def fetch(config, input_data, data_context):
+    return make_posts(config["num_items"])
+
+
+def passthrough(config, input_data, data_context):
+    return len(data_context)
+
+
+def time_engine(num_items, num_genes):
+    """Runs a genome of one fetch plus num_genes trivial genes and returns seconds per trivial gene."""
+    genes = [{"id": "fetch", "type": "Fetch", "config": {"num_items": num_items}}]
+    genes += [{"id": f"step_{i}", "type": "Passthrough"} for i in range(num_genes)]
+    genome_json = json.dumps({"genes": genes})
+    with patch("engine.GENE_MAP", {"Fetch": fetch, "Passthrough": passthrough}):
+        start = time.perf_counter()
+        log, status, _ = engine.run_organism(genome_json, run_id=0, organism_id=0)
+        elapsed = time.perf_counter() - start
+    assert status == "success", log
+    return elapsed / num_genes
+
+
+def time_deepcopy(num_items, repeats=5):
+    """Seconds per deepcopy of a context holding num_items posts (the old per-gene cost)."""
+    context = {"fetch": make_posts(num_items)}
+    start = time.perf_counter()
+    for _ in range(repeats):
+        copy.deepcopy(context)
+    return (time.perf_counter() - start) / repeats
+
+
+def main():
+    num_items = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    num_genes = int(sys.argv[2]) if len(sys.argv) > 2 else 15
+    old = time_deepcopy(num_items)
+    new = time_engine(num_items, num_genes)
+    print(f"items={num_items} genes={num_genes}")
+    print(f"  deepcopy per gene (old):       {old * 1000:9.3f} ms")
+    print(f"  engine overhead per gene (new): {new * 1000:9.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,298 @@
+"""
+Engine micro-benchmarks on synthetic genomes.
+
+Builds genomes of 10-500 fake in-memory genes (patched into engine.GENE_MAP)
+over 10-100k items and measures:
+  engine overhead per gene (sequential and parallel modes),
+  the cost of handing data_context to a gene (ContextView vs deepcopy),
+  skip_if evaluation,
+  the data-shaping genes FilterData, MergeData and ExtractFieldList, on
+  plain lists and on RecordBatches.
+
+Every result is the best of a few repeats, in seconds per operation. Results
+can be saved as a JSON baseline and later runs compared against it, so
+regressions show up across commits:
+
+Usage: python tests/benchmarks/bench_engine.py [--quick] [--only PREFIX]
+           [--save [PATH]] [--compare [PATH]] [--threshold 1.25]
+"""
+import argparse
+import copy
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+import engine
+import genes
+from conditions import compile_condition
+from record_batch import RecordBatch
+from run_log import log_to
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+GENE_COUNTS = (10, 100, 500)
+ITEM_COUNTS = (10, 1_000, 10_000, 100_000)
+QUICK_GENE_COUNTS = (10, 100)
+QUICK_ITEM_COUNTS = (10, 1_000, 10_000)
+
+
+# --- Synthetic data and genes ---
+
+def make_items(num_items, offset=0):
+    return [
+        {"id": f"item_{i}", "score": (i * 37) % 100 / 50 - 1, "title": f"Title {i} about {'python' if i % 3 else 'rust'}",
+         "text": "lorem ipsum " * 5, "url": f"https://example.com/{i}"}
+        for i in range(offset, offset + num_items)
+    ]
+
+
+def fake_fetch(config, input_data, data_context):
+    return make_items(config["num_items"])
+
+
+def fake_passthrough(config, input_data, data_context):
+    return input_data
+
+
+def fake_noop(config, input_data, data_context):
+    return None
+
+
+FAKE_GENES = {
+    "Fetch": fake_fetch,
+    "Passthrough": fake_passthrough,
+    "Noop": fake_noop,
+    "FilterData": genes.filter_data,
+    "MergeData": genes.merge_data,
+    "ExtractFieldList": genes.extract_field_list,
+}
+
+
+def chain_genome(num_genes, num_items, mode):
+    """A fetch followed by num_genes genes, each reading the previous one's output."""
+    gene_list = [{"id": "g0", "type": "Fetch", "config": {"num_items": num_items}}]
+    gene_list += [{"id": f"g{i}", "type": "Passthrough", "input_from": f"g{i - 1}"} for i in range(1, num_genes + 1)]
+    return json.dumps({"name": "bench chain", "execution": {"mode": mode, "streaming": False}, "genes": gene_list})
+
+
+def fan_genome(num_genes, num_items):
+    """A fetch followed by num_genes independent genes that all read it."""
+    gene_list = [{"id": "fetch", "type": "Fetch", "config": {"num_items": num_items}}]
+    gene_list += [{"id": f"g{i}", "type": "Noop", "input_from": "fetch"} for i in range(num_genes)]
+    return json.dumps({"name": "bench fan", "execution": {"mode": "parallel", "max_workers": 4}, "genes": gene_list})
+
+
+def skip_genome(num_genes, num_items):
+    """Genes that are all skipped by a skip_if over the fetched list."""
+    gene_list = [{"id": "fetch", "type": "Fetch", "config": {"num_items": num_items}}]
+    gene_list += [{"id": f"g{i}", "type": "Noop", "skip_if": "len(fetch) > 0 and fetch.0.id != null"}
+                  for i in range(num_genes)]
+    return json.dumps({"name": "bench skip", "execution": {"mode": "sequential"}, "genes": gene_list})
+
+
+# --- Measurement ---
+
+def best_of(function, repeats=5, min_time=0.05):
+    """Best wall time of function() over repeats, looping short calls until each sample takes min_time."""
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            function()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time or loops >= 1_000_000:
+            break
+        loops *= 10
+    samples = [elapsed / loops]
+    for _ in range(repeats - 1):
+        start = time.perf_counter()
+        for _ in range(loops):
+            function()
+        samples.append((time.perf_counter() - start) / loops)
+    return min(samples)
+
+
+def run_engine(genome_json):
+    log, status, _ = engine.run_organism(genome_json, run_id=0, organism_id=0)
+    assert status == "success", log
+
+
+def quietly(function, *args):
+    """Calls a gene with its prints discarded."""
+    with log_to(io.StringIO()):
+        return function(*args)
+
+
+# --- Benchmarks ---
+# Each yields (name, measure, unit); measure() returns seconds per unit and is
+# only called for benchmarks that were selected.
+
+def bench_engine(gene_counts, item_counts):
+    items = min(item_counts[-1], 1_000)
+    for num_genes in gene_counts:
+        genomes = [(f"{mode}/chain", chain_genome(num_genes, items, mode)) for mode in ("sequential", "parallel")]
+        genomes.append(("parallel/fan", fan_genome(num_genes, items)))
+        for shape, genome_json in genomes:
+            yield f"engine/{shape}/genes={num_genes}", lambda g=genome_json, n=num_genes: _time_run(g) / n, "per gene"
+    genome_json = chain_genome(gene_counts[-1], 10, "sequential")
+    yield (f"engine/compile/genes={gene_counts[-1]}",
+           lambda: best_of(lambda: _compile_uncached(genome_json), repeats=3), "per genome")
+
+
+def _time_run(genome_json):
+    engine.compile_genome(genome_json)  # Plans are cached; measure execution, not compilation.
+    return best_of(lambda: run_engine(genome_json), repeats=3)
+
+
+def _compile_uncached(genome_json):
+    with engine._plan_cache_lock:
+        engine._plan_cache.clear()
+    engine.compile_genome(genome_json)
+
+
+def bench_context(gene_counts, item_counts):
+    step = engine._compile_step(0, {"id": "g", "type": "Noop"})
+    for num_items in item_counts:
+        context = {f"key_{k}": make_items(num_items // 10 or 1) for k in range(10)}
+        yield (f"context/view/items={num_items}",
+               lambda c=context: best_of(lambda: engine._context_for_gene(c, step)), "per gene")
+        if num_items <= 10_000:
+            yield (f"context/deepcopy/items={num_items}",
+                   lambda c=context: best_of(lambda: copy.deepcopy(c), repeats=3), "per gene")
+
+
+def bench_skip_if(gene_counts, item_counts):
+    context = {"fetch": make_items(100), "check": {"status": "ok", "count": 3}}
+    for name, text in (("legacy", "check.status == ok"),
+                       ("comparison", "check.count >= 2"),
+                       ("compound", "len(fetch) > 0 and fetch.0.id != null or check.status in ['ok', 'done']")):
+        predicate = compile_condition(text)[0]
+        yield f"skip_if/eval/{name}", lambda p=predicate: best_of(lambda: p(context)), "per evaluation"
+    for num_genes in gene_counts:
+        yield (f"skip_if/engine/genes={num_genes}",
+               lambda n=num_genes: _time_run(skip_genome(n, 100)) / n, "per gene")
+
+
+def bench_shaping(gene_counts, item_counts):
+    merge_config = {"source_keys": ["a", "b"], "deduplicate_by_field": "id"}
+    for num_items in item_counts:
+        items = make_items(num_items)
+        batch = RecordBatch.from_records(items)
+        other = make_items(num_items, offset=num_items // 2)
+        other_batch = RecordBatch.from_records(other)
+        seen = {"seen": [f"item_{i}" for i in range(0, num_items, 2)]}
+        repeats = 3 if num_items >= 10_000 else 5
+        cases = [
+            ("filter/greater_than", genes.filter_data, {"field": "score", "condition": "greater_than", "value": 0}, {}),
+            ("filter/contains", genes.filter_data, {"field": "title", "condition": "contains", "value": "python"}, {}),
+            ("filter/not_in", genes.filter_data, {"field": "id", "condition": "not_in", "value_from_context": "seen"}, seen),
+            ("extract", genes.extract_field_list, {"field": "id"}, {}),
+        ]
+        for name, function, config, context in cases:
+            for form, data in (("list", items), ("batch", batch)):
+                yield (f"shaping/{name}/{form}/items={num_items}",
+                       lambda args=(function, config, data, context): best_of(lambda: quietly(*args), repeats=repeats),
+                       "per call")
+        for form, context in (("list", {"a": items, "b": other}), ("batch", {"a": batch, "b": other_batch})):
+            yield (f"shaping/merge/{form}/items={num_items}",
+                   lambda c=context: best_of(lambda: quietly(genes.merge_data, merge_config, None, c), repeats=repeats),
+                   "per call")
+
+
+BENCHMARKS = {"engine/": bench_engine, "context/": bench_context, "skip_if/": bench_skip_if, "shaping/": bench_shaping}
+
+
+def run_all(quick=False, only=None):
+    """Runs the benchmarks (those whose name starts with only, if given) and returns {name: {seconds, unit}}."""
+    gene_counts = QUICK_GENE_COUNTS if quick else GENE_COUNTS
+    item_counts = QUICK_ITEM_COUNTS if quick else ITEM_COUNTS
+    results = {}
+    with patch("engine.GENE_MAP", FAKE_GENES):
+        for prefix, bench in BENCHMARKS.items():
+            if only and not (prefix.startswith(only) or only.startswith(prefix)):
+                continue  # Skip the group's setup too.
+            for name, measure, unit in bench(gene_counts, item_counts):
+                if only and not name.startswith(only):
+                    continue
+                seconds = measure()
+                results[name] = {"seconds": seconds, "unit": unit}
+                print(f"  {name:<50} {_format(seconds):>12} {unit}")
+    return results
+
+
+# --- Baselines ---
+
+def _format(seconds):
+    for unit, scale in (("s", 1), ("ms", 1e-3), ("us", 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:.2f} {unit}"
+    return f"{seconds / 1e-9:.0f} ns"
+
+
+def _commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def save_baseline(results, path, quick):
+    baseline = {
+        "meta": {"commit": _commit(), "python": platform.python_version(), "machine": platform.machine(),
+                 "platform": platform.platform(), "quick": quick, "recorded_at": time.strftime("%Y-%m-%dT%H:%M:%S")},
+        "results": results,
+    }
+    with open(path, "w") as f:
+        json.dump(baseline, f, indent=2, sort_keys=True)
+        f.write("\n")
+    print(f"\nSaved {len(results)} results to {path}")
+
+
+def compare(results, path, threshold):
+    """Prints each result against the baseline. Returns the names that got slower by more than threshold."""
+    with open(path) as f:
+        baseline = json.load(f)
+    print(f"\nCompared with {path} (commit {baseline['meta'].get('commit')}, python {baseline['meta'].get('python')}):")
+    regressions = []
+    for name, result in results.items():
+        before = baseline["results"].get(name)
+        if before is None:
+            print(f"  {name:<50} new")
+            continue
+        ratio = result["seconds"] / before["seconds"] if before["seconds"] else float("inf")
+        flag = "  REGRESSION" if ratio > threshold else ""
+        print(f"  {name:<50} {ratio:6.2f}x{flag}")
+        if flag:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Engine micro-benchmarks on synthetic genomes.")
+    parser.add_argument("--quick", action="store_true", help="smaller genomes and inputs")
+    parser.add_argument("--only", help="run only benchmarks whose name starts with this prefix")
+    parser.add_argument("--save", nargs="?", const=BASELINE_PATH, help="write the results as a JSON baseline")
+    parser.add_argument("--compare", nargs="?", const=BASELINE_PATH, help="compare with a JSON baseline")
+    parser.add_argument("--threshold", type=float, default=1.25, help="slowdown ratio reported as a regression")
+    args = parser.parse_args()
+
+    print(f"Engine benchmarks ({'quick' if args.quick else 'full'}), python {platform.python_version()}")
+    results = run_all(quick=args.quick, only=args.only)
+    regressions = compare(results, args.compare, args.threshold) if args.compare else []
+    if args.save:
+        save_baseline(results, args.save, args.quick)
+    if regressions:
+        print(f"\n{len(regressions)} benchmarks regressed by more than {args.threshold:.2f}x.")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
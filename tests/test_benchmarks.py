@@ -0,0 +1,24 @@
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'benchmarks'))
+
+import bench_engine
+
+def test_benchmarks_run_and_match_the_baseline_names():
+    """A slice of the benchmark suite runs, and its results are named like the committed baseline's."""
+    results = bench_engine.run_all(quick=True, only="skip_if/eval")
+    assert set(results) == {"skip_if/eval/legacy", "skip_if/eval/comparison", "skip_if/eval/compound"}
+    with open(bench_engine.BASELINE_PATH) as f:
+        baseline = json.load(f)
+    assert set(results) <= set(baseline["results"])
+
+def test_compare_flags_regressions(tmp_path):
+    """Results slower than the baseline by more than the threshold are reported as regressions."""
+    path = tmp_path / "baseline.json"
+    bench_engine.save_baseline({"a": {"seconds": 1.0, "unit": "per call"}, "b": {"seconds": 1.0, "unit": "per call"}},
+                               str(path), quick=True)
+    results = {"a": {"seconds": 1.1, "unit": "per call"}, "b": {"seconds": 2.0, "unit": "per call"},
+               "c": {"seconds": 1.0, "unit": "per call"}}
+    assert bench_engine.compare(results, str(path), threshold=1.25) == ["b"]
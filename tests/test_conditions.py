@@ -0,0 +1,57 @@
+import pytest
+from conditions import ConditionError, compile_condition
+
+def evaluate(condition, data_context):
+    return compile_condition(condition)[0](data_context)
+
+def test_comparisons_and_literals():
+    """Comparisons work on nested paths, list indexes and typed literals."""
+    data = {"check": {"status": "ok", "count": 3, "ratio": 0.5, "flag": False}, "items": [{"id": "a"}]}
+    assert evaluate('check.status == "ok"', data)
+    assert evaluate("check.count >= 3 and check.ratio < 1", data)
+    assert evaluate("check.flag == false", data)
+    assert evaluate("items.0.id != 'b'", data)
+    assert evaluate("check.status in ['ok', 'done']", data)
+    assert evaluate("'x' not in check.status", data)
+    assert not evaluate("missing.value > 1", data)
+    assert not evaluate("check.status > 1", data)
+
+def test_null_number_and_len_checks():
+    """Null and number checks, and len() (0 for missing values)."""
+    data = {"articles": [], "score": 0.7, "name": "x"}
+    assert evaluate("len(articles) == 0", data)
+    assert evaluate("len(missing) == 0 and missing is null", data)
+    assert evaluate("score is number and name is not number", data)
+    assert evaluate("not articles", data)
+    assert evaluate("articles is not null", data)
+
+def test_short_circuit():
+    """'and'/'or' stop evaluating as soon as the result is known."""
+    class Exploding(dict):
+        def get(self, key, default=None):
+            raise AssertionError("evaluated")
+    data = {"flag": True, "trap": Exploding()}
+    assert evaluate("flag or trap.x == 1", data)
+    assert not evaluate("not flag and trap.x == 1", data)
+
+def test_legacy_conditions_keep_type_coercion():
+    """'key == word' conditions convert the word to the actual value's type, as before."""
+    assert evaluate("check.status == ok", {"check": {"status": "ok"}})
+    assert evaluate("result.total==7", {"result": {"total": 7}})
+    assert not evaluate("check.status == ok", {})
+
+def test_legacy_numeric_bare_word_compares_as_before():
+    """A bare number is converted to the actual value's type, so strings compare as strings."""
+    assert evaluate("check.code == 007", {"check": {"code": "007"}})
+    assert not evaluate("check.code == 7", {"check": {"code": "007"}})
+    assert evaluate("check.code == 7", {"check": {"code": "7"}})
+    assert evaluate("check.ratio == 0.5", {"check": {"ratio": 0.5}})
+    assert not evaluate("check.count == 2.5", {"check": {"count": 2}})
+
+def test_reads_and_errors():
+    """Compiled conditions report the context keys they read; malformed ones raise ConditionError."""
+    assert compile_condition("len(a.b) > 0 or c == d.e")[1] == {"a", "c", "d"}
+    assert compile_condition("a.b == ok")[1] == {"a"}
+    for bad in ["", "a ==", "a == (b", "a is 3", "a === b", "__import__('os')"]:
+        with pytest.raises(ConditionError):
+            compile_condition(bad)
@@ -2,6 +2,7 @@ import sqlite3
 import pytest
 from datetime import datetime
 import time
+import threading
 
 # Mock the database module to use an in-memory SQLite database for testing
 from unittest.mock import patch
@@ -68,6 +69,7 @@ def test_create_and_get_organism(mock_get_db_connection, memory_db):
 def test_create_and_manage_runs(mock_get_db_connection, memory_db):
     """Test creating, updating, and retrieving runs."""
     mock_get_db_connection.return_value = memory_db
+    db.create_tables()
     
     db.create_organism("Run Test Organism", '{"genes":[]}')
     organism = db.get_all_organisms()[0]
@@ -83,7 +85,8 @@ def test_create_and_manage_runs(mock_get_db_connection, memory_db):
     
     runs = db.get_runs_for_organism(organism['id'])
     assert runs[0]['status'] == 'success'
-    assert runs[0]['log_output'] == "Log output"
+    assert runs[0]['log_bytes'] == len("Log output")
+    assert db.get_run_log(run_id) == "Log output"
     assert runs[0]['finished_timestamp'] is not None
 
 @patch('database.get_db_connection')
@@ -106,3 +109,203 @@ def test_update_last_run_timestamp(mock_get_db_connection, memory_db):
     
     # Compare the timestamps with a tolerance of one second
     assert abs((db_timestamp - now).total_seconds()) < 1
+
+@patch('database.get_db_connection')
+def test_record_and_get_gene_executions(mock_get_db_connection, memory_db):
+    """Gene tracing spans are stored per run and grouped by run ID for an organism."""
+    mock_get_db_connection.return_value = memory_db
+    db.create_tables()
+
+    db.create_organism("Traced Organism", '{"genes":[]}')
+    organism = db.get_all_organisms()[0]
+    run_id = db.create_run(organism['id'])
+
+    spans = [
+        {"gene_index": 0, "gene_id": "fetch", "gene_type": "FetchNewsAPI", "status": "success",
+         "started_at": 100.0, "finished_at": 101.5, "wall_ms": 1500.0, "cpu_ms": 20.0,
+         "input_items": 0, "output_items": 40, "input_bytes": 16, "output_bytes": 52000, "error_type": None},
+        {"gene_index": 1, "gene_id": "summarize", "gene_type": "SummarizeArticles", "status": "failed",
+         "started_at": 101.5, "finished_at": 104.0, "wall_ms": 2500.0, "cpu_ms": 5.0,
+         "input_items": 40, "output_items": None, "input_bytes": 52000, "output_bytes": None, "error_type": "RateLimitError"},
+    ]
+    db.record_gene_executions(run_id, spans)
+
+    spans_by_run = db.get_gene_executions_for_organism(organism['id'])
+    assert list(spans_by_run) == [run_id]
+    stored = spans_by_run[run_id]
+    assert [row['gene_id'] for row in stored] == ["fetch", "summarize"]
+    assert stored[0]['output_items'] == 40
+    assert stored[1]['error_type'] == "RateLimitError"
+
+@patch('database.get_db_connection')
+def test_streamed_run_log_chunks(mock_get_db_connection, memory_db):
+    """A run whose log was streamed in chunks reads back as one log, in order."""
+    mock_get_db_connection.return_value = memory_db
+    db.create_tables()
+
+    db.create_organism("Streaming Organism", '{"genes":[]}')
+    organism = db.get_all_organisms()[0]
+    run_id = db.create_run(organism['id'])
+    db.append_run_log_chunk(run_id, 1, "second chunk\n")
+    db.append_run_log_chunk(run_id, 0, "first chunk\n")
+    db.update_run(run_id, "success")
+
+    assert db.get_run_log(run_id) == "first chunk\nsecond chunk\n"
+    run = db.get_runs_for_organism(organism['id'])[0]
+    assert 'log_output' not in run.keys()  # The run list carries no log text.
+    assert run['log_bytes'] == 25
+
+@patch('database.get_db_connection')
+def test_run_logs_are_compressed_and_read_by_range(mock_get_db_connection, memory_db):
+    """Large chunks are stored zlib-compressed; byte ranges only read the chunks they overlap."""
+    mock_get_db_connection.return_value = memory_db
+    db.create_tables()
+    run_id = db.create_run(1)
+    lines = [f"line {i:05d} of a chatty gene\n" for i in range(3000)]
+    for seq in range(3):
+        db.append_run_log_chunk(run_id, seq, "".join(lines[seq * 1000:(seq + 1) * 1000]))
+    full = "".join(lines).encode()
+
+    stored = memory_db.execute('SELECT encoding, length(content) AS stored, length FROM run_log_chunks').fetchall()
+    assert all(row['encoding'] == 'zlib' and row['stored'] < row['length'] / 4 for row in stored)
+    assert db.get_run_log_size(run_id) == len(full)
+    assert db.get_run_log(run_id) == full.decode()
+    assert db.read_run_log(run_id, len(full) - 100) == full[-100:]
+    assert db.read_run_log(run_id, 29990, 30050) == full[29990:30050]  # Spans chunks 0 and 1.
+    assert db.read_run_log(run_id, len(full) + 5) == b''
+
+    # Runs from before chunked logs are read from their inline log_output.
+    legacy = db.create_run(1)
+    memory_db.execute('UPDATE organism_runs SET log_output = ? WHERE id = ?', ("old log\n", legacy))
+    assert db.get_run_log_size(legacy) == 8
+    assert db.read_run_log(legacy, 4) == b"log\n"
+    assert db.get_run_log_size(db.create_run(1)) is None
+
+@patch('database.get_db_connection')
+def test_gene_cache_entries(mock_get_db_connection, memory_db):
+    """Persisted gene cache entries round-trip, and expired ones are purged on write."""
+    mock_get_db_connection.return_value = memory_db
+    db.create_tables()
+
+    db.put_gene_cache_entry("old", 1.0, '[1]')
+    db.put_gene_cache_entry("fresh", 4e9, '{"a": 1}')
+    assert db.get_gene_cache_entry("fresh") == (4e9, '{"a": 1}')
+    assert db.get_gene_cache_entry("old") is None
+
+@patch('database.get_db_connection')
+def test_run_checkpoints_round_trip(mock_get_db_connection, memory_db):
+    """Checkpointed gene outputs are stored compressed and read back in genome order."""
+    mock_get_db_connection.return_value = memory_db
+    db.create_tables()
+
+    db.save_run_checkpoint(7, 1, "summarize", "summaries", ["s1", "s2"], "h1")
+    db.save_run_checkpoint(7, 0, "fetch", "articles", [{"id": 1, "text": "x" * 1000}], "h0")
+    blob = memory_db.execute('SELECT value FROM run_checkpoints WHERE gene_index = 0').fetchone()['value']
+    assert len(blob) < 1000
+
+    assert db.get_run_checkpoints(7) == [
+        (0, "fetch", "articles", [{"id": 1, "text": "x" * 1000}], "h0"),
+        (1, "summarize", "summaries", ["s1", "s2"], "h1"),
+    ]
+    db.delete_run_checkpoints(7)
+    assert db.get_run_checkpoints(7) == []
+
+@patch('database.get_db_connection')
+def test_run_resource_usage_is_recorded_and_aggregated(mock_get_db_connection, memory_db):
+    """Run usage is stored on organism_runs and summed per organism, busiest first."""
+    mock_get_db_connection.return_value = memory_db
+    db.create_tables()
+
+    db.create_organism("Light", '{"genes":[]}')
+    db.create_organism("Heavy", '{"genes":[]}')
+    light, heavy = sorted(db.get_all_organisms(), key=lambda organism: organism['name'] != "Light")
+    usage = {"cpu_user_s": 0.5, "cpu_sys_s": 0.1, "peak_rss_delta_bytes": 1024, "alloc_peak_bytes": None,
+             "http_requests": 2, "http_bytes_sent": 300, "http_bytes_received": 9000}
+    db.record_run_usage(db.create_run(light['id']), usage)
+    for _ in range(2):
+        db.record_run_usage(db.create_run(heavy['id']), dict(usage, cpu_user_s=3.0))
+    db.create_run(heavy['id'])  # Still running: no usage yet.
+
+    assert db.get_run(1)['http_bytes_received'] == 9000
+    rows = db.get_resource_usage_by_organism()
+    assert [row['name'] for row in rows] == ["Heavy", "Light"]
+    assert rows[0]['runs'] == 2
+    assert rows[0]['cpu_user_s'] == 6.0
+    assert rows[0]['http_bytes_received'] == 18000
+    assert rows[1]['avg_cpu_s'] == pytest.approx(0.6)
+
+@patch('database.get_db_connection')
+def test_migrations_upgrade_an_old_database_once(mock_get_db_connection, memory_db):
+    """An old database gets the missing columns and the run-history indexes; a second start applies nothing."""
+    mock_get_db_connection.return_value = memory_db
+    memory_db.execute('CREATE TABLE gene_executions (id INTEGER PRIMARY KEY, run_id INTEGER, gene_index INTEGER)')
+    db.create_tables()
+    assert db.schema_version(memory_db) == db.MIGRATIONS[-1][0]
+    columns = {row['name'] for row in memory_db.execute('PRAGMA table_info(gene_executions)')}
+    assert {'cache', 'attempts'} <= columns
+    plan = " ".join(row[-1] for row in memory_db.execute(
+        'EXPLAIN QUERY PLAN SELECT * FROM organism_runs WHERE organism_id = ? ORDER BY started_timestamp DESC', (1,)))
+    assert 'idx_runs_organism_started' in plan
+    assert 'TEMP B-TREE' not in plan
+    assert db.migrate(memory_db) == []
+
+@pytest.fixture
+def pool_db(tmp_path, monkeypatch):
+    """Points the connection pool at a fresh file and empties it afterwards."""
+    monkeypatch.setattr(db, 'DB_PATH', str(tmp_path / 'pool.db'))
+    db.close_all()
+    yield
+    db.close_all()
+
+def test_connections_are_reused_per_thread(pool_db):
+    """One connection per thread: close() keeps it open, other threads get their own."""
+    conn = db.get_db_connection()
+    assert conn.execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+    assert conn.execute('PRAGMA synchronous').fetchone()[0] == 1  # NORMAL
+    assert conn.execute('PRAGMA busy_timeout').fetchone()[0] == db.DB_BUSY_TIMEOUT_MS
+    conn.execute('CREATE TABLE t (x)')
+    conn.execute('INSERT INTO t VALUES (1)')
+    conn.close()  # Uncommitted work is rolled back, the connection stays open.
+    again = db.get_db_connection()
+    assert again is conn
+    assert again.execute('SELECT COUNT(*) FROM t').fetchone()[0] == 0
+
+    others = []
+    thread = threading.Thread(target=lambda: others.append(db.get_db_connection()))
+    thread.start()
+    thread.join()
+    assert others[0] is not conn
+    assert db.pool_size() == 2
+    db.get_db_connection()
+    assert db.pool_size() == 2  # Still cached, nothing reopened.
+
+def test_dead_threads_and_close_all_release_connections(pool_db):
+    """Connections of finished threads are closed as new ones open; close_all() closes everything."""
+    for _ in range(3):
+        thread = threading.Thread(target=db.get_db_connection)
+        thread.start()
+        thread.join()
+    assert db.pool_size() == 1
+    conn = db.get_db_connection()
+    assert db.pool_size() == 1
+    db.close_all()
+    assert db.pool_size() == 0
+    with pytest.raises(sqlite3.ProgrammingError):
+        conn.execute('SELECT 1')
+    assert db.get_db_connection() is not conn
+
+@patch('database.get_db_connection')
+def test_runs_are_paged_by_keyset(mock_get_db_connection, memory_db):
+    """before/limit walk the run history newest first, including runs that started in the same second."""
+    mock_get_db_connection.return_value = memory_db
+    db.create_tables()
+    run_ids = [db.create_run(1) for _ in range(5)]
+    db.create_run(2)
+    memory_db.execute("UPDATE organism_runs SET started_timestamp = '2024-01-01 00:00:00' WHERE id IN (?, ?, ?)", run_ids[:3])
+    memory_db.execute("UPDATE organism_runs SET started_timestamp = '2024-01-02 00:00:00' WHERE id IN (?, ?)", run_ids[3:])
+
+    first = db.get_runs_for_organism(1, limit=2)
+    second = db.get_runs_for_organism(1, before=first[-1]['id'], limit=2)
+    third = db.get_runs_for_organism(1, before=second[-1]['id'], limit=2)
+    assert [run['id'] for run in first + second + third] == run_ids[::-1]
+    assert db.get_runs_for_organism(1, before=run_ids[0]) == []
@@ -1,7 +1,9 @@
 import pytest
 import json
+import time
+import threading
 from unittest.mock import MagicMock, patch
-from engine import run_organism
+from engine import run_organism, _definition_hash
 
 @pytest.fixture
 def mock_stdout(mocker):
@@ -143,3 +145,643 @@ def test_run_organism_with_extract_field_list_gene(mock_genes_map, mock_stdout):
     assert config == {'field': 'id', 'organism_id': 108, 'run_id': 1}
     assert input_data == [{"id": "item1", "name": "A"}, {"id": "item2", "name": "B"}]
     assert "<- Output: Storing result in 'extracted_ids' in data_context." in log_output
+
+def test_gene_receives_read_only_context_snapshot(mock_genes_map):
+    """Genes get a shared, read-only snapshot of data_context instead of a deep copy."""
+    big_list = [{"id": i} for i in range(100)]
+    mock_genes_map["InputGene"].return_value = big_list
+    mock_genes_map["OutputGene"].reset_mock()
+    genome_json = json.dumps({"genes": [
+        {"id": "producer", "type": "InputGene"},
+        {"id": "consumer", "type": "OutputGene", "input_from": "producer"}
+    ]})
+    log, status, data_context = run_organism(genome_json, run_id=6, organism_id=1)
+    assert status == "success"
+    context_arg = mock_genes_map["OutputGene"].call_args.args[2]
+    assert context_arg["producer"] is big_list
+    with pytest.raises(TypeError):
+        context_arg["injected"] = True
+    # The snapshot does not see outputs stored after the gene ran.
+    assert "consumer" not in context_arg
+
+def test_private_context_opt_in_gets_deep_copy(mock_genes_map):
+    """A gene marked 'private_context' receives its own mutable deep copy."""
+    mock_genes_map["InputGene"].return_value = [{"id": 1}]
+    mock_genes_map["OutputGene"].reset_mock()
+    genome_json = json.dumps({"genes": [
+        {"id": "producer", "type": "InputGene"},
+        {"id": "consumer", "type": "OutputGene", "input_from": "producer", "private_context": True}
+    ]})
+    log, status, data_context = run_organism(genome_json, run_id=7, organism_id=1)
+    context_arg = mock_genes_map["OutputGene"].call_args.args[2]
+    assert type(context_arg) is dict
+    assert context_arg["producer"] == data_context["producer"]
+    assert context_arg["producer"] is not data_context["producer"]
+
+def test_independent_genes_run_concurrently(mock_genes_map):
+    """Two genes with no dependency between them overlap on the thread pool."""
+    import threading
+    barrier = threading.Barrier(2, timeout=5)
+
+    def branch(config, input_data, data_context):
+        barrier.wait()  # Only returns if both branches are running at once.
+        return [config["tag"]]
+
+    mock_genes_map["Branch"] = branch
+    genome_json = json.dumps({"execution": {"mode": "parallel"}, "genes": [
+        {"id": "left", "type": "Branch", "config": {"tag": "L"}},
+        {"id": "right", "type": "Branch", "config": {"tag": "R"}},
+        {"id": "join", "type": "TestGene", "input_from": "right"}
+    ]})
+    log, status, data_context = run_organism(genome_json, run_id=8, organism_id=1)
+    assert status == "success"
+    assert list(data_context) == ["left", "right", "join"]
+    # Logs are written in genome order, not completion order.
+    assert log.index("ID: left") < log.index("ID: right") < log.index("ID: join")
+
+def test_sequential_mode_switch(mock_genes_map):
+    """The genome's execution block can force the old strictly sequential walk."""
+    order = []
+    mock_genes_map["Branch"] = lambda config, input_data, data_context: order.append(config["tag"])
+    genome_json = json.dumps({"execution": {"mode": "sequential"}, "genes": [
+        {"id": f"gene_{tag}", "type": "Branch", "config": {"tag": tag}} for tag in "abcde"
+    ]})
+    log, status, data_context = run_organism(genome_json, run_id=9, organism_id=1)
+    assert status == "success"
+    assert order == list("abcde")
+
+def test_build_dependencies_from_genome_references():
+    """Dependencies come from input_from, skip_if, output_as and gene-specific context keys."""
+    from engine import _build_dependencies
+    genes = [
+        {"id": "fetch", "type": "FetchRedditPosts"},
+        {"id": "memory", "type": "ReadFromMemory", "config": {"key": "seen"}},
+        {"id": "new_only", "type": "FilterData", "input_from": "fetch",
+         "config": {"field": "id", "condition": "not_in", "value_from_context": "memory"}},
+        {"id": "merged", "type": "MergeData", "config": {"source_keys": ["new_only", "memory"]}},
+        {"id": "save", "type": "WriteToMemory", "input_from": "merged", "skip_if": "merged == none"},
+    ]
+    deps = _build_dependencies(genes)
+    assert deps[0] == set() and deps[1] == set()
+    assert deps[2] == {0, 1}
+    assert deps[3] == {1, 2}
+    assert deps[4] == {1, 3}
+
+def test_compiled_plans_are_cached_by_content(mock_genes_map):
+    """The same genome text compiles once; a different GENE_MAP forces a recompile."""
+    from engine import compile_genome
+    genome_json = json.dumps({"genes": [
+        {"id": "producer", "type": "InputGene", "config": {"limit": 5}},
+        {"id": "consumer", "type": "OutputGene", "input_from": "producer.processed_data",
+         "skip_if": "producer.processed_data == skip"}
+    ]})
+    plan = compile_genome(genome_json)
+    assert compile_genome(genome_json) is plan
+    assert plan.steps[0].function is mock_genes_map["InputGene"]
+    assert plan.steps[1].input_path == ("producer", "processed_data")
+    assert plan.deps == (frozenset(), frozenset({0}))
+
+    with patch('engine.GENE_MAP', {"InputGene": MagicMock(), "OutputGene": MagicMock()}):
+        assert compile_genome(genome_json) is not plan
+
+def test_compiled_skip_if_keeps_type_coercion():
+    """The compiled skip_if predicate converts the expected value to the actual value's type."""
+    from conditions import compile_condition
+    _compile_skip = lambda condition: compile_condition(condition)[0]
+    assert _compile_skip("result.count == 3")({"result": {"count": 3}})
+    assert not _compile_skip("result.count == 3")({"result": {"count": 4}})
+    assert _compile_skip("branch.condition_met == false")({"branch": {"condition_met": False}})
+    assert not _compile_skip("missing.key == false")({})
+
+def test_trace_records_a_span_per_gene(mock_genes_map):
+    """Each gene yields a span with timings, item counts, sizes, status and error type."""
+    mock_genes_map["InputGene"].return_value = [{"id": 1}, {"id": 2}]
+    genome_json = json.dumps({"execution": {"mode": "sequential"}, "genes": [
+        {"id": "producer", "type": "InputGene"},
+        {"id": "check", "type": "TestGene"},
+        {"id": "skipped", "type": "OutputGene", "skip_if": "check.status == ok"},
+        {"id": "boom", "type": "FailingGene", "input_from": "producer"}
+    ]})
+    spans = []
+    log, status, data_context = run_organism(genome_json, run_id=10, organism_id=1, trace=spans)
+    assert status == "failed"
+    assert [span["gene_id"] for span in spans] == ["producer", "check", "skipped", "boom"]
+
+    producer, check, skipped, boom = spans
+    assert producer["status"] == "success"
+    assert producer["output_items"] == 2 and producer["output_bytes"] > 0
+    assert producer["wall_ms"] >= 0 and producer["cpu_ms"] >= 0
+    assert producer["finished_at"] >= producer["started_at"]
+    assert skipped["status"] == "skipped"
+    assert boom["status"] == "failed"
+    assert boom["error_type"] == "Exception"
+    assert boom["input_items"] == 2
+
+def _streaming_gene(stream):
+    """Builds a list-form gene with the given generator form attached, like genes.py does."""
+    def gene(config, input_data, data_context=None):
+        return list(stream(config, input_data or (), data_context))
+    gene.stream = stream
+    return gene
+
+def test_item_wise_genes_are_fused_into_a_lazy_pipeline(mock_genes_map):
+    """Consecutive streaming genes pass items one at a time; only the last output is stored."""
+    pulled = []
+
+    def source(config, items, data_context=None):
+        for i in range(5):
+            pulled.append(i)
+            yield {"id": i, "score": i * 10}
+
+    def keep_high(config, items, data_context=None):
+        for item in items:
+            # Lazy: the source has produced only the items seen so far.
+            assert len(pulled) == item["id"] + 1
+            if item["score"] > 15:
+                yield item
+
+    def ids(config, items, data_context=None):
+        for item in items:
+            yield item["id"]
+
+    mock_genes_map.update({"Source": _streaming_gene(source), "KeepHigh": _streaming_gene(keep_high),
+                           "Ids": _streaming_gene(ids)})
+    genome_json = json.dumps({"execution": {"streaming": True, "free_dead_outputs": True}, "genes": [
+        {"id": "fetch", "type": "Source"},
+        {"id": "filter", "type": "KeepHigh", "input_from": "fetch"},
+        {"id": "extract", "type": "Ids", "input_from": "filter"}
+    ]})
+    spans = []
+    log, status, data_context = run_organism(genome_json, run_id=11, organism_id=1, trace=spans)
+    assert status == "success"
+    assert data_context == {"extract": [2, 3, 4]}
+    assert "Streaming items into the next gene via 'fetch'" in log
+    assert [span["output_items"] for span in spans] == [5, 3, 3]
+
+def test_fused_pipeline_returns_the_same_context_as_list_forms(mock_genes_map):
+    """Streaming is opt-in, skips genes with their own deadline, and fused outputs still appear in data_context."""
+    from engine import compile_genome
+    from genes import analyze_sentiment, filter_data
+    items = [{"id": 1, "title": "great"}, {"id": 2, "title": "awful"}, {"id": 3, "title": "good"}]
+    mock_genes_map.update({"Source": _streaming_gene(lambda c, i, d=None: iter(items)),
+                           "AnalyzeSentiment": analyze_sentiment, "FilterData": filter_data})
+    genes = [
+        {"id": "posts", "type": "Source"},
+        {"id": "scored", "type": "AnalyzeSentiment", "input_from": "posts"},
+        {"id": "positive", "type": "FilterData", "input_from": "scored",
+         "config": {"field": "sentiment_score", "condition": "greater_than", "value": 0}}
+    ]
+    assert compile_genome(json.dumps({"genes": genes})).stream_keys == ()
+    timed = [dict(genes[0]), dict(genes[1], timeout=5), genes[2]]
+    assert compile_genome(json.dumps({"execution": {"streaming": True}, "genes": timed})).stream_keys == ()
+
+    log, status, fused = run_organism(json.dumps({"execution": {"streaming": True}, "genes": genes}),
+                                      run_id=50, organism_id=1)
+    assert status == "success"
+    assert "Streaming items into the next gene via 'scored'" in log
+    _, _, unfused = run_organism(json.dumps({"genes": genes}), run_id=51, organism_id=1)
+    assert fused == unfused
+    assert [item["id"] for item in fused["positive"]] == [1, 3]
+    assert all("sentiment_score" in item for item in fused["posts"])
+
+def test_streaming_is_not_used_when_an_output_has_other_readers(mock_genes_map):
+    """A list another gene also reads is materialized, and list-only genes keep working."""
+    from engine import compile_genome
+    stream = lambda config, items, data_context=None: (item for item in items)
+    mock_genes_map.update({"Pass": _streaming_gene(stream)})
+    mock_genes_map["OutputGene"].reset_mock()
+    genome_json = json.dumps({"execution": {"streaming": True}, "genes": [
+        {"id": "a", "type": "Pass", "input_from": "initial_input"},
+        {"id": "b", "type": "Pass", "input_from": "a"},
+        {"id": "c", "type": "OutputGene", "input_from": "a"}
+    ]})
+    assert compile_genome(genome_json).stream_keys == ()
+    log, status, data_context = run_organism(genome_json, run_id=12, organism_id=1, initial_input=[1, 2])
+    assert status == "success"
+    assert data_context["a"] == [1, 2] and data_context["b"] == [1, 2]
+    assert mock_genes_map["OutputGene"].call_args.args[1] == [1, 2]
+
+def test_error_inside_a_pipeline_fails_the_run(mock_genes_map):
+    """An error raised while items stream through is attributed to the gene that raised it."""
+    def source(config, items, data_context=None):
+        yield {"id": 1}
+        raise ValueError("feed broke")
+
+    mock_genes_map.update({"Source": _streaming_gene(source),
+                           "Ids": _streaming_gene(lambda c, items, d=None: (item["id"] for item in items))})
+    genome_json = json.dumps({"execution": {"streaming": True}, "genes": [
+        {"id": "fetch", "type": "Source"},
+        {"id": "extract", "type": "Ids", "input_from": "fetch"}
+    ]})
+    spans = []
+    log, status, data_context = run_organism(genome_json, run_id=13, organism_id=1, trace=spans)
+    assert status == "failed"
+    assert "streamed gene 'fetch' failed: feed broke" in log
+    assert spans[0]["status"] == "failed" and spans[0]["error_type"] == "ValueError"
+    assert "fetch" not in data_context
+
+def test_cached_gene_output_is_reused_across_runs(mock_genes_map):
+    """A gene with a cache stanza runs once per distinct call within its TTL."""
+    from gene_cache import GENE_CACHE
+    GENE_CACHE.clear()
+    mock_genes_map["FetchNewsAPI"].reset_mock()
+    genome_json = json.dumps({"genes": [
+        {"id": "news", "type": "FetchNewsAPI", "config": {"query": "ai"}, "cache": {"ttl": 300}}
+    ]})
+    first, second = [], []
+    run_organism(genome_json, run_id=14, organism_id=1, trace=first)
+    log, status, data_context = run_organism(genome_json, run_id=15, organism_id=2, trace=second)
+    assert status == "success"
+    assert mock_genes_map["FetchNewsAPI"].call_count == 1
+    assert data_context["news"] == mock_genes_map["FetchNewsAPI"].return_value
+    assert (first[0]["cache"], second[0]["cache"]) == ("miss", "hit")
+    assert "--- Gene cache: 1 hits, 0 misses ---" in log
+    GENE_CACHE.clear()
+
+def test_failed_run_resumes_from_checkpoints(mock_genes_map):
+    """Outputs checkpointed before a failure are restored on resume; only the rest re-runs."""
+    genome_json = json.dumps({"genes": [
+        {"id": "fetch", "type": "InputGene"},
+        {"id": "post", "type": "FailingGene", "input_from": "fetch"}
+    ]})
+    saved = []
+    checkpoint = lambda *row: saved.append(row)
+    log, status, data_context = run_organism(genome_json, run_id=16, organism_id=1, initial_input="seed",
+                                             checkpoint=checkpoint)
+    assert status == "failed"
+    assert saved == [(-1, None, "initial_input", "seed", None),
+                     (0, "fetch", "fetch", {"processed_data": "processed"}, _definition_hash(json.loads(genome_json)["genes"][0]))]
+
+    mock_genes_map["InputGene"].reset_mock()
+    mock_genes_map["FailingGene"].side_effect = None
+    mock_genes_map["FailingGene"].return_value = "posted"
+    log, status, data_context = run_organism(genome_json, run_id=17, organism_id=1, resume=saved)
+    assert status == "success"
+    assert "Resuming from checkpoint: 1 of 2 genes restored." in log
+    mock_genes_map["InputGene"].assert_not_called()
+    assert mock_genes_map["FailingGene"].call_args.args[1] == {"processed_data": "processed"}
+    assert data_context == {"initial_input": "seed", "fetch": {"processed_data": "processed"}, "post": "posted"}
+
+def test_genes_edited_before_a_resume_run_again(mock_genes_map):
+    """A checkpoint whose gene definition changed since is not restored, nor are those of genes that depend on it."""
+    genome = {"genes": [
+        {"id": "fetch", "type": "InputGene", "config": {"query": "rust"}},
+        {"id": "other", "type": "OutputGene"},
+        {"id": "post", "type": "FailingGene", "input_from": "fetch"},
+        {"id": "notify", "type": "FailingGene", "input_from": "post"}
+    ]}
+    saved = [(0, "fetch", "fetch", ["old"], _definition_hash(genome["genes"][0])),
+             (1, "other", "other", "kept", _definition_hash(genome["genes"][1])),
+             (2, "post", "post", "old post", _definition_hash(genome["genes"][2]))]
+    genome["genes"][0]["config"]["query"] = "go"
+    mock_genes_map["FailingGene"].side_effect = None
+    mock_genes_map["FailingGene"].return_value = "new"
+
+    log, status, data_context = run_organism(json.dumps(genome), run_id=49, organism_id=1, resume=saved)
+    assert status == "success"
+    assert "Resuming from checkpoint: 1 of 4 genes restored." in log
+    mock_genes_map["InputGene"].assert_called_once()
+    assert mock_genes_map["InputGene"].call_args.args[0]["query"] == "go"
+    mock_genes_map["OutputGene"].assert_not_called()
+    assert mock_genes_map["FailingGene"].call_count == 2
+    assert data_context["other"] == "kept" and data_context["post"] == "new"
+
+def test_resumed_process_executor_gene_returns_its_checkpoint(mock_genes_map, monkeypatch):
+    """A restored gene marked for the process pool returns its saved output instead of re-running in a worker."""
+    import process_pool
+    from genes import extract_field_list
+    monkeypatch.setenv("FOUNDRY_PROCESS_START_METHOD", "fork")
+    mock_genes_map["ExtractFieldList"] = extract_field_list
+    genome = {"genes": [
+        {"id": "ids", "type": "ExtractFieldList", "input_from": "initial_input", "executor": "process",
+         "retry": {"max_attempts": 3}, "timeout": 5, "config": {"field": "id"}},
+        {"id": "post", "type": "OutputGene", "input_from": "ids"}
+    ]}
+    genome_json = json.dumps(genome)
+    saved = [(0, "ids", "ids", ["a", "b", "c"], _definition_hash(genome["genes"][0]))]
+    try:
+        log, status, data_context = run_organism(genome_json, run_id=44, organism_id=1, resume=saved)
+    finally:
+        process_pool.shutdown()
+    assert status == "success"
+    assert "Running in the process pool" not in log
+    assert data_context["ids"] == ["a", "b", "c"]
+    assert mock_genes_map["OutputGene"].call_args.args[1] == ["a", "b", "c"]
+
+def test_checkpoint_errors_do_not_fail_the_run(mock_genes_map):
+    """A checkpoint that cannot be written is reported in the log and skipped."""
+    genome_json = json.dumps({"genes": [{"id": "fetch", "type": "InputGene"}]})
+    checkpoint = MagicMock(side_effect=TypeError("not JSON serializable"))
+    log, status, data_context = run_organism(genome_json, run_id=18, organism_id=1, checkpoint=checkpoint)
+    assert status == "success"
+    assert "Warning: could not checkpoint gene 'fetch': not JSON serializable" in log
+
+def test_identical_fetch_genes_are_coalesced_across_organisms(mock_genes_map):
+    """Concurrent organisms fetching the same config share one call within the freshness window."""
+    import threading
+    from gene_cache import GENE_FLIGHTS
+    GENE_FLIGHTS.clear()
+    barrier = threading.Barrier(2, timeout=5)
+    calls = []
+
+    def fetch(config, input_data, data_context):
+        calls.append(config["query"])
+        return [{"id": "n1"}]
+    mock_genes_map["FetchNewsAPI"] = fetch
+
+    genome_json = json.dumps({"genes": [{"id": "news", "type": "FetchNewsAPI", "config": {"query": "rust"}}]})
+    results = []
+
+    def organism(organism_id):
+        barrier.wait()
+        results.append(run_organism(genome_json, run_id=20 + organism_id, organism_id=organism_id))
+    threads = [threading.Thread(target=organism, args=(i,)) for i in (1, 2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+
+    assert calls == ["rust"]
+    assert all(status == "success" and data_context["news"] == [{"id": "n1"}] for _, status, data_context in results)
+    assert sum("Coalesced with an identical 'FetchNewsAPI' call" in log for log, _, _ in results) == 1
+    assert GENE_FLIGHTS.stats()["by_gene"]["FetchNewsAPI"] == {"calls": 2, "shared": 1, "dedup_rate": 0.5}
+    GENE_FLIGHTS.clear()
+
+def test_restored_fetch_gene_is_not_coalesced(mock_genes_map):
+    """A fetch gene restored from a checkpoint returns its saved output, not a fresh identical call's."""
+    from gene_cache import GENE_FLIGHTS
+    GENE_FLIGHTS.clear()
+    mock_genes_map["FetchNewsAPI"] = lambda config, input_data, data_context: [{"id": "live"}]
+    gene = {"id": "news", "type": "FetchNewsAPI", "config": {"query": "rust"}}
+    genome_json = json.dumps({"genes": [gene]})
+    _, _, live = run_organism(genome_json, run_id=23, organism_id=1)
+    assert live["news"] == [{"id": "live"}]
+
+    log, status, data_context = run_organism(genome_json, run_id=24, organism_id=2,
+                                             resume=[(0, "news", "news", [{"id": "saved"}], _definition_hash(gene))])
+    assert status == "success"
+    assert data_context["news"] == [{"id": "saved"}]
+    assert GENE_FLIGHTS.stats()["by_gene"]["FetchNewsAPI"]["calls"] == 1
+    GENE_FLIGHTS.clear()
+
+def _hang(config, input_data, data_context):
+    time.sleep(config.get("seconds", 5))
+    return "too late"
+
+def test_gene_timeout_stops_the_run(mock_genes_map):
+    """A gene that exceeds its timeout is abandoned and the run ends as timed_out."""
+    mock_genes_map["Hang"] = _hang
+    genome_json = json.dumps({"genes": [
+        {"id": "hung", "type": "Hang", "timeout": 0.2},
+        {"id": "after", "type": "OutputGene", "input_from": "hung"}
+    ]})
+    spans = []
+    started = time.monotonic()
+    log, status, data_context = run_organism(genome_json, run_id=30, organism_id=1, trace=spans)
+    assert time.monotonic() - started < 2
+    assert status == "timed_out"
+    assert "**TIMED_OUT** gene 'hung' stopped: Gene exceeded its timeout of 0.2s." in log
+    assert spans[0]["status"] == "timed_out" and spans[0]["error_type"] == "GeneTimeout"
+    assert "hung" not in data_context and "after" not in data_context
+
+def test_limited_calls_reuse_a_bounded_set_of_threads(mock_genes_map, monkeypatch):
+    """Limited gene calls reuse threads; once abandoned calls hold every thread, genes run on the caller's thread."""
+    import engine
+    call_threads = engine._CallThreads(limit=2)
+    monkeypatch.setattr(engine, "_call_threads", call_threads)
+    genome_json = json.dumps({"execution": {"time_budget": 30}, "genes": [
+        {"id": f"g{i}", "type": "TestGene"} for i in range(10)
+    ]})
+    log, status, _ = run_organism(genome_json, run_id=45, organism_id=1)
+    assert status == "success"
+    assert call_threads.stats()["threads"] == 1
+
+    mock_genes_map["Hang"] = _hang
+    hung = json.dumps({"genes": [{"id": "hung", "type": "Hang", "timeout": 0.1, "config": {"seconds": 1}}]})
+    assert run_organism(hung, run_id=46, organism_id=1)[1] == "timed_out"
+    assert run_organism(hung, run_id=47, organism_id=1)[1] == "timed_out"
+    log, status, data_context = run_organism(genome_json, run_id=48, organism_id=1)
+    assert status == "success" and len(data_context) == 10
+    assert "all 2 gene-call threads are busy; running in this thread" in log
+    assert call_threads.stats()["threads"] == 2
+
+def test_run_time_budget(mock_genes_map):
+    """The genome's time budget bounds the whole run, including genes without their own timeout."""
+    mock_genes_map["Hang"] = _hang
+    genome_json = json.dumps({"execution": {"mode": "sequential", "time_budget": 0.3}, "genes": [
+        {"id": "fast", "type": "TestGene"},
+        {"id": "hung", "type": "Hang"}
+    ]})
+    log, status, data_context = run_organism(genome_json, run_id=31, organism_id=1)
+    assert status == "timed_out"
+    assert data_context == {"fast": {"status": "ok"}}
+    assert "Run exceeded its time budget." in log
+
+def test_cancel_token_stops_an_in_flight_run(mock_genes_map):
+    """Cancelling the run's token frees the run while a gene is still blocked."""
+    from run_control import CancelToken
+    mock_genes_map["Hang"] = _hang
+    token = CancelToken()
+    threading.Timer(0.2, token.cancel).start()
+    genome_json = json.dumps({"genes": [{"id": "hung", "type": "Hang"}]})
+    started = time.monotonic()
+    log, status, data_context = run_organism(genome_json, run_id=32, organism_id=1, cancel_token=token)
+    assert time.monotonic() - started < 2
+    assert status == "cancelled"
+
+def test_retry_policy_retries_until_success(mock_genes_map):
+    """A gene with a retry policy is re-run after a matching failure and the span records the attempts."""
+    mock_genes_map["FlakyGene"] = MagicMock(side_effect=[ConnectionError("reset"), {"status": "ok"}])
+    genome_json = json.dumps({"genes": [
+        {"id": "flaky", "type": "FlakyGene", "retry": {"max_attempts": 3, "backoff": 0.01, "retry_on": ["ConnectionError"]}}
+    ]})
+    spans = []
+    log, status, data_context = run_organism(genome_json, run_id=33, organism_id=1, trace=spans)
+    assert status == "success"
+    assert data_context["flaky"] == {"status": "ok"}
+    assert "Attempt 1/3 failed (ConnectionError: reset)" in log
+    assert spans[0]["attempts"] == 2
+
+def test_retry_policy_honors_retry_after_in_results(mock_genes_map, mocker):
+    """Error results with a retryable status are retried, waiting as long as Retry-After asks."""
+    sleep = mocker.patch('engine.run_control.sleep')
+    throttled = {"error": "API request failed", "status_code": 429, "headers": {"Retry-After": "7"}}
+    mock_genes_map["ApiGene"] = MagicMock(side_effect=[throttled, {"items": []}])
+    genome_json = json.dumps({"genes": [{"id": "api", "type": "ApiGene", "retry": {"max_attempts": 2}}]})
+    log, status, data_context = run_organism(genome_json, run_id=34, organism_id=1)
+    assert status == "success"
+    assert sleep.call_args[0][0] == 7
+    assert "failed (status 429); retrying in 7.0s." in log
+
+def test_retry_policy_gives_up_on_other_errors(mock_genes_map):
+    """Errors outside retry_on fail the gene on the first attempt."""
+    genome_json = json.dumps({"genes": [
+        {"id": "fail", "type": "FailingGene", "retry": {"max_attempts": 5, "retry_on": ["5xx", "Timeout"]}}
+    ]})
+    spans = []
+    log, status, data_context = run_organism(genome_json, run_id=35, organism_id=1, trace=spans)
+    assert status == "failed"
+    assert mock_genes_map["FailingGene"].call_count == 1
+    assert spans[0]["attempts"] == 1
+
+def test_skip_if_expression_skips_genes_on_empty_input(mock_genes_map):
+    """skip_if expressions can test lengths and combine checks without a ConditionalBranch gene."""
+    mock_genes_map["InputGene"].return_value = []
+    genome_json = json.dumps({"genes": [
+        {"id": "articles", "type": "InputGene"},
+        {"id": "summary", "type": "OutputGene", "input_from": "articles",
+         "skip_if": "len(articles) == 0 or articles is null"},
+        {"id": "always", "type": "SuccessGene", "skip_if": "not (len(articles) == 0)"}
+    ]})
+    log, status, data_context = run_organism(genome_json, run_id=36, organism_id=1)
+    assert status == "success"
+    assert "Skipping gene 'summary' due to condition: len(articles) == 0 or articles is null" in log
+    mock_genes_map["OutputGene"].assert_not_called()
+    mock_genes_map["SuccessGene"].assert_called_once()
+
+def test_invalid_skip_if_fails_the_run(mock_genes_map):
+    """A malformed skip_if is reported instead of raising out of the engine."""
+    genome_json = json.dumps({"genes": [{"id": "g", "type": "TestGene", "skip_if": "a == (b"}]})
+    log, status, data_context = run_organism(genome_json, run_id=37, organism_id=1)
+    assert status == "failed"
+    assert "Error: Invalid skip_if condition." in log
+
+def test_process_executor_runs_large_batches_in_chunks(monkeypatch):
+    """AnalyzeSentiment moves to the process pool for large inputs and its chunks run across workers."""
+    import process_pool
+    monkeypatch.setenv("FOUNDRY_PROCESS_START_METHOD", "fork")
+    monkeypatch.setattr(process_pool, "PROCESS_WORKERS", 2)
+    monkeypatch.setattr(process_pool, "PROCESS_MIN_ITEMS", 5)
+    monkeypatch.setattr(process_pool, "PROCESS_CHUNK_SIZE", 4)
+    posts = [{"id": str(i), "title": "happy", "text": ""} for i in range(10)]
+    genome_json = json.dumps({"genes": [
+        {"id": "scored", "type": "AnalyzeSentiment", "input_from": "initial_input"},
+        {"id": "in_thread", "type": "AnalyzeSentiment", "input_from": "initial_input", "executor": "thread"}
+    ]})
+    try:
+        spans = []
+        log, status, data_context = run_organism(genome_json, run_id=38, organism_id=1, initial_input=posts, trace=spans)
+    finally:
+        process_pool.shutdown()
+    assert status == "success"
+    assert log.count("Running in the process pool (3 chunks).") == 1
+    assert [post["id"] for post in data_context["scored"]] == [str(i) for i in range(10)]
+    assert all(post["sentiment_score"] > 0 for post in data_context["scored"])
+    assert spans[0]["cpu_ms"] >= 0
+
+def test_columnar_outputs_flow_between_genes(mock_genes_map):
+    """With execution.columnar, list_of_dicts outputs are carried as RecordBatches and checkpointed as plain records."""
+    from record_batch import RecordBatch
+    from genes import filter_data
+    mock_genes_map["InputGene"].return_value = [{"id": i, "score": i / 10} for i in range(10)]
+    mock_genes_map["FilterData"] = filter_data
+    genome_json = json.dumps({"execution": {"columnar": True}, "genes": [
+        {"id": "items", "type": "InputGene"},
+        {"id": "top", "type": "FilterData", "input_from": "items",
+         "config": {"field": "score", "condition": "greater_than", "value": 0.65}}
+    ]})
+    saved = {}
+    spans = []
+    log, status, data_context = run_organism(genome_json, run_id=39, organism_id=1, trace=spans,
+                                             checkpoint=lambda index, gene_id, key, value, definition_hash: saved.update({key: value}))
+    assert status == "success"
+    assert isinstance(data_context["items"], RecordBatch) and isinstance(data_context["top"], RecordBatch)
+    assert [row["id"] for row in data_context["top"]] == [7, 8, 9]
+    assert saved["top"] == [{"id": 7, "score": 0.7}, {"id": 8, "score": 0.8}, {"id": 9, "score": 0.9}]
+    assert spans[1]["input_items"] == 10 and spans[1]["output_items"] == 3
+
+def test_columnar_output_feeds_a_fused_filter_extract_pipeline(mock_genes_map):
+    """Rows of a columnar output stream through FilterData into ExtractFieldList, as without streaming."""
+    from genes import filter_data, extract_field_list
+    mock_genes_map["InputGene"].return_value = [{"id": i, "score": i / 10} for i in range(10)]
+    mock_genes_map.update({"FilterData": filter_data, "ExtractFieldList": extract_field_list})
+    genes = [
+        {"id": "items", "type": "InputGene", "columnar": True},
+        {"id": "top", "type": "FilterData", "input_from": "items",
+         "config": {"field": "score", "condition": "greater_than", "value": 0.45}},
+        {"id": "ids", "type": "ExtractFieldList", "input_from": "top", "config": {"field": "id"}}
+    ]
+    log, status, data_context = run_organism(json.dumps({"execution": {"streaming": True}, "genes": genes}),
+                                             run_id=41, organism_id=1)
+    assert status == "success"
+    assert "Streaming items into the next gene via 'top'" in log
+    assert data_context["ids"] == [5, 6, 7, 8, 9]
+    _, _, unfused = run_organism(json.dumps({"genes": genes}), run_id=42, organism_id=1)
+    assert unfused["ids"] == data_context["ids"]
+
+def test_free_dead_outputs_releases_intermediate_results(mock_genes_map):
+    """Outputs are released once their last reader is done; unread outputs are kept."""
+    seen = {}
+    mock_genes_map["Snapshot"] = lambda config, input_data, data_context: seen.setdefault("keys", sorted(data_context))
+    genome_json = json.dumps({"execution": {"mode": "sequential", "free_dead_outputs": True}, "genes": [
+        {"id": "raw", "type": "InputGene"},
+        {"id": "clean", "type": "TestGene", "input_from": "raw"},
+        {"id": "snap", "type": "Snapshot", "config": {"note": "{{clean.status}}"}},
+        {"id": "report", "type": "OutputGene", "input_from": "clean"}
+    ]})
+    log, status, data_context = run_organism(genome_json, run_id=40, organism_id=1)
+    assert status == "success"
+    assert seen["keys"] == ["clean"]
+    assert sorted(data_context) == ["report", "snap"]
+    assert "2 dead outputs released ---" in log
+    assert "--- Context size: peak" in log
+
+def test_keep_only_final_outputs(mock_genes_map):
+    """keep_only_final drops every output not marked final, and barrier genes keep what they may read alive."""
+    mock_genes_map["ReadAll"] = MagicMock(return_value="seen")
+    mock_genes_map["ExecuteInRuntime"] = mock_genes_map["ReadAll"]
+    genome_json = json.dumps({"execution": {"keep_only_final": True}, "genes": [
+        {"id": "a", "type": "InputGene"},
+        {"id": "b", "type": "TestGene"},
+        {"id": "shell", "type": "ExecuteInRuntime"},
+        {"id": "summary", "type": "OutputGene", "input_from": "a", "final": True}
+    ]})
+    log, status, data_context = run_organism(genome_json, run_id=41, organism_id=1)
+    assert status == "success"
+    assert set(mock_genes_map["ReadAll"].call_args[0][2]) == {"a", "b"}
+    assert list(data_context) == ["summary"]
+
+def test_large_outputs_are_spilled_and_loaded_on_access(mock_genes_map, tmp_path, monkeypatch):
+    """Outputs over the spill threshold live on disk; later genes and skip_if conditions still see the values."""
+    import spill
+    monkeypatch.setattr(spill, "SPILL_DIR", str(tmp_path))
+    articles = [{"id": i, "text": "x" * 200} for i in range(50)]
+    mock_genes_map["InputGene"].return_value = articles
+    mock_genes_map["Peek"] = MagicMock(side_effect=lambda config, input_data, data_context: len(data_context["articles"]))
+    genome_json = json.dumps({"execution": {"spill_threshold_mb": 0.001}, "genes": [
+        {"id": "articles", "type": "InputGene"},
+        {"id": "count", "type": "Peek", "config": {"about": "{{articles}}"}},
+        {"id": "first", "type": "OutputGene", "input_from": "articles"},
+        {"id": "skipped", "type": "SuccessGene", "skip_if": "len(articles) == 50"}
+    ]})
+    log, status, data_context = run_organism(genome_json, run_id=42, organism_id=1)
+    assert status == "success"
+    assert "Spilled 'articles'" in log
+    assert data_context["articles"] == articles  # The returned context holds values, not handles.
+    assert data_context["count"] == 50
+    assert list(tmp_path.iterdir()) == []
+    mock_genes_map["OutputGene"].assert_called_once()
+    assert mock_genes_map["OutputGene"].call_args[0][1] == articles
+
+def test_private_context_gene_gets_spilled_outputs_loaded(mock_genes_map, tmp_path, monkeypatch):
+    """A private_context gene after a spilled output gets its own loaded copy instead of the file handle."""
+    import spill
+    monkeypatch.setattr(spill, "SPILL_DIR", str(tmp_path))
+    articles = [{"id": i, "text": "x" * 200} for i in range(50)]
+    mock_genes_map["InputGene"].return_value = articles
+
+    def mutate(config, input_data, data_context):
+        data_context["articles"].clear()
+        return len(data_context["articles"])
+
+    mock_genes_map["Mutate"] = mutate
+    genome_json = json.dumps({"execution": {"mode": "sequential", "spill_threshold_mb": 0.001}, "genes": [
+        {"id": "articles", "type": "InputGene"},
+        {"id": "mutated", "type": "Mutate", "private_context": True, "config": {"about": "{{articles}}"}}
+    ]})
+    log, status, data_context = run_organism(genome_json, run_id=43, organism_id=1)
+    assert status == "success"
+    assert "Spilled 'articles'" in log
+    assert data_context["mutated"] == 0
+    assert spill.resolve(data_context["articles"]) == articles
+    mock_genes_map["SuccessGene"].assert_not_called()
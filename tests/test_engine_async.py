@@ -0,0 +1,73 @@
+import asyncio
+import json
+import time
+import pytest
+from unittest.mock import MagicMock
+from engine import run_organism_async
+
+async def async_fetch(config, input_data, data_context):
+    """An async gene: simulates non-blocking network I/O."""
+    await asyncio.sleep(config.get("delay", 0))
+    return [{"id": "a", "score": 1}, {"id": "b", "score": 5}]
+
+def sync_count(config, input_data, data_context):
+    """A plain sync gene, run on the engine's executor."""
+    print(f"  -> Counting {len(input_data)} items.")
+    return len(input_data)
+
+@pytest.fixture
+def mock_genes_map(mocker):
+    mock_map = {
+        "AsyncFetch": async_fetch,
+        "SyncCount": sync_count,
+        "FailingGene": MagicMock(side_effect=Exception("Gene failed!")),
+    }
+    mocker.patch('engine.GENE_MAP', mock_map)
+    return mock_map
+
+GENOME = json.dumps({"genes": [
+    {"id": "fetch", "type": "AsyncFetch", "config": {"delay": 0.2}},
+    {"id": "count", "type": "SyncCount", "input_from": "fetch"}
+]})
+
+def test_async_and_sync_genes_share_the_run_contract(mock_genes_map):
+    """Async genes are awaited, sync genes are wrapped, and the result matches run_organism's."""
+    log, status, data_context = asyncio.run(run_organism_async(GENOME, run_id=1, organism_id=1))
+    assert status == "success"
+    assert data_context["count"] == 2
+    assert "[Executing Gene] ID: fetch, Type: AsyncFetch" in log
+    assert "-> Counting 2 items." in log
+    assert "Organism Run Finished with status: success" in log
+
+def test_many_organisms_on_one_event_loop(mock_genes_map):
+    """Fifty runs overlap on one loop instead of taking fifty times as long."""
+    async def run_all():
+        return await asyncio.gather(*(run_organism_async(GENOME, run_id=i, organism_id=i) for i in range(50)))
+
+    start = time.perf_counter()
+    results = asyncio.run(run_all())
+    elapsed = time.perf_counter() - start
+
+    assert all(status == "success" for _, status, _ in results)
+    assert elapsed < 5
+    # Each run's log only contains its own output.
+    assert all(log.count("[Executing Gene] ID: fetch") == 1 for log, _, _ in results)
+
+def test_async_run_fails_on_gene_exception(mock_genes_map):
+    genome = json.dumps({"execution": {"mode": "sequential"}, "genes": [
+        {"id": "boom", "type": "FailingGene"},
+        {"id": "never", "type": "SyncCount", "input_from": "boom"}
+    ]})
+    log, status, data_context = asyncio.run(run_organism_async(genome, run_id=2, organism_id=1))
+    assert status == "failed"
+    assert "**ERROR** during execution of gene 'boom': Gene failed!" in log
+    assert "never" not in data_context
+
+def test_async_gene_timeout(mock_genes_map):
+    """Async genes honour their timeout too."""
+    genome_json = json.dumps({"genes": [{"id": "slow", "type": "AsyncFetch", "config": {"delay": 5}, "timeout": 0.2}]})
+    started = time.monotonic()
+    log, status, data_context = asyncio.run(run_organism_async(genome_json, run_id=4, organism_id=1))
+    assert time.monotonic() - started < 2
+    assert status == "timed_out"
+    assert data_context == {}
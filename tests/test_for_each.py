@@ -0,0 +1,95 @@
+import pytest
+import json
+import time
+import threading
+from unittest.mock import MagicMock
+from engine import run_organism, _build_dependencies
+from genes import for_each
+
+@pytest.fixture
+def mock_genes_map(mocker):
+    """Engine GENE_MAP with ForEach and a few item-level genes."""
+    state = {"running": 0, "peak": 0}
+    lock = threading.Lock()
+
+    def slow_double(config, input_data, data_context):
+        with lock:
+            state["running"] += 1
+            state["peak"] = max(state["peak"], state["running"])
+        time.sleep(0.02 * (3 - input_data["n"] % 3))
+        with lock:
+            state["running"] -= 1
+        if input_data["n"] == 4:
+            raise Exception("bad item")
+        return {"n": input_data["n"] * 2}
+
+    mock_map = {
+        "ForEach": for_each,
+        "Double": slow_double,
+        "Label": MagicMock(side_effect=lambda config, input_data, data_context: f"{config['prefix']}{input_data['n']}"),
+        "InputGene": MagicMock(return_value=[{"n": i} for i in range(6)]),
+    }
+    mocker.patch('engine.GENE_MAP', mock_map)
+    mock_map["state"] = state
+    return mock_map
+
+def _genome(**for_each_config):
+    return json.dumps({"genes": [
+        {"id": "items", "type": "InputGene"},
+        {"id": "each", "type": "ForEach", "input_from": "items", "config": {
+            "genes": [
+                {"id": "double", "type": "Double", "input_from": "initial_input"},
+                {"id": "label", "type": "Label", "input_from": "double", "config": {"prefix": "#"}}
+            ],
+            **for_each_config
+        }}
+    ]})
+
+def test_for_each_runs_the_nested_genes_per_item_in_order(mock_genes_map):
+    """Results come back in input order, failed items are dropped, and at most max_concurrency items run at once."""
+    log, status, data_context = run_organism(_genome(max_concurrency=2), run_id=1, organism_id=1)
+    assert status == "success"
+    assert data_context["each"] == ["#0", "#2", "#4", "#6", "#10"]
+    assert mock_genes_map["state"]["peak"] == 2
+    assert "Item 4 failed." in log
+    assert "5 of 6 items succeeded (2 at a time)" in log
+
+def test_for_each_unordered_collection(mock_genes_map):
+    """ordered: false collects results as the items finish."""
+    log, status, data_context = run_organism(_genome(ordered=False, max_concurrency=6), run_id=2, organism_id=1)
+    assert status == "success"
+    assert sorted(data_context["each"]) == ["#0", "#10", "#2", "#4", "#6"]
+    assert data_context["each"][0] in ("#4", "#10")  # n % 3 == 2 sleeps least
+
+def test_for_each_error_handling_modes(mock_genes_map):
+    """on_error 'include' keeps an error record in place; 'fail' fails the gene."""
+    log, status, data_context = run_organism(_genome(on_error="include", output="double"), run_id=3, organism_id=1)
+    assert status == "success"
+    assert data_context["each"][:4] == [{"n": 0}, {"n": 2}, {"n": 4}, {"n": 6}]
+    assert data_context["each"][4]["index"] == 4
+    assert "bad item" in data_context["each"][4]["reason"]
+
+    log, status, data_context = run_organism(_genome(on_error="fail"), run_id=4, organism_id=1)
+    assert status == "failed"
+    assert "ForEach: 1 of 6 items failed" in log
+
+def test_for_each_input_validation():
+    """ForEach needs nested genes and a list input."""
+    assert "error" in for_each({}, [], {})
+    assert "error" in for_each({"genes": [{"id": "a", "type": "Label"}]}, {"not": "a list"}, {})
+
+def test_nested_genes_do_not_add_dependencies():
+    """Templates inside ForEach's genes are not reads of the outer run, and a stateful nested gene makes ForEach stateful."""
+    genes = [
+        {"id": "summary", "type": "StoreValue"},
+        {"id": "post", "type": "PostToSlack"},
+        {"id": "each", "type": "ForEach", "config": {"genes": [
+            {"id": "inner", "type": "StoreValue", "config": {"value": "{{summary}}"}}
+        ]}},
+        {"id": "each_post", "type": "ForEach", "config": {"genes": [
+            {"id": "inner", "type": "PostToSlack"}
+        ]}},
+    ]
+    deps = _build_dependencies(genes)
+    assert deps[2] == set()
+    assert deps[3] == {1}
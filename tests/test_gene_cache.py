@@ -0,0 +1,113 @@
+import pytest
+from unittest.mock import MagicMock, patch
+from gene_cache import GeneCache, cache_key
+
+def test_cache_key_ignores_run_and_organism_ids():
+    """The same gene call from different runs and organisms shares one key, unless scoped per organism."""
+    a = cache_key("FetchNewsAPI", {"query": "ai", "run_id": 1, "organism_id": 1}, None)
+    b = cache_key("FetchNewsAPI", {"organism_id": 2, "query": "ai", "run_id": 9}, None)
+    assert a == b
+    assert a != cache_key("FetchNewsAPI", {"query": "ml", "run_id": 1, "organism_id": 1}, None)
+    assert a != cache_key("FetchNewsAPI", {"query": "ai", "run_id": 1, "organism_id": 1}, [1])
+    assert cache_key("ReadFromMemory", {"organism_id": 1}, None, per_organism=True) != \
+        cache_key("ReadFromMemory", {"organism_id": 2}, None, per_organism=True)
+
+def test_cache_key_covers_record_batch_contents():
+    """Batches with the same shape but different data get different keys; equal data shares one."""
+    from record_batch import RecordBatch
+    first = RecordBatch.from_records([{"id": 1, "title": "a"}, {"id": 2, "title": "b"}])
+    second = RecordBatch.from_records([{"id": 3, "title": "c"}, {"id": 4, "title": "d"}])
+    assert repr(first) == repr(second)
+    assert cache_key("FilterData", {}, first) != cache_key("FilterData", {}, second)
+    assert cache_key("FilterData", {}, None, {"rows": first}) != \
+        cache_key("FilterData", {}, None, {"rows": second})
+    assert cache_key("FilterData", {}, first) == \
+        cache_key("FilterData", {}, RecordBatch.from_records([{"id": 1, "title": "a"}, {"id": 2, "title": "b"}]))
+    assert cache_key("FilterData", {}, first) != cache_key("FilterData", {}, first.to_records())
+
+def test_entries_expire_after_ttl():
+    """An entry is served until its TTL passes, then counts as a miss."""
+    cache = GeneCache()
+    with patch('gene_cache.time.time', return_value=1000.0):
+        cache.put("k", [1, 2], ttl=60)
+    with patch('gene_cache.time.time', return_value=1059.0):
+        assert cache.get("k") == (True, [1, 2])
+    with patch('gene_cache.time.time', return_value=1061.0):
+        assert cache.get("k") == (False, None)
+    assert cache.stats() == {"entries": 0, "hits": 1, "misses": 1}
+
+def test_lru_eviction_and_copies():
+    """The least recently used entry is evicted, and callers get their own copies."""
+    cache = GeneCache(max_entries=2)
+    cache.put("a", [{"id": 1}], ttl=60)
+    cache.put("b", 2, ttl=60)
+    hit, value = cache.get("a")
+    value[0]["id"] = "mutated"
+    cache.put("c", 3, ttl=60)
+    assert cache.get("b") == (False, None)
+    assert cache.get("a") == (True, [{"id": 1}])
+
+def test_persistent_tier_is_read_through_and_failures_are_ignored():
+    """Misses fall back to the attached store; store errors never raise."""
+    cache = GeneCache()
+    load = MagicMock(return_value=(2e9, '{"rows": 3}'))
+    store = MagicMock(side_effect=Exception("database is locked"))
+    cache.attach_store(load, store)
+    assert cache.get("k") == (True, {"rows": 3})
+    assert cache.get("k") == (True, {"rows": 3})
+    load.assert_called_once_with("k")
+    cache.put("other", {"rows": 1}, ttl=60)
+    store.assert_called_once()
+    assert cache.get("other") == (True, {"rows": 1})
+
+def test_single_flight_shares_one_call_between_concurrent_callers():
+    """Callers that arrive while a call is in flight wait for it and get copies of its result."""
+    import threading
+    from gene_cache import SingleFlight
+    flights = SingleFlight()
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return [{"id": "p1"}]
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(flights.do("k", fetch, 60, label="FetchNewsAPI")))
+    leader.start()
+    started.wait(5)
+    followers = [threading.Thread(target=lambda: results.append(flights.do("k", fetch, 60, label="FetchNewsAPI")))
+                 for _ in range(3)]
+    for thread in followers:
+        thread.start()
+    release.set()
+    for thread in [leader, *followers]:
+        thread.join(5)
+
+    assert len(calls) == 1
+    assert sorted(shared for _, shared in results) == [False, True, True, True]
+    assert all(result == [{"id": "p1"}] for result, _ in results)
+    assert len({id(result) for result, _ in results}) == 4
+    stats = flights.stats()
+    assert stats["calls"] == 4 and stats["shared"] == 3
+    assert stats["by_gene"]["FetchNewsAPI"]["dedup_rate"] == 0.75
+
+def test_single_flight_window_and_errors():
+    """Results are reused within the window only, and a failed call is not reused."""
+    from gene_cache import SingleFlight
+    flights = SingleFlight()
+    with patch('gene_cache.time.monotonic', return_value=100.0):
+        assert flights.do("k", lambda: 1, 30) == (1, False)
+    with patch('gene_cache.time.monotonic', return_value=120.0):
+        assert flights.do("k", lambda: 2, 30) == (1, True)
+        assert flights.do("k", lambda: 3, 10) == (3, False)
+    with patch('gene_cache.time.monotonic', return_value=200.0):
+        assert flights.do("k", lambda: 4, 30) == (4, False)
+
+    def boom():
+        raise RuntimeError("quota exceeded")
+    with pytest.raises(RuntimeError):
+        flights.do("e", boom, 30)
+    assert flights.do("e", lambda: "ok", 30) == ("ok", False)
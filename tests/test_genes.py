@@ -253,3 +253,51 @@ def test_summarize_articles_error_handling(mock_openai_chat_completions):
     assert len(result) == 1
     assert "Error summarizing: OpenAI API error" in result[0]["summary"]
     mock_openai_chat_completions.chat.completions.create.assert_called_once()
+
+def test_stream_forms_match_list_forms():
+    """The generator forms of item-wise genes yield what the list forms return."""
+    from genes import analyze_sentiment, filter_data, extract_field_list
+    items = [{"id": 1, "title": "great", "value": 5}, {"id": 2, "title": "awful", "value": 50}]
+    filter_config = {"field": "value", "condition": "greater_than", "value": 10}
+
+    assert list(filter_data.stream(filter_config, iter(items), {})) == filter_data(filter_config, items, {})
+    assert list(extract_field_list.stream({"field": "id"}, iter(items))) == [1, 2]
+    expected = analyze_sentiment({}, [dict(item) for item in items])
+    scored = list(analyze_sentiment.stream({}, iter(items)))
+    assert scored == expected
+    assert scored[0] is items[0]  # Scored in place, as the list form does.
+
+def test_record_batch_forms_match_list_forms():
+    """FilterData, ExtractFieldList, MergeData and AnalyzeSentiment give the same records for RecordBatch input."""
+    from genes import analyze_sentiment
+    from record_batch import RecordBatch
+    items = [
+        {"id": 1, "title": "Great news", "value": 5, "tag": "a"},
+        {"id": 2, "title": "awful day", "value": 50},
+        {"id": 3, "title": "Meh", "value": 7, "tag": "b"},
+    ]
+    batch = RecordBatch.from_records(items)
+    configs = [
+        {"field": "value", "condition": "greater_than", "value": 6},
+        {"field": "value", "condition": "less_than", "value": 10},
+        {"field": "title", "condition": "contains", "value": "GREAT"},
+        {"field": "id", "condition": "not_in", "value": [{"id": 2}]},
+        {"field": "tag", "condition": "not_in", "value": ["a"]},
+        {"field": "tag", "condition": "contains", "value": "b"},
+    ]
+    for config in configs:
+        filtered = filter_data(config, batch, {})
+        assert isinstance(filtered, RecordBatch)
+        assert filtered.to_records() == filter_data(config, items, {})
+
+    assert extract_field_list({"field": "tag"}, batch) == extract_field_list({"field": "tag"}, items) == ["a", "b"]
+
+    merge_config = {"source_keys": ["new", "old"], "deduplicate_by_field": "id"}
+    old = [{"id": 3, "title": "dup"}, {"id": 4, "title": "Old"}]
+    merged = merge_data(merge_config, None, {"new": batch, "old": old})
+    assert merged.to_records() == merge_data(merge_config, None, {"new": items, "old": old})
+
+    scored = analyze_sentiment({}, batch)
+    assert scored.column("sentiment_score").tolist() == \
+        [item["sentiment_score"] for item in analyze_sentiment({}, [dict(item) for item in items])]
+    assert "sentiment_score" not in batch.fields
@@ -93,3 +93,53 @@ def test_validator_missing_gene_id(valid_genome):
     del genome_dict["genes"][0]["id"]
     errors = validate_genome(json.dumps(genome_dict))
     assert "must have an 'id'" in errors[0]
+
+def test_validator_execution_block(valid_genome):
+    """The optional execution block must name a known mode and a positive worker count."""
+    genome_dict = valid_genome
+    genome_dict["execution"] = {"mode": "sequential", "max_workers": 2}
+    assert validate_genome(json.dumps(genome_dict)) == []
+
+    genome_dict["execution"] = {"mode": "turbo", "max_workers": 0}
+    errors = validate_genome(json.dumps(genome_dict))
+    assert "Execution 'mode' must be 'parallel' or 'sequential'." in errors
+    assert "Execution 'max_workers' must be a positive integer." in errors
+
+def test_validator_cache_stanza(valid_genome):
+    """A gene's cache stanza needs a positive TTL and a known scope."""
+    genome_dict = valid_genome
+    genome_dict["genes"][0]["cache"] = {"ttl": 300, "scope": "organism"}
+    assert validate_genome(json.dumps(genome_dict)) == []
+
+    genome_dict["genes"][0]["cache"] = {"ttl": 0}
+    assert "Gene 'gene_1' 'cache' must be a dictionary with a positive 'ttl' (seconds)." in validate_genome(json.dumps(genome_dict))
+    genome_dict["genes"][0]["cache"] = {"ttl": 60, "scope": "everyone"}
+    assert "Gene 'gene_1' cache 'scope' must be 'global' or 'organism'." in validate_genome(json.dumps(genome_dict))
+
+def test_validator_for_each_nested_genes(valid_genome):
+    """ForEach's nested genes are validated like a genome's, along with its own settings."""
+    genome_dict = valid_genome
+    genome_dict["genes"].append({"id": "each", "type": "ForEach", "input_from": "reddit_posts",
+                                 "config": {"genes": [{"id": "inner", "type": "AnalyzeSentiment"}], "max_concurrency": 4}})
+    assert validate_genome(json.dumps(genome_dict)) == []
+
+    genome_dict["genes"][-1]["config"] = {"genes": [{"id": "inner", "type": "Nope"}], "max_concurrency": 0, "on_error": "ignore"}
+    errors = validate_genome(json.dumps(genome_dict))
+    assert "Gene 'each' genes: Gene 'inner' uses unknown type 'Nope'." in errors
+    assert "Gene 'each' 'max_concurrency' must be a positive integer." in errors
+    assert "Gene 'each' 'on_error' must be 'skip', 'include' or 'fail'." in errors
+
+    genome_dict["genes"][-1]["config"] = {}
+    assert "Gene 'each' config 'genes' must be a non-empty list of genes." in validate_genome(json.dumps(genome_dict))
+
+def test_validator_set_genes(valid_genome):
+    """FilterNotInSet and AddToSet need the name of a set."""
+    genome_dict = valid_genome
+    genome_dict["genes"].append({"id": "unseen", "type": "FilterNotInSet", "input_from": "reddit_posts",
+                                 "config": {"set": "processed_ids", "field": "id"}})
+    assert validate_genome(json.dumps(genome_dict)) == []
+
+    genome_dict["genes"].append({"id": "remember", "type": "AddToSet", "config": {"field": 3}})
+    errors = validate_genome(json.dumps(genome_dict))
+    assert "Gene 'remember' config 'set' must be a non-empty string naming the set." in errors
+    assert "Gene 'remember' config 'field' must be a string." in errors
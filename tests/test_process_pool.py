@@ -0,0 +1,44 @@
+import os
+import sys
+import subprocess
+import pytest
+import process_pool
+from genes import analyze_sentiment
+
+@pytest.fixture
+def fork_pool(monkeypatch):
+    """A small pool of forked workers (they inherit the test process's imports)."""
+    monkeypatch.setenv("FOUNDRY_PROCESS_START_METHOD", "fork")
+    monkeypatch.setattr(process_pool, "PROCESS_WORKERS", 2)
+    process_pool.shutdown()
+    yield
+    process_pool.shutdown()
+
+def _posts(count):
+    return [{"id": str(i), "title": "great" if i % 2 else "awful", "text": "day"} for i in range(count)]
+
+def test_chunked_gene_matches_in_thread_results(fork_pool):
+    """Chunks run on workers and are concatenated in input order."""
+    result, cpu_seconds = process_pool.run_gene("AnalyzeSentiment", {}, _posts(10), {}, chunk_size=3)
+    assert result == analyze_sentiment({}, _posts(10))
+    assert cpu_seconds >= 0
+
+def test_worker_output_is_replayed(fork_pool, capsys):
+    """What a gene prints in a worker shows up in the caller's output."""
+    result, _ = process_pool.run_gene("ExtractFieldList", {"field": "id"}, _posts(4), {})
+    assert result == ["0", "1", "2", "3"]
+    assert "Extracted 4 'id' values." in capsys.readouterr().out
+
+def test_only_registered_genes_run_in_process():
+    """Workers look genes up by type, so only the registered functions are eligible."""
+    assert process_pool.runs_in_process("AnalyzeSentiment", analyze_sentiment)
+    assert not process_pool.runs_in_process("AnalyzeSentiment", lambda config, data, context: data)
+
+def test_workers_do_not_load_the_vector_store():
+    """Importing the genes, as every worker does, opens neither the vector store nor the embedding model."""
+    code = ("import sys, process_pool; "
+            "print(sorted(name for name in ('chromadb', 'sentence_transformers') if name in sys.modules))")
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    result = subprocess.run([sys.executable, "-c", code], cwd=root, capture_output=True, text=True, timeout=120)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == "[]"
@@ -0,0 +1,44 @@
+import pickle
+import numpy as np
+from record_batch import RecordBatch, columnar, to_builtin
+
+RECORDS = [{"id": "a", "score": 0.5, "n": 1}, {"id": "b", "score": -0.25, "flag": True}]
+
+def test_round_trip_and_row_view():
+    """A batch keeps each record's fields and types, and rows behave like dicts."""
+    batch = RecordBatch.from_records(RECORDS)
+    assert batch.to_records() == RECORDS
+    assert len(batch) == 2 and batch.fields == ["id", "score", "n", "flag"]
+    assert batch.column("score").dtype == np.float64 and batch.column("n").dtype == np.int64
+    row = batch[1]
+    assert row["id"] == "b" and row.get("n") is None and "n" not in row
+    assert isinstance(batch[0]["n"], int) and dict(row) == RECORDS[1]
+    assert batch[-1] == RECORDS[1] and batch == RECORDS
+    assert [row["id"] for row in batch] == ["a", "b"]
+
+def test_take_concat_and_with_column():
+    """Row selection, stacking and added columns produce new batches and leave the original alone."""
+    batch = RecordBatch.from_records(RECORDS)
+    assert batch.take(batch.column("score") > 0).to_records() == RECORDS[:1]
+    assert batch[1:].to_records() == RECORDS[1:]
+    stacked = RecordBatch.concat([batch, RecordBatch.from_records([{"id": "c", "extra": [1]}])])
+    assert stacked.to_records() == RECORDS + [{"id": "c", "extra": [1]}]
+    assert stacked.is_string("id")
+    labeled = batch.with_column("label", ["x", "y"])
+    assert labeled.column("label").tolist() == ["x", "y"] and "label" not in batch.fields
+
+def test_mixed_numbers_round_trip_unchanged():
+    """Ints mixed with floats are kept as they were rather than widened to floats."""
+    records = [{"v": 1}, {"v": 2.5}]
+    assert RecordBatch.from_records(records).to_records() == records
+    assert type(RecordBatch.from_records(records)[0]["v"]) is int
+
+def test_helpers_and_pickling():
+    """columnar() converts list_of_dicts only; batches pickle and convert back to plain records."""
+    batch = columnar(RECORDS)
+    assert isinstance(batch, RecordBatch)
+    assert columnar([1, 2]) == [1, 2] and columnar([]) == [] and columnar({"a": 1}) == {"a": 1}
+    assert to_builtin(batch) == RECORDS and to_builtin("x") == "x"
+    restored = pickle.loads(pickle.dumps(batch))
+    assert restored == batch and restored.is_string("id")
+    assert batch.nbytes > 0
@@ -0,0 +1,79 @@
+import json
+import threading
+import http.server
+import pytest
+import requests
+from unittest.mock import MagicMock
+from resource_usage import RunUsage, use_usage
+from engine import run_organism
+
+def _burn(config, input_data, data_context):
+    total = 0
+    for i in range(300000):
+        total += i * i
+    return total
+
+@pytest.fixture
+def mock_genes_map(mocker):
+    mock_map = {"Burn": _burn, "TestGene": MagicMock(return_value={"status": "ok"})}
+    mocker.patch('engine.GENE_MAP', mock_map)
+    return mock_map
+
+def test_run_usage_counts_gene_cpu_once_including_sub_organisms(mock_genes_map):
+    """Gene CPU time lands on the run; a sub-organism run inline by a gene is counted once, on both runs."""
+    sub_usage = RunUsage()
+    sub_genome = json.dumps({"genes": [{"id": "inner", "type": "Burn"}]})
+    mock_genes_map["Conductor"] = lambda config, input_data, data_context: run_organism(
+        sub_genome, 1, 1, mode="sequential", usage=sub_usage)[1]
+    genome = json.dumps({"genes": [{"id": "outer", "type": "Burn"}, {"id": "sub", "type": "Conductor"}]})
+
+    usage = RunUsage()
+    log, status, data_context = run_organism(genome, 1, 1, mode="sequential", usage=usage)
+    assert status == "success"
+    assert data_context["sub"] == "success"
+    assert sub_usage.cpu_user_s > 0
+    assert usage.cpu_user_s + usage.cpu_sys_s > sub_usage.cpu_user_s + sub_usage.cpu_sys_s
+    # The sub-run's time is not counted a second time by the outer gene that ran it.
+    assert usage.cpu_user_s + usage.cpu_sys_s < 2.6 * (sub_usage.cpu_user_s + sub_usage.cpu_sys_s)
+    assert usage.peak_rss_delta_bytes is not None
+    assert "--- Resources: CPU" in log
+
+def test_trace_allocations_reports_top_allocation_sites(mock_genes_map):
+    """execution.trace_allocations records each gene's allocations and the run's traced peak."""
+    mock_genes_map["Allocate"] = lambda config, input_data, data_context: [str(i) * 10 for i in range(20000)]
+    genome = json.dumps({"execution": {"trace_allocations": True}, "genes": [{"id": "big", "type": "Allocate"}]})
+    usage, spans = RunUsage(), []
+    log, status, _ = run_organism(genome, 1, 1, trace=spans, usage=usage)
+    assert status == "success"
+    assert spans[0]["alloc_bytes"] > 200000
+    assert "Top allocations: test_resource_usage.py:" in log
+    assert usage.alloc_peak_bytes >= spans[0]["alloc_bytes"]
+
+class _Handler(http.server.BaseHTTPRequestHandler):
+    def do_POST(self):
+        self.rfile.read(int(self.headers['Content-Length']))
+        body = b"x" * 5000
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+def test_http_bytes_are_counted_for_the_current_run():
+    """Requests made through the requests library are counted on the run that made them."""
+    server = http.server.HTTPServer(("127.0.0.1", 0), _Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        url = f"http://127.0.0.1:{server.server_port}/"
+        usage = RunUsage()
+        with use_usage(usage):
+            response = requests.post(url, data=b"y" * 1200, timeout=5)
+        requests.post(url, data=b"z", timeout=5)  # Outside any run: not counted.
+    finally:
+        server.shutdown()
+    assert len(response.content) == 5000
+    assert usage.http_requests == 1
+    assert 1200 < usage.http_bytes_sent < 1600
+    assert 5000 < usage.http_bytes_received < 5300
@@ -0,0 +1,58 @@
+from retry_policy import compile_retry, should_retry, retryable_status, retry_after_of, parse_retry_after, backoff_delay
+
+class FakeResponse:
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+
+class FakeHTTPError(Exception):
+    def __init__(self, response):
+        super().__init__(f"HTTP {response.status_code}")
+        self.response = response
+
+def test_compile_retry():
+    """Only stanzas with more than one attempt produce a policy."""
+    assert compile_retry(None) is None
+    assert compile_retry({"max_attempts": 1}) is None
+    policy = compile_retry({"max_attempts": 4, "retry_on": ["5xx", 429]})
+    assert policy.max_attempts == 4 and policy.backoff == 1.0
+    assert policy.retry_on == ("5xx", "429")
+
+def test_should_retry_matches_status_codes_and_exception_names():
+    """retry_on matches HTTP statuses (also on chained causes) and exception class names."""
+    policy = compile_retry({"max_attempts": 3, "retry_on": ["5xx", "ConnectionError"]})
+    assert should_retry(policy, FakeHTTPError(FakeResponse(503)))
+    assert not should_retry(policy, FakeHTTPError(FakeResponse(404)))
+    assert should_retry(policy, ConnectionResetError("reset"))
+    try:
+        try:
+            raise FakeHTTPError(FakeResponse(502))
+        except FakeHTTPError as e:
+            raise RuntimeError("wrapped") from e
+    except RuntimeError as wrapped:
+        assert should_retry(policy, wrapped)
+    assert should_retry(compile_retry({"max_attempts": 2}), ValueError("anything"))
+
+def test_retryable_status_of_error_results():
+    """Dict results reporting 429/5xx are retryable by default."""
+    policy = compile_retry({"max_attempts": 2})
+    assert retryable_status(policy, {"error": "x", "status_code": 503}) == 503
+    assert retryable_status(policy, {"error": "x", "status_code": 400}) is None
+    assert retryable_status(policy, [1, 2]) is None
+
+def test_retry_after():
+    """Retry-After is read from response headers as seconds or an HTTP date."""
+    assert parse_retry_after("12") == 12
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0
+    assert parse_retry_after("soon") is None
+    assert retry_after_of(FakeHTTPError(FakeResponse(429, {"retry-after": "3"}))) == 3
+    assert retry_after_of(output={"status_code": 429, "headers": {"Retry-After": "5"}}) == 5
+    assert retry_after_of(ValueError("no response")) is None
+
+def test_backoff_delay_is_jittered_and_capped():
+    """Delays stay within the exponential envelope and never exceed max_delay."""
+    policy = compile_retry({"max_attempts": 10, "backoff": 1.0, "max_delay": 5})
+    for attempt in range(1, 8):
+        delay = backoff_delay(policy, attempt)
+        assert 0 <= delay <= min(5, 2 ** (attempt - 1))
+    assert backoff_delay(policy, 1, retry_after=120) == 5
@@ -0,0 +1,133 @@
+import os
+import sys
+import time
+import socket
+import asyncio
+import subprocess
+import sqlite3
+import pytest
+import database as db
+import app as app_module
+from app import app
+from resource_usage import RunUsage
+
+@pytest.fixture
+def conn(mocker):
+    """An in-memory database holding two organisms."""
+    conn = sqlite3.connect(':memory:', check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    mocker.patch('database.get_db_connection', return_value=conn)
+    db.create_tables()
+    db.create_organism("One", '{"genes":[]}')
+    db.create_organism("Two", '{"genes":[]}')
+    yield conn
+    conn.close()
+
+@pytest.fixture
+def client(conn):
+    with app.test_client() as client:
+        yield client
+
+def test_resume_checks_owner_and_status(client, mocker):
+    """Only a failed, timed-out or cancelled run of the same organism can be resumed."""
+    trigger = mocker.patch('app.trigger_run_in_background', return_value=99)
+    run_id = db.create_run(1)
+    db.update_run(run_id, "success")
+    assert client.post(f'/organism/2/runs/{run_id}/resume', json={}).status_code == 404
+    assert client.post(f'/organism/1/runs/{run_id}/resume', json={}).status_code == 409
+    assert client.post('/organism/1/runs/12345/resume', json={}).status_code == 404
+    trigger.assert_not_called()
+
+    db.update_run(run_id, "failed")
+    response = client.post(f'/organism/1/runs/{run_id}/resume', json={})
+    assert response.status_code == 202
+    assert response.get_json() == {"run_id": 99, "resumed_from": run_id}
+
+def test_successful_resume_deletes_both_runs_checkpoints(conn):
+    """Once a resumed run succeeds, neither it nor the run it resumed keeps checkpoints."""
+    failed, resumed = db.create_run(1), db.create_run(1)
+    db.save_run_checkpoint(failed, 0, "fetch", "fetch", [1])
+    db.save_run_checkpoint(resumed, 1, "post", "post", "ok")
+    app_module._finish_run(resumed, "success", [], RunUsage(), resume_from=failed)
+    assert db.get_run_checkpoints(failed) == [] and db.get_run_checkpoints(resumed) == []
+
+def test_cancel_checks_owner(client, conn, mocker):
+    """A run can only be cancelled through its own organism."""
+    cancel = mocker.patch('run_control.cancel', return_value=False)
+    run_id = db.create_run(1, owner="gone-host:1")
+    conn.execute("UPDATE organism_runs SET started_timestamp = '2000-01-01 00:00:00'")
+    assert client.post(f'/organism/2/runs/{run_id}/cancel', json={}).status_code == 404
+    cancel.assert_not_called()
+    assert db.get_run(run_id)['status'] == 'running'
+
+    response = client.post(f'/organism/1/runs/{run_id}/cancel', json={})
+    assert response.status_code == 202
+    assert db.get_run(run_id)['status'] == 'cancelled'
+
+def test_cancel_leaves_runs_of_live_processes_alone(client, conn, mocker):
+    """An unregistered 'running' row is cancelled directly only once its process is provably gone."""
+    mocker.patch('run_control.cancel', return_value=False)
+    starting = db.create_run(1, owner=app_module.RUN_OWNER)  # Not registered with run_control yet.
+    other_worker = db.create_run(1, owner=f"{socket.gethostname()}:{os.getppid()}")
+    elsewhere = db.create_run(1, owner="other-host:4242")
+    for run_id in (starting, other_worker, elsewhere):
+        response = client.post(f'/organism/1/runs/{run_id}/cancel', json={})
+        assert response.status_code == 409
+        assert db.get_run(run_id)['status'] == 'running'
+
+    exited = subprocess.Popen([sys.executable, '-c', 'pass'])
+    exited.wait()
+    restarted = db.create_run(1, owner=f"{socket.gethostname()}:{exited.pid}")
+    assert client.post(f'/organism/1/runs/{restarted}/cancel', json={}).status_code == 202
+
+    conn.execute("UPDATE organism_runs SET started_timestamp = '2000-01-01 00:00:00' WHERE id = ?", (elsewhere,))
+    assert client.post(f'/organism/1/runs/{elsewhere}/cancel', json={}).status_code == 202
+    assert db.get_run(elsewhere)['status'] == 'cancelled'
+
+def test_engine_crash_finishes_the_run_as_failed(conn, mocker):
+    """If run_organism raises, the run is still finished (as failed) with the error in its log."""
+    mocker.patch('app.run_organism', side_effect=RuntimeError("engine blew up"))
+    run_id = db.create_run(1)
+    app_module.run_and_log('{"genes":[]}', run_id, 1)
+    assert db.get_run(run_id)['status'] == 'failed'
+    assert "Run crashed: RuntimeError: engine blew up" in db.get_run_log(run_id)
+
+def test_engine_crash_finishes_an_async_run_as_failed(conn, mocker):
+    mocker.patch('app.run_organism_async', side_effect=RuntimeError("loop blew up"))
+    run_id = db.create_run(1)
+    asyncio.run(app_module.run_and_log_async('{"genes":[]}', run_id, 1))
+    assert db.get_run(run_id)['status'] == 'failed'
+    assert "Run crashed: RuntimeError: loop blew up" in db.get_run_log(run_id)
+
+def test_slow_database_writes_do_not_block_other_async_runs(conn, mocker):
+    """One run's slow log and checkpoint writes happen off the event loop, so a concurrent run is not held up."""
+    slow_run, fast_run = db.create_run(1), db.create_run(2)
+    append_chunk = db.append_run_log_chunk
+    def slow_append(run_id, seq, text):
+        if run_id == slow_run:
+            time.sleep(0.4)
+        append_chunk(run_id, seq, text)
+    mocker.patch('database.append_run_log_chunk', side_effect=slow_append)
+
+    finished = {}
+    async def engine(genome_json, run_id, organism_id, trace, log_sink, checkpoint, resume, cancel_token, usage):
+        for index in range(3):
+            log_sink.write(f"gene {index}\n")
+            log_sink.flush()
+            checkpoint(index, f"g{index}", "out", [index], None)
+            await asyncio.sleep(0.01)
+        finished[run_id] = time.monotonic()
+        return {}, "failed", None
+    mocker.patch('app.run_organism_async', side_effect=engine)
+
+    async def both():
+        started = time.monotonic()
+        await asyncio.gather(app_module.run_and_log_async('{"genes":[]}', slow_run, 1),
+                             app_module.run_and_log_async('{"genes":[]}', fast_run, 2))
+        return started
+    started = asyncio.run(both())
+
+    assert finished[fast_run] - started < 0.3
+    for run_id in (slow_run, fast_run):
+        assert db.get_run_log(run_id) == "gene 0\ngene 1\ngene 2\n"
+        assert [row[3] for row in db.get_run_checkpoints(run_id)] == [[0], [1], [2]]
@@ -0,0 +1,35 @@
+import time
+import pytest
+import run_control
+from run_control import CancelToken, RunCancelled, capped_timeout, use_token
+
+def test_token_deadline_and_parent():
+    """A token times out at its deadline and follows its parent's cancellation."""
+    parent = CancelToken()
+    child = CancelToken(deadline=time.monotonic() + 60, parent=parent)
+    assert not child.cancelled
+    assert 59 < child.remaining() <= 60
+    parent.cancel("stop")
+    with pytest.raises(RunCancelled) as excinfo:
+        child.check()
+    assert excinfo.value.status == "cancelled"
+
+    expired = CancelToken(deadline=time.monotonic() - 1)
+    with pytest.raises(RunCancelled) as excinfo:
+        expired.check()
+    assert excinfo.value.status == "timed_out"
+
+def test_capped_timeout_uses_the_remaining_budget():
+    """Network timeouts are capped at the time the current run has left."""
+    assert capped_timeout(30) == 30
+    with use_token(CancelToken(deadline=time.monotonic() + 5)):
+        assert 4 < capped_timeout(30) <= 5
+        assert capped_timeout(2) == 2
+
+def test_registry_cancels_active_runs_only():
+    token = run_control.register(99)
+    assert 99 in run_control.active_runs()
+    assert run_control.cancel(99)
+    assert token.cancelled
+    run_control.unregister(99)
+    assert not run_control.cancel(99)
@@ -0,0 +1,62 @@
+import json
+import threading
+from unittest.mock import MagicMock
+from run_log import RunLogSink
+from engine import run_organism
+
+def test_sink_flushes_in_chunks_and_keeps_only_a_tail():
+    """Text reaches storage in chunk_size pieces; memory holds only the last tail_size characters."""
+    chunks = []
+    sink = RunLogSink(on_flush=lambda seq, text: chunks.append((seq, text)), chunk_size=100, tail_size=50, flush_interval=3600)
+    for i in range(100):
+        sink.write(f"line {i:03d}\n")  # 9 characters per line
+    sink.flush()
+
+    assert [seq for seq, _ in chunks] == list(range(len(chunks)))
+    assert all(len(text) >= 100 for _, text in chunks[:-1])
+    assert "".join(text for _, text in chunks) == "".join(f"line {i:03d}\n" for i in range(100))
+    assert len(sink.getvalue()) == 50
+    assert sink.getvalue().endswith("line 099\n")
+
+def test_sink_retries_failed_flushes():
+    """If storage is unavailable the text stays pending and goes out with the next successful flush."""
+    on_flush = MagicMock(side_effect=[Exception("database is locked"), None])
+    sink = RunLogSink(on_flush=on_flush, flush_interval=3600)
+    sink.write("first\n")
+    sink.flush()
+    sink.write("second\n")
+    sink.flush()
+    assert on_flush.call_args_list[-1].args == (0, "first\nsecond\n")
+
+def test_sink_without_storage_keeps_everything():
+    sink = RunLogSink(chunk_size=4)
+    sink.write("hello ")
+    sink.write("world")
+    assert sink.getvalue() == "hello world"
+
+def test_concurrent_runs_keep_separate_logs(mocker):
+    """Runs on different threads each capture only their own gene output."""
+    def talk(config, input_data, data_context):
+        for i in range(200):
+            print(f"organism {config['organism_id']} line {i}")
+        return config['organism_id']
+
+    mocker.patch('engine.GENE_MAP', {"Talk": talk})
+    genome_json = json.dumps({"genes": [{"id": "talk", "type": "Talk"}]})
+    sinks = {organism_id: [] for organism_id in range(8)}
+
+    def run(organism_id):
+        sink = RunLogSink(on_flush=lambda seq, text: sinks[organism_id].append(text), chunk_size=256)
+        run_organism(genome_json, run_id=organism_id, organism_id=organism_id, log_sink=sink)
+
+    threads = [threading.Thread(target=run, args=(organism_id,)) for organism_id in sinks]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    for organism_id, chunks in sinks.items():
+        log = "".join(chunks)
+        assert log.count(f"organism {organism_id} line") == 200
+        assert "organism" not in log.replace(f"organism {organism_id} line", "")
+        assert "Organism Run Finished with status: success" in log
@@ -0,0 +1,42 @@
+import sqlite3
+import pytest
+import database as db
+from app import app
+
+@pytest.fixture
+def client(mocker):
+    """Test client over an in-memory database holding one run with a two-chunk log."""
+    conn = sqlite3.connect(':memory:')
+    conn.row_factory = sqlite3.Row
+    mocker.patch('database.get_db_connection', return_value=conn)
+    db.create_tables()
+    db.create_organism("Logger", '{"genes":[]}')
+    run_id = db.create_run(1)
+    db.append_run_log_chunk(run_id, 0, "a" * 600 + "\n")
+    db.append_run_log_chunk(run_id, 1, "tail line\n")
+    with app.test_client() as client:
+        yield client, run_id
+    conn.close()
+
+def test_run_log_full_tail_and_range(client):
+    """The log route serves the whole log, its tail, or a byte range."""
+    client, run_id = client
+    url = f'/organism/1/runs/{run_id}/log'
+
+    response = client.get(url)
+    assert response.status_code == 200
+    assert response.data == b"a" * 600 + b"\ntail line\n"
+    assert response.headers['X-Log-Bytes'] == '611'
+
+    assert client.get(url + '?tail=10').data == b"tail line\n"
+
+    response = client.get(url, headers={'Range': 'bytes=598-604'})
+    assert response.status_code == 206
+    assert response.data == b"aa\ntail"
+    assert response.headers['Content-Range'] == 'bytes 598-604/611'
+    assert client.get(url, headers={'Range': 'bytes=-5'}).data == b"line\n"
+    assert client.get(url, headers={'Range': 'bytes=700-'}).status_code == 416
+
+def test_run_log_of_another_organism_is_not_found(client):
+    client, run_id = client
+    assert client.get(f'/organism/2/runs/{run_id}/log').status_code == 404
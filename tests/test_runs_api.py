@@ -0,0 +1,45 @@
+import sqlite3
+import pytest
+import database as db
+from app import app
+
+@pytest.fixture
+def client(mocker):
+    """Test client over an in-memory database holding five runs of organism 1."""
+    conn = sqlite3.connect(':memory:')
+    conn.row_factory = sqlite3.Row
+    mocker.patch('database.get_db_connection', return_value=conn)
+    db.create_tables()
+    db.create_organism("Busy", '{"genes":[]}')
+    run_ids = [db.create_run(1) for _ in range(5)]
+    with app.test_client() as client:
+        yield client, run_ids
+    conn.close()
+
+def test_api_runs_pages_with_a_cursor(client):
+    """next_before leads from page to page until the oldest run."""
+    client, run_ids = client
+    pages, before = [], None
+    while True:
+        url = '/api/organisms/1/runs?limit=2' + (f'&before={before}' if before else '')
+        body = client.get(url).get_json()
+        pages.append([run['id'] for run in body['runs']])
+        before = body['next_before']
+        if before is None:
+            break
+    assert pages == [run_ids[4:2:-1], run_ids[2:0:-1], run_ids[:1]]
+    assert 'log_bytes' in client.get('/api/organisms/1/runs').get_json()['runs'][0]
+
+def test_api_runs_rejects_bad_requests(client):
+    client, _ = client
+    assert client.get('/api/organisms/1/runs?limit=0').status_code == 400
+    assert client.get('/api/organisms/9/runs').status_code == 404
+
+def test_detail_page_links_to_older_runs(client, mocker):
+    client, run_ids = client
+    mocker.patch('app.RUNS_PAGE_SIZE', 3)
+    html = client.get('/organism/1').get_data(as_text=True)
+    assert f'/organism/1?before={run_ids[2]}' in html
+    assert 'Newest runs' not in html
+    html = client.get(f'/organism/1?before={run_ids[2]}').get_data(as_text=True)
+    assert 'Older runs' not in html and 'Newest runs' in html
@@ -0,0 +1,55 @@
+import json
+import sqlite3
+import pytest
+import database as db
+from engine import run_organism
+from genes import filter_not_in_set, add_to_set
+from record_batch import RecordBatch
+
+@pytest.fixture
+def memory_db(mocker):
+    conn = sqlite3.connect(':memory:', check_same_thread=False)  # The engine calls genes on worker threads.
+    conn.row_factory = sqlite3.Row
+    mocker.patch('database.get_db_connection', return_value=conn)
+    db.create_tables()
+    yield conn
+    conn.close()
+
+def test_filter_and_add_to_set(memory_db, mocker):
+    """Only unseen items pass; adding ignores known members; other organisms and sets are separate."""
+    mocker.patch('database.SET_BATCH_SIZE', 2)  # Exercise several IN (...) batches.
+    config = {"set": "processed_ids", "field": "id", "organism_id": 1}
+    items = [{"id": 1}, {"id": "2"}, {"id": 3}, {"title": "no id"}, {"id": 4}]
+    assert add_to_set(config, [{"id": "1"}, {"id": 2}], {}) == {"status": "success", "set": "processed_ids", "added": 2}
+
+    assert filter_not_in_set(config, items, {}) == [{"id": 3}, {"id": 4}]
+    assert add_to_set(config, items, {})["added"] == 2
+    assert filter_not_in_set(config, items, {}) == []
+    assert db.get_set_size(1, "processed_ids") == 4
+
+    assert filter_not_in_set(dict(config, organism_id=2), items, {}) == [{"id": 1}, {"id": "2"}, {"id": 3}, {"id": 4}]
+    assert add_to_set({"set": "urls", "organism_id": 1}, "https://a", {})["added"] == 1
+    assert filter_not_in_set({"set": "urls", "organism_id": 1}, ["https://a", "https://b"], {}) == ["https://b"]
+
+    batch = RecordBatch.from_records([{"id": 3}, {"id": 9}])
+    assert list(filter_not_in_set(config, batch, {})) == [{"id": 9}]
+
+def test_membership_is_an_index_lookup(memory_db):
+    plan = " ".join(row[-1] for row in memory_db.execute(
+        'EXPLAIN QUERY PLAN SELECT member FROM organism_sets WHERE organism_id = ? AND set_name = ? AND member IN (?, ?)',
+        (1, "s", "a", "b")))
+    assert 'PRIMARY KEY' in plan
+
+def test_dedup_across_runs(memory_db):
+    """The set persists between runs of a genome, so a second run sees nothing new."""
+    genome = json.dumps({"genes": [
+        {"id": "new", "type": "FilterNotInSet", "input_from": "initial_input", "config": {"set": "seen", "field": "id"}},
+        {"id": "remember", "type": "AddToSet", "input_from": "new", "config": {"set": "seen", "field": "id"}},
+    ]})
+    items = [{"id": 1}, {"id": 2}]
+    _, status, data_context = run_organism(genome, 1, 7, initial_input=items)
+    assert status == "success"
+    assert data_context["new"] == [{"id": 1}, {"id": 2}]
+    _, status, data_context = run_organism(genome, 2, 7, initial_input=items)
+    assert data_context["new"] == []
+    assert data_context["remember"]["added"] == 0
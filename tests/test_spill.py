@@ -0,0 +1,54 @@
+import gc
+import os
+import pytest
+import spill
+from spill import SpillStore, Spiller, SpilledValue, resolve
+
+@pytest.fixture(autouse=True)
+def spill_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(spill, "SPILL_DIR", str(tmp_path))
+    return tmp_path
+
+def test_store_reads_values_back_from_a_growing_file():
+    """Values appended after the file was mapped are still readable, and every handle loads its own value."""
+    store = SpillStore(run_id=1)
+    first = store.put({"articles": ["x" * 100] * 10})
+    assert first.load() == {"articles": ["x" * 100] * 10}
+    second = store.put([1, 2, 3])
+    assert second.load() == [1, 2, 3] and first.load()["articles"][0] == "x" * 100
+    assert resolve(second) == [1, 2, 3] and resolve("plain") == "plain"
+    assert os.path.getsize(store.path) == store.size
+
+def test_store_directory_is_removed_with_its_handles(spill_dir):
+    """The spill directory lives as long as the store or any handle to it."""
+    handle = SpillStore(run_id=2).put("value")
+    gc.collect()
+    assert len(os.listdir(spill_dir)) == 1
+    del handle
+    gc.collect()
+    assert os.listdir(spill_dir) == []
+
+def test_spiller_threshold_and_ceiling():
+    """Outputs over the threshold spill at once; beyond the ceiling the largest in-memory outputs spill."""
+    spiller = Spiller(run_id=3, threshold=1000, ceiling=500)
+    context = {"big": "b" * 2000, "a": "a" * 300, "c": "c" * 100}
+    spiller.stored("big", context, 2000)
+    assert isinstance(context["big"], SpilledValue) and context["big"].load() == "b" * 2000
+    spiller.stored("a", context, 300)
+    assert context["a"] == "a" * 300
+    spiller.stored("c", context, 250)
+    assert isinstance(context["a"], SpilledValue) and context["c"] == "c" * 100
+    assert spiller.spilled == 2
+
+def test_spiller_keeps_unpicklable_values_in_memory(capsys):
+    """A value that cannot be pickled stays in the context."""
+    spiller = Spiller(run_id=4, threshold=10)
+    context = {"gen": (i for i in range(3))}
+    spiller.stored("gen", context, 100)
+    assert not isinstance(context["gen"], SpilledValue)
+    assert "could not spill 'gen'" in capsys.readouterr().out
+
+def test_spiller_is_off_without_limits():
+    assert Spiller.for_run(5, {}) is None  # Off unless a genome or the environment sets a limit.
+    assert Spiller.for_run(5, {"spill_threshold_mb": 0, "memory_ceiling_mb": 0}) is None
+    assert Spiller.for_run(5, {"spill_threshold_mb": 1}).threshold == 1024 * 1024